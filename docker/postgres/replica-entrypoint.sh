@@ -0,0 +1,19 @@
+#!/bin/bash
+# Starts a hot standby of the "db" service: on first start the data
+# directory is cloned from the primary with pg_basebackup (-R writes the
+# standby settings), then postgres runs as a read-only streaming replica.
+set -e
+
+if [ ! -s "$PGDATA/PG_VERSION" ]; then
+    until pg_isready -h db -U "$POSTGRES_USER"; do
+        echo "Waiting for the primary..."
+        sleep 1
+    done
+    mkdir -p "$PGDATA"
+    chown postgres:postgres "$PGDATA"
+    chmod 700 "$PGDATA"
+    PGPASSWORD="${REPLICATION_PASSWORD:-replicator_password}" \
+        gosu postgres pg_basebackup -h db -U replicator -D "$PGDATA" -R -X stream -P
+fi
+
+exec docker-entrypoint.sh postgres -c hot_standby=on
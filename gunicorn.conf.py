@@ -0,0 +1,104 @@
+"""
+Gunicorn configuration for MedLink (picked up by `gunicorn -c gunicorn.conf.py`).
+
+Everything can be overridden from the environment:
+
+  GUNICORN_WORKER_CLASS  sync (default) | gthread | uvicorn
+  WEB_CONCURRENCY        number of worker processes (default: sized from CPU count)
+  GUNICORN_MAX_WORKERS   upper bound for the CPU-based default (default 4, for 512MB instances)
+  GUNICORN_THREADS       threads per worker for gthread (default 4)
+  GUNICORN_PRELOAD       load the app in the master before forking (default true)
+  GUNICORN_MAX_REQUESTS  recycle a worker after this many requests (default 1000, 0 = never)
+  GUNICORN_KEEPALIVE     seconds to hold idle keep-alive connections (default 5)
+  GUNICORN_TIMEOUT       worker timeout in seconds (default 30)
+  CACHE_BACKEND          read here too: unset with more than one worker -> sqlite
+
+The uvicorn profile serves medlink.asgi and needs `pip install uvicorn-worker`.
+"""
+import multiprocessing
+import os
+
+from decouple import config
+
+
+def env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+cpu_count = multiprocessing.cpu_count()
+max_workers = env_int("GUNICORN_MAX_WORKERS", 4)
+
+profile = os.environ.get("GUNICORN_WORKER_CLASS", "sync")
+
+# ------------------------------------------------------------
+# WORKER PROFILE
+# ------------------------------------------------------------
+if profile == "gthread":
+    # Views mostly wait on Supabase over HTTP: threads overlap that I/O
+    worker_class = "gthread"
+    threads = env_int("GUNICORN_THREADS", 4)
+    default_workers = cpu_count + 1
+    wsgi_app = "medlink.wsgi:application"
+elif profile == "uvicorn":
+    worker_class = "uvicorn_worker.UvicornWorker"
+    default_workers = cpu_count
+    wsgi_app = "medlink.asgi:application"
+elif profile == "sync":
+    worker_class = "sync"
+    default_workers = 2 * cpu_count + 1
+    wsgi_app = "medlink.wsgi:application"
+else:
+    raise RuntimeError(f"Unknown GUNICORN_WORKER_CLASS {profile!r} (use sync, gthread or uvicorn)")
+
+workers = env_int("WEB_CONCURRENCY", min(default_workers, max_workers))
+
+# ------------------------------------------------------------
+# SHARED CACHE
+# ------------------------------------------------------------
+# Version-based invalidation (query cache, page caches, ETags, throttle
+# buckets, session revocation) only reaches every worker through a shared
+# cache. Several workers default to the on-host SQLite cache; an explicit
+# locmem would leave the other workers serving stale data until TTL expiry.
+cache_backend = config("CACHE_BACKEND", default="")
+if workers > 1:
+    if not cache_backend:
+        cache_backend = os.environ["CACHE_BACKEND"] = "sqlite"
+    elif cache_backend == "locmem":
+        raise RuntimeError(
+            f"CACHE_BACKEND=locmem keeps a separate cache in each of the {workers} workers; "
+            "use sqlite, file, redis or memcached, or set WEB_CONCURRENCY=1"
+        )
+
+# ------------------------------------------------------------
+# PROCESS LIFECYCLE
+# ------------------------------------------------------------
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', '8000')}")
+
+# Preloading is safe: main.supabase_client opens nothing at import time and
+# rebuilds its connection pool in each forked worker; the SQLite cache and
+# the email connection are also created per process on first use.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+
+max_requests = env_int("GUNICORN_MAX_REQUESTS", 1000)
+max_requests_jitter = max_requests // 10
+keepalive = env_int("GUNICORN_KEEPALIVE", 5)
+timeout = env_int("GUNICORN_TIMEOUT", 30)
+graceful_timeout = timeout
+
+# Heartbeat files on tmpfs; Docker's overlay /tmp can stall workers
+if os.path.isdir("/dev/shm"):
+    worker_tmp_dir = "/dev/shm"
+
+accesslog = "-"
+errorlog = "-"
+
+
+def when_ready(server):
+    if preload_app:
+        # Import (but do not connect) the Supabase SDK in the master so the
+        # workers share its pages instead of each importing it on first use.
+        import supabase  # noqa: F401
+    server.log.info(
+        "MedLink profile=%s workers=%s threads=%s preload=%s cache=%s",
+        profile, workers, globals().get("threads", 1), preload_app, cache_backend or "locmem",
+    )
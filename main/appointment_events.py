@@ -0,0 +1,106 @@
+"""
+Append-only log of appointment changes (the appointment_events table).
+
+Every view that creates an appointment, changes its status, moves it to
+another slot or deletes it appends one event per appointment with
+log_events(): the appointment, its patient and slot, the old and new
+status, who did it (actor_id / actor_role from the session) and when.
+Rows are only ever inserted.
+
+Events are read by id: events_after(cursor) returns the events after a
+cursor, oldest first, so a reader (the dashboard's notifications endpoint,
+an email outbox) keeps the last id it handled and asks for what came after.
+Ids are handed out when a row is inserted, not when it commits, so two
+concurrent inserts can become visible out of id order. events_after
+therefore only returns events at least EVENTS_SETTLE_SECONDS old; every
+event older than that has committed, so a cursor never moves past one that
+is still on its way. The dashboard shows a patient's latest events and
+counts those after users.notifications_read_id as unread.
+
+Logging never fails the change it records: errors are printed and dropped.
+"""
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+
+from .supabase_client import supabase
+
+TABLE = "appointment_events"
+FEED_COLUMNS = (
+    "id, appointment_id, patient_id, doctor_name, appointment_date, appointment_time, "
+    "kind, old_status, new_status, actor_role, created_at"
+)
+
+
+def actor_of(request):
+    """{"actor_id", "actor_role"} of the logged-in user making the change."""
+    return {
+        "actor_id": request.session.get("user_id"),
+        "actor_role": request.session.get("role") or "patient",
+    }
+
+
+def event(appointment, kind, old_status, new_status, actor, **slot):
+    """
+    An event row for appointment (the row as it was before the change).
+    kind: created, status, rescheduled or deleted; slot overrides
+    appointment_date / appointment_time / doctor_name with the new values.
+    """
+    return {
+        "appointment_id": appointment.get("id"),
+        "patient_id": appointment.get("patient_id"),
+        "user_email": appointment.get("user_email"),
+        "doctor_name": slot.get("doctor_name", appointment.get("doctor_name")),
+        "appointment_date": str(slot.get("appointment_date", appointment.get("appointment_date")))[:10],
+        "appointment_time": slot.get("appointment_time", appointment.get("appointment_time")),
+        "kind": kind,
+        "old_status": old_status,
+        "new_status": new_status,
+        "actor_id": actor.get("actor_id"),
+        "actor_role": actor.get("actor_role"),
+    }
+
+
+def status_events(appointments, new_status, actor):
+    """Status events for appointments (rows before the change) moving to new_status."""
+    return [event(a, "status", a.get("status"), new_status, actor) for a in appointments]
+
+
+def log_events(events):
+    """Appends the events with one insert."""
+    events = [e for e in events if e.get("appointment_id") is not None]
+    if not events:
+        return
+    try:
+        supabase.table(TABLE).insert(events).execute()
+    except Exception as e:
+        print(f"Could not log {len(events)} appointment event(s): {e}")
+
+
+def settled_horizon():
+    """created_at up to which every event has committed."""
+    horizon = datetime.now(timezone.utc) - timedelta(seconds=settings.EVENTS_SETTLE_SECONDS)
+    return horizon.strftime("%Y-%m-%dT%H:%M:%S.%fZ")
+
+
+def events_after(cursor=0, patient_id=None, limit=100):
+    """Settled events with id > cursor, oldest first; only patient_id's when given."""
+    # Uncached: the horizon makes every poll a different query
+    query = supabase.uncached.table(TABLE).select(FEED_COLUMNS)\
+        .gt("id", cursor or 0)\
+        .lte("created_at", settled_horizon())
+    if patient_id is not None:
+        query = query.eq("patient_id", patient_id)
+    return query.order("id").limit(limit).execute().data or []
+
+
+def latest_events(patient_id, limit=5):
+    """patient_id's most recent events, newest first."""
+    return supabase.table(TABLE).select(FEED_COLUMNS).eq("patient_id", patient_id)\
+        .order("id", desc=True).limit(limit).execute().data or []
+
+
+def unread_count(patient_id, read_id, cap=99):
+    """How many of patient_id's events are after read_id (counted up to cap)."""
+    return len(supabase.table(TABLE).select("id").eq("patient_id", patient_id)
+               .gt("id", read_id or 0).limit(cap).execute().data or [])
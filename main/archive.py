@@ -0,0 +1,106 @@
+"""
+Cold storage for finished appointments.
+
+"python manage.py archive_appointments" moves Completed, Cancelled and
+Declined appointments dated more than ARCHIVE_AFTER_DAYS days ago, with
+their patient_records, into appointment_archive / patient_records_archive.
+Each batch of ARCHIVE_BATCH_SIZE is one call to the archive_appointments()
+SQL function (supabase/migrations/), so a batch moves in one transaction
+and a record is never in both places or in neither.
+
+The hot tables then only hold recent and open appointments. The history and
+patient records pages read the archive only when the user asks for older
+data (?archived=1), and merge it into the live rows.
+"""
+import time
+from datetime import date, timedelta
+from statistics import median
+
+from django.conf import settings
+
+from .supabase_client import supabase
+
+HOT_TABLES = ["appointment", "patient_records"]
+ARCHIVE_TABLES = ["appointment_archive", "patient_records_archive"]
+RECORD_COLUMNS = "*, user_id(first_name, last_name), appointment_id(doctor_name, appointment_date, status)"
+
+
+def cutoff_date(days=None):
+    return date.today() - timedelta(days=settings.ARCHIVE_AFTER_DAYS if days is None else days)
+
+
+def archive_batch(cutoff, batch_size):
+    """Moves one batch; returns (appointments, records) moved."""
+    rows = supabase.rpc(
+        "archive_appointments", {"cutoff": cutoff.isoformat(), "batch_size": batch_size}
+    ).execute().data or []
+    row = rows[0] if rows else {}
+    return row.get("appointments") or 0, row.get("records") or 0
+
+
+def invalidate():
+    """Drops cached reads of the tables an archive run changed (the RPC bypasses the cache)."""
+    for table in HOT_TABLES + ARCHIVE_TABLES:
+        supabase.invalidate(table)
+
+
+def archivable_count(cutoff):
+    return supabase.uncached.table("appointment").select("id", count="exact")\
+        .in_("status", ["Completed", "Cancelled", "Declined"])\
+        .lt("appointment_date", cutoff.isoformat())\
+        .limit(1).execute().count or 0
+
+
+def row_counts():
+    """{table: rows} for the hot and archive tables."""
+    counts = {}
+    for table in HOT_TABLES + ARCHIVE_TABLES:
+        try:
+            counts[table] = supabase.uncached.table(table).select("id", count="exact").limit(1).execute().count
+        except Exception as e:
+            print(f"Could not count {table}: {e}")
+            counts[table] = None
+    return counts
+
+
+def _hot_queries():
+    today = date.today().isoformat()
+    return {
+        # appointment_list_page
+        "appointment list": lambda: supabase.uncached.table("appointment").select("*")
+            .order("appointment_date").execute(),
+        # get_booked_times / booking conflict checks
+        "slot lookup": lambda: supabase.uncached.table("appointment").select("appointment_time")
+            .eq("appointment_date", today).execute(),
+        # patient_records_list_page
+        "patient records": lambda: supabase.uncached.table("patient_records").select(RECORD_COLUMNS)
+            .order("record_date", desc=True).execute(),
+    }
+
+
+def query_latencies(repeat=5):
+    """{query: median milliseconds} of the hot-table reads the busiest pages make."""
+    latencies = {}
+    for name, run in _hot_queries().items():
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            run()
+            timings.append((time.perf_counter() - started) * 1000)
+        latencies[name] = median(timings)
+    return latencies
+
+
+def archived_history(user_email):
+    """The patient's archived appointments, newest first."""
+    return supabase.table("appointment_archive").select("*").eq("user_email", user_email)\
+        .order("appointment_date", desc=True).execute().data or []
+
+
+def archived_records():
+    """Archived patient records, shaped like patient_records_list_page's rows."""
+    rows = supabase.table("patient_records_archive").select(RECORD_COLUMNS)\
+        .order("record_date", desc=True).execute().data or []
+    for row in rows:
+        row["archived"] = True
+    return rows
@@ -0,0 +1,315 @@
+"""
+Avatar upload pipeline.
+
+The request thread only validates the upload (size, real image format,
+pixel count; Pillow reads the header, not the whole image) and spools it
+chunk by chunk to a temporary file. Everything else runs on a per-process
+background pool, which deletes the spool file when done:
+
+- decode once, fix EXIF rotation, flatten transparency onto white;
+- crop / resize to every AVATAR_SIZES width (96px thumbnail, 400px profile);
+- encode each size as WebP and as a JPEG fallback;
+- upload the variants to the "avatars" bucket in parallel;
+- call on_stored(url) with the public URL of the largest JPEG, which the
+  views save in users.profile_image.
+
+Variants live next to each other (<prefix>/96.webp, <prefix>/400.jpg, ...)
+so the {% avatar %} template tag can build srcset URLs from that one URL,
+and delete_avatar() can drop a replaced avatar's whole folder. Whatever is
+left behind is reclaimed by `manage.py gc_avatars`.
+
+Pillow is optional: without it the original file is validated by its
+signature and uploaded unchanged, as before.
+"""
+import io
+import os
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:  # pragma: no cover - Pillow not installed
+    Image = None
+
+BUCKET = "avatars"
+CACHE_CONTROL = "31536000"  # paths are unique per upload, so cache for a year
+
+CONTENT_TYPES = {"JPEG": "image/jpeg", "PNG": "image/png", "GIF": "image/gif", "WEBP": "image/webp"}
+EXTENSIONS = {"JPEG": "jpg", "PNG": "png", "GIF": "gif", "WEBP": "webp"}
+SIGNATURES = (
+    (b"\xff\xd8\xff", "JPEG"),
+    (b"\x89PNG\r\n\x1a\n", "PNG"),
+    (b"GIF87a", "GIF"),
+    (b"GIF89a", "GIF"),
+)
+
+PUBLIC_PREFIX = f"/object/public/{BUCKET}/"
+VARIANT_URL = re.compile(r"^(?P<base>.+/" + BUCKET + r"/.+)/(?P<size>\d+)\.jpg$")
+
+
+class InvalidImage(Exception):
+    """Raised when an upload is not an acceptable image; the message is user-facing."""
+
+
+# ============================================================
+# VALIDATION
+# ============================================================
+def sniff_format(header):
+    for signature, image_format in SIGNATURES:
+        if header.startswith(signature):
+            return image_format
+    if header[:4] == b"RIFF" and header[8:12] == b"WEBP":
+        return "WEBP"
+    return None
+
+
+def validate(upload):
+    """Checks size and format of an UploadedFile; returns the image format."""
+    if upload.size > settings.AVATAR_MAX_UPLOAD_MB * 1024 * 1024:
+        raise InvalidImage(f"Images must be {settings.AVATAR_MAX_UPLOAD_MB} MB or smaller.")
+
+    if Image is None:
+        image_format = sniff_format(upload.read(12))
+        upload.seek(0)
+    else:
+        try:
+            with Image.open(upload) as image:
+                image_format = image.format
+                width, height = image.size
+        except (Image.DecompressionBombError, OSError):
+            image_format = None
+        else:
+            if width * height > settings.AVATAR_MAX_PIXELS:
+                raise InvalidImage("That image is too large. Please upload a smaller photo.")
+        upload.seek(0)
+
+    if image_format not in CONTENT_TYPES:
+        raise InvalidImage("Please upload a JPEG, PNG, GIF or WebP image.")
+    return image_format
+
+
+# ============================================================
+# RESIZING
+# ============================================================
+def render_variants(source):
+    """Returns [(filename, bytes, content_type)] for every size and format; source is a path or file."""
+    largest = settings.AVATAR_SIZES[-1]
+    with Image.open(source) as image:
+        # JPEG can decode at 1/2, 1/4, 1/8 scale; no need for all 12 megapixels
+        image.draft("RGB", (largest * 2, largest * 2))
+        image = ImageOps.exif_transpose(image)
+        if image.mode in ("RGBA", "LA", "P"):
+            rgba = image.convert("RGBA")
+            image = Image.new("RGB", rgba.size, "white")
+            image.paste(rgba, mask=rgba.getchannel("A"))
+        else:
+            image = image.convert("RGB")
+
+        variants = []
+        for size in settings.AVATAR_SIZES:
+            resized = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+            for image_format, options in (
+                ("WEBP", {"quality": settings.AVATAR_WEBP_QUALITY, "method": 4}),
+                ("JPEG", {"quality": settings.AVATAR_JPEG_QUALITY, "optimize": True, "progressive": True}),
+            ):
+                buffer = io.BytesIO()
+                resized.save(buffer, image_format, **options)
+                variants.append((f"{size}.{EXTENSIONS[image_format]}", buffer.getvalue(), CONTENT_TYPES[image_format]))
+    return variants
+
+
+def variant_urls(url):
+    """{size: {"webp": url, "jpg": url}} for a pipeline URL, or None for a legacy one."""
+    match = VARIANT_URL.match(url or "")
+    if not match:
+        return None
+    base = match.group("base")
+    return {size: {"webp": f"{base}/{size}.webp", "jpg": f"{base}/{size}.jpg"} for size in settings.AVATAR_SIZES}
+
+
+def object_path(url):
+    """Path inside the bucket of a public avatar URL, or None for other URLs."""
+    if not url or PUBLIC_PREFIX not in url:
+        return None
+    return url.split(PUBLIC_PREFIX, 1)[1].split("?", 1)[0]
+
+
+def avatar_folder(url):
+    """Folder holding all variants of a pipeline avatar, or None for a legacy single file."""
+    path = object_path(url)
+    if path and VARIANT_URL.match(url):
+        return path.rsplit("/", 1)[0]
+    return None
+
+
+# ============================================================
+# BACKGROUND PROCESSING
+# ============================================================
+class AvatarPipeline:
+    def __init__(self, workers, upload_workers):
+        self.workers = workers
+        self.upload_workers = upload_workers
+        self._lock = threading.Lock()
+        self._pid = None
+        self._jobs = None
+        self._uploads = None
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.deleted_objects = 0
+        self.process_total = 0.0
+        self.upload_total = 0.0
+
+    def _executors(self):
+        # Threads do not survive a fork; build the pools in each worker
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._jobs = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="avatar")
+                    self._uploads = ThreadPoolExecutor(max_workers=self.upload_workers, thread_name_prefix="avatar-upload")
+                    self._pid = os.getpid()
+        return self._jobs, self._uploads
+
+    def submit(self, upload, prefix, on_stored):
+        """
+        Validates upload (raises InvalidImage) and queues it. prefix names the
+        folder in the bucket; on_stored(url) runs on the pool once all
+        variants are uploaded. Returns the Future of the job.
+        """
+        image_format = validate(upload)
+        spool_path = self._spool(upload)
+        jobs, _ = self._executors()
+        with self._lock:
+            self.submitted += 1
+            self.bytes_in += upload.size
+        return jobs.submit(self._run, spool_path, image_format, f"{prefix}_{int(time.time())}", on_stored)
+
+    def _spool(self, upload):
+        # The UploadedFile is gone once the request ends; copy it in chunks
+        # (never the whole file in memory) to a file the job owns
+        limit = settings.AVATAR_MAX_UPLOAD_MB * 1024 * 1024
+        written = 0
+        with tempfile.NamedTemporaryFile(prefix="avatar-", delete=False) as spool:
+            for chunk in upload.chunks():
+                written += len(chunk)
+                if written > limit:
+                    spool.close()
+                    os.unlink(spool.name)
+                    raise InvalidImage(f"Images must be {settings.AVATAR_MAX_UPLOAD_MB} MB or smaller.")
+                spool.write(chunk)
+        return spool.name
+
+    def _run(self, spool_path, image_format, folder, on_stored):
+        from .supabase_client import supabase
+
+        try:
+            started = time.monotonic()
+            bucket = supabase.storage.from_(BUCKET)
+
+            if Image is None:
+                # Streamed from the spool file as-is
+                name = f"original.{EXTENSIONS[image_format]}"
+                with open(spool_path, "rb") as original:
+                    processed = time.monotonic()
+                    bucket.upload(
+                        file=original,
+                        path=f"{folder}/{name}",
+                        file_options={"content-type": CONTENT_TYPES[image_format], "cache-control": CACHE_CONTROL},
+                    )
+                bytes_out = os.path.getsize(spool_path)
+            else:
+                variants = render_variants(spool_path)
+                name = f"{settings.AVATAR_SIZES[-1]}.jpg"
+                processed = time.monotonic()
+
+                def upload(variant):
+                    filename, content, content_type = variant
+                    bucket.upload(
+                        file=content,
+                        path=f"{folder}/{filename}",
+                        file_options={"content-type": content_type, "cache-control": CACHE_CONTROL},
+                    )
+
+                _, uploads = self._executors()
+                list(uploads.map(upload, variants))
+                bytes_out = sum(len(content) for _, content, _ in variants)
+            uploaded = time.monotonic()
+
+            on_stored(bucket.get_public_url(f"{folder}/{name}"))
+            with self._lock:
+                self.completed += 1
+                self.bytes_out += bytes_out
+                self.process_total += processed - started
+                self.upload_total += uploaded - processed
+        except Exception as e:
+            with self._lock:
+                self.failed += 1
+            print(f"Avatar processing failed for {folder}: {e}")
+            raise
+        finally:
+            os.unlink(spool_path)
+
+    def delete(self, url):
+        """Queues removal of every object behind an avatar URL (no-op for other URLs)."""
+        if not object_path(url):
+            return None
+        jobs, _ = self._executors()
+        return jobs.submit(self._delete, url)
+
+    def _delete(self, url):
+        from .supabase_client import supabase
+
+        try:
+            bucket = supabase.storage.from_(BUCKET)
+            folder = avatar_folder(url)
+            if folder:
+                paths = [f"{folder}/{item['name']}" for item in bucket.list(folder, {"limit": 1000})]
+            else:
+                paths = [object_path(url)]
+            if paths:
+                bucket.remove(paths)
+            with self._lock:
+                self.deleted_objects += len(paths)
+        except Exception as e:
+            # Not fatal: gc_avatars picks up whatever is left behind
+            print(f"Avatar cleanup failed for {url}: {e}")
+
+    def stats(self):
+        done = self.completed or 1
+        return {
+            "pillow": Image is not None,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "queued": self.submitted - self.completed - self.failed,
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "deleted_objects": self.deleted_objects,
+            "avg_process_ms": round(self.process_total / done * 1000, 2),
+            "avg_upload_ms": round(self.upload_total / done * 1000, 2),
+        }
+
+
+avatar_pipeline = AvatarPipeline(
+    workers=settings.AVATAR_WORKERS,
+    upload_workers=settings.AVATAR_UPLOAD_WORKERS,
+)
+
+
+def store_avatar(upload, prefix, on_stored):
+    return avatar_pipeline.submit(upload, prefix, on_stored)
+
+
+def delete_avatar(url):
+    return avatar_pipeline.delete(url)
+
+
+def avatar_stats():
+    return avatar_pipeline.stats()
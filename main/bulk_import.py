@@ -0,0 +1,247 @@
+"""
+Bulk import of patients, doctors and staff from CSV.
+
+    with open("clinic.csv", newline="", encoding="utf-8-sig") as f:
+        result = import_users(f, report=writer.writerow)
+
+Columns: first_name, last_name, email, role (patient / doctor / staff,
+default patient), specialization (doctors only), password (optional).
+
+The file is read row by row and handled in batches of IMPORT_BATCH_SIZE:
+1. rows are validated; duplicate emails within the file are caught with a
+   set of the emails seen so far;
+2. emails already registered are found with one call per batch (rpc
+   registered_emails, case-insensitive like the in-file check) instead of
+   one SELECT per row;
+3. passwords are hashed on a process pool of IMPORT_HASH_WORKERS, or on the
+   executor passed in (the admin upload hashes on the login hashing pool,
+   see password_utils.HashPoolExecutor; a batch it turns away as busy is
+   reported as skipped). Rows without a password get a random temporary
+   one, returned in the report so it can be handed to the person;
+4. users are inserted with one multi-row insert, and doctors rows for the
+   new doctors with another. If a batch insert fails, its rows are retried
+   one at a time so the failure is attributed to the right row.
+
+report(entry) is called once per data row with {"line", "email", "status",
+"detail", "temporary_password"}; status is created, duplicate, invalid,
+failed or skipped.
+
+With a deadline (time.monotonic() value), batches that have not started by
+then are reported as skipped instead of imported, so a web request ends
+before the worker timeout and every created user's temporary password is
+in the report.
+"""
+import csv
+import multiprocessing
+import secrets
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+
+from .password_utils import HashingBusy
+from .supabase_client import supabase
+
+FIELDS = ["first_name", "last_name", "email", "role", "specialization", "password"]
+REPORT_FIELDS = ["line", "email", "status", "detail", "temporary_password"]
+
+# role -> (is_doctor, is_admin), as register_page / register_admin_page set them
+ROLES = {
+    "patient": (False, False),
+    "doctor": (True, False),
+    "staff": (False, True),
+}
+
+
+def _init_worker():
+    django.setup()
+
+
+def _hash(password):
+    return make_password(password)
+
+
+class ImportResult:
+    def __init__(self):
+        self.rows = 0
+        self.counts = {"created": 0, "duplicate": 0, "invalid": 0, "failed": 0, "skipped": 0}
+        self.timings = {"parse": 0.0, "lookup": 0.0, "hash": 0.0, "insert": 0.0}
+        self.started = time.monotonic()
+        self.elapsed = 0.0
+
+    @property
+    def rows_per_second(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def summary(self):
+        counts = ", ".join(f"{n} {status}" for status, n in self.counts.items())
+        stages = ", ".join(f"{stage} {seconds:.1f}s" for stage, seconds in self.timings.items())
+        return f"{self.rows} rows in {self.elapsed:.1f}s ({self.rows_per_second:,.0f}/s): {counts} [{stages}]"
+
+
+def clean_row(row):
+    """(fields, None) for a usable CSV row, or (None, reason)."""
+    fields = {f: (row.get(f) or "").strip() for f in FIELDS}
+    fields["role"] = fields["role"].lower() or "patient"
+    if not fields["first_name"] or not fields["last_name"] or not fields["email"]:
+        return None, "first_name, last_name and email are required"
+    try:
+        validate_email(fields["email"])
+    except ValidationError:
+        return None, "invalid email"
+    if fields["role"] not in ROLES:
+        return None, f"unknown role {fields['role']!r} (patient, doctor or staff)"
+    if fields["role"] == "doctor" and not fields["specialization"]:
+        return None, "doctors need a specialization"
+    return fields, None
+
+
+class Importer:
+    def __init__(self, report, batch_size=None, hash_workers=None, dry_run=False, executor=None, deadline=None):
+        self.report = report
+        self.batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+        self.hash_workers = hash_workers or settings.IMPORT_HASH_WORKERS
+        self.dry_run = dry_run
+        self.executor = executor
+        self.deadline = deadline
+        self.result = ImportResult()
+        self._seen = set()
+
+    def _emit(self, line, email, status, detail="", temporary_password=""):
+        self.result.counts[status] += 1
+        self.report({
+            "line": line, "email": email, "status": status,
+            "detail": detail, "temporary_password": temporary_password,
+        })
+
+    def run(self, lines):
+        if self.executor is not None:
+            return self._run(lines, self.executor)
+        # Spawned, not forked: the caller may be a threaded web worker
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(self.hash_workers, mp_context=context, initializer=_init_worker) as pool:
+            return self._run(lines, pool)
+
+    def _run(self, lines, pool):
+        reader = csv.DictReader(lines)
+        missing = {"first_name", "last_name", "email"} - set(reader.fieldnames or ())
+        if missing:
+            raise ValueError(f"CSV is missing the column(s): {', '.join(sorted(missing))}")
+        numbered = enumerate(reader, start=2)  # line 1 is the header
+        while True:
+            started = time.monotonic()
+            batch = list(islice(numbered, self.batch_size))
+            self.result.timings["parse"] += time.monotonic() - started
+            if not batch:
+                break
+            self.result.rows += len(batch)
+            if self.deadline is not None and time.monotonic() >= self.deadline:
+                for line, row in batch:
+                    self._emit(line, (row.get("email") or "").strip(), "skipped", "time limit reached; upload again")
+                continue
+            self._import_batch(batch, pool)
+        self.result.elapsed = time.monotonic() - self.result.started
+        return self.result
+
+    def _import_batch(self, batch, pool):
+        started = time.monotonic()
+        valid = []
+        for line, row in batch:
+            fields, error = clean_row(row)
+            if error:
+                self._emit(line, (row.get("email") or "").strip(), "invalid", error)
+            elif fields["email"].lower() in self._seen:
+                self._emit(line, fields["email"], "duplicate", "email appears earlier in the file")
+            else:
+                self._seen.add(fields["email"].lower())
+                valid.append((line, fields))
+        self.result.timings["parse"] += time.monotonic() - started
+        if not valid:
+            return
+
+        started = time.monotonic()
+        emails = [fields["email"] for _, fields in valid]
+        existing = supabase.rpc("registered_emails", {"emails": emails}).execute().data or []
+        registered = {email.lower() for email in existing}
+        self.result.timings["lookup"] += time.monotonic() - started
+
+        new = []
+        for line, fields in valid:
+            if fields["email"].lower() in registered:
+                self._emit(line, fields["email"], "duplicate", "email already registered")
+            else:
+                new.append((line, fields))
+        if not new:
+            return
+
+        started = time.monotonic()
+        temporary = {}
+        passwords = []
+        for line, fields in new:
+            if not fields["password"]:
+                temporary[line] = fields["password"] = secrets.token_urlsafe(9)
+            passwords.append(fields["password"])
+        chunksize = max(1, len(passwords) // (self.hash_workers * 4))
+        try:
+            hashes = list(pool.map(_hash, passwords, chunksize=chunksize))
+        except HashingBusy:
+            for line, fields in new:
+                self._emit(line, fields["email"], "skipped", "server busy hashing passwords; upload again")
+            return
+        finally:
+            self.result.timings["hash"] += time.monotonic() - started
+
+        started = time.monotonic()
+        rows = []
+        for (line, fields), hashed in zip(new, hashes):
+            is_doctor, is_admin = ROLES[fields["role"]]
+            rows.append((line, fields, {
+                "first_name": fields["first_name"],
+                "last_name": fields["last_name"],
+                "email": fields["email"],
+                "password": hashed,
+                "is_admin": is_admin,
+                "is_doctor": is_doctor,
+                "is_superadmin": False,
+            }))
+        if self.dry_run:
+            for line, fields, _ in rows:
+                self._emit(line, fields["email"], "created", "dry run", temporary.get(line, ""))
+        else:
+            try:
+                self._insert(rows, temporary)
+            except Exception as e:
+                print(f"Batch insert failed, retrying row by row: {e}")
+                for row in rows:
+                    try:
+                        self._insert([row], temporary)
+                    except Exception as row_error:
+                        self._emit(row[0], row[1]["email"], "failed", str(row_error))
+        self.result.timings["insert"] += time.monotonic() - started
+
+    def _insert(self, rows, temporary):
+        inserted = supabase.table("users").insert([user for _, _, user in rows]).execute().data or []
+        ids = {row["email"]: row["id"] for row in inserted}
+        doctors = [
+            {"doctor_id": ids[fields["email"]], "specialization": fields["specialization"]}
+            for _, fields, _ in rows if fields["role"] == "doctor"
+        ]
+        if doctors:
+            try:
+                supabase.table("doctors").insert(doctors).execute()
+            except Exception:
+                # Undo the users insert so the row-by-row retry starts clean
+                supabase.table("users").delete().in_("id", list(ids.values())).execute()
+                raise
+        for line, fields, _ in rows:
+            self._emit(line, fields["email"], "created", "", temporary.get(line, ""))
+
+
+def import_users(lines, report, batch_size=None, hash_workers=None, dry_run=False, executor=None, deadline=None):
+    """Imports the CSV text lines; returns an ImportResult."""
+    return Importer(report, batch_size, hash_workers, dry_run, executor, deadline).run(lines)
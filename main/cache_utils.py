@@ -0,0 +1,73 @@
+"""
+Cache invalidation that reaches every worker process.
+
+Each cached namespace (a table, a user's pages, ...) has a version counter in
+the default cache. Cached entries are stored under keys that include the
+version, so bumping the counter invalidates the namespace for every worker at
+once. With LocMemCache the counters are per process, which is still correct
+for a single worker; with a shared backend (sqlite, redis, memcached) the bump
+is seen by all workers on their next read.
+
+A management command that bumps versions runs in its own process, so its
+bumps only reach the web workers through a shared backend; such commands
+call require_shared_cache() before writing.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+VERSION_PREFIX = "version"
+MODIFIED_PREFIX = "modified"
+
+
+def _version_key(namespace):
+    return f"{VERSION_PREFIX}:{namespace}"
+
+
+def _modified_key(namespace):
+    return f"{MODIFIED_PREFIX}:{namespace}"
+
+
+def get_version(namespace):
+    """Current version of namespace, creating the counter if needed."""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock rather than 1, so a counter that was evicted
+        # and recreated never repeats a version an old entry was stored under.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key, 0)
+    return version
+
+
+def bump_version(namespace):
+    """Invalidates everything cached under namespace, on every worker."""
+    key = _version_key(namespace)
+    cache.set(_modified_key(namespace), time.time(), None)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        cache.add(key, time.time_ns(), None)
+        return cache.get(key, 0)
+
+
+def last_modified(namespace):
+    """Unix time of the last bump of namespace seen by this cache, or None."""
+    return cache.get(_modified_key(namespace))
+
+
+def versioned_key(namespace, *parts):
+    """Cache key for parts that changes whenever namespace is bumped."""
+    suffix = ":".join(str(p) for p in parts)
+    return f"{namespace}:v{get_version(namespace)}:{suffix}"
+
+
+def require_shared_cache(command):
+    """Raises ValueError if the default cache is per process (locmem), where command's bumps would be lost."""
+    if settings.CACHES["default"]["BACKEND"].endswith(".LocMemCache"):
+        raise ValueError(
+            f"{command} invalidates cached pages and queries, which never reaches the web workers "
+            "with CACHE_BACKEND=locmem; run it with the CACHE_BACKEND the web server uses "
+            "(sqlite or file on the same host, redis or memcached)"
+        )
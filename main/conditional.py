@@ -0,0 +1,98 @@
+"""
+Conditional GET for pages and JSON endpoints that read whole tables.
+
+    @conditional_on_tables("users", "doctors")
+    def all_doctors(request): ...
+
+The validators come from the table version counters kept by cache_utils
+(bumped by every write through main.supabase_client) plus a time bucket of
+the tables' query-cache TTL, which bounds changes made outside the app.
+Computing them costs a few cache reads and no Supabase query, so a browser
+revalidating with If-None-Match / If-Modified-Since gets its 304 before the
+view runs any query or template.
+
+The ETag also covers the path with its query string, the session keys the
+pages render differently for, and the CSRF cookie (forms embed a token for
+it). Requests with pending flash messages are not made conditional.
+"""
+import hashlib
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+from .cache_utils import get_version, last_modified
+
+SESSION_KEYS = ("user_id", "role", "is_doctor")
+
+_stats_lock = threading.Lock()
+_stats = defaultdict(lambda: {"full": 0, "not_modified": 0})
+
+
+def conditional_stats():
+    with _stats_lock:
+        return {view: dict(counts) for view, counts in _stats.items()}
+
+
+def table_ttl(tables):
+    return min(settings.SUPABASE_CACHE_TABLE_TTLS.get(t, settings.SUPABASE_CACHE_TTL) for t in tables)
+
+
+def validators(request, view_name, tables):
+    """(ETag, Last-Modified datetime) for request, or (None, None) to skip."""
+    if len(get_messages(request)):
+        return None, None
+
+    ttl = table_ttl(tables)
+    bucket = math.floor(time.time() / ttl)
+    parts = [
+        view_name,
+        request.get_full_path(),
+        bucket,
+        *(get_version(f"table:{t}") for t in tables),
+        *(request.session.get(k) for k in SESSION_KEYS),
+        request.COOKIES.get(settings.CSRF_COOKIE_NAME, ""),
+    ]
+    etag = hashlib.sha256("|".join(str(p) for p in parts).encode()).hexdigest()[:32]
+
+    modified = [bucket * ttl] + [m for m in (last_modified(f"table:{t}") for t in tables) if m]
+    return f'"{etag}"', datetime.fromtimestamp(math.ceil(max(modified)), tz=timezone.utc)
+
+
+def conditional_on_tables(*tables):
+    """Answers If-None-Match / If-Modified-Since with 304 while tables are unchanged."""
+    def decorator(view_func):
+        view_name = view_func.__name__
+
+        def compute(request):
+            if not hasattr(request, "_conditional_validators"):
+                request._conditional_validators = validators(request, view_name, tables)
+            return request._conditional_validators
+
+        def etag_func(request, *args, **kwargs):
+            return compute(request)[0]
+
+        def last_modified_func(request, *args, **kwargs):
+            return compute(request)[1]
+
+        conditional_view = condition(etag_func=etag_func, last_modified_func=last_modified_func)(view_func)
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            response = conditional_view(request, *args, **kwargs)
+            if request.method in ("GET", "HEAD"):
+                with _stats_lock:
+                    _stats[view_name]["not_modified" if response.status_code == 304 else "full"] += 1
+                # Always revalidate; without this browsers may reuse the page
+                # heuristically from Last-Modified
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
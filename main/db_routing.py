@@ -0,0 +1,124 @@
+"""
+Read routing between the primary database and an optional read replica.
+
+Primary-only is the default: with SUPABASE_REPLICA_URL (Supabase) and
+DATABASE_REPLICA_URL (Django's own database) empty, everything below is a
+no-op.
+
+When a replica is configured, only the views decorated with @replica_reads
+(the heavy admin pages: patient records, user management, exports, the
+admin dashboard counts) send their reads there:
+- reads made through supabase.table() inside such a view go to the replica
+  endpoint; if it is unreachable they fall back to the primary;
+- Django ORM reads go to DATABASES["replica"] through ReplicaRouter;
+- writes always go to the primary.
+
+Read-your-writes: when a request writes through the Supabase wrapper,
+PrimaryPinMiddleware pins the session to the primary for
+REPLICA_PIN_SECONDS, so the next pages that user loads are not served from
+a replica that has not caught up yet.
+"""
+import threading
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+
+PIN_SESSION_KEY = "_primary_pin_until"
+
+_state = threading.local()
+_stats_lock = threading.Lock()
+_stats = {"replica_reads": 0, "replica_fallbacks": 0, "pinned_requests": 0, "pins": 0}
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def routing_stats():
+    with _stats_lock:
+        return {"replica_configured": replica_configured(), **_stats}
+
+
+def replica_configured():
+    return bool(settings.SUPABASE_REPLICA_URL) or "replica" in settings.DATABASES
+
+
+def replica_allowed():
+    """True while a @replica_reads view runs for a session that is not pinned."""
+    return getattr(_state, "replica", False)
+
+
+def note_write():
+    """Called by the Supabase wrapper after every write it sends."""
+    _state.wrote = True
+
+
+def count_replica_read(fallback=False):
+    _count("replica_fallbacks" if fallback else "replica_reads")
+
+
+def is_pinned(request):
+    session = getattr(request, "session", None)
+    return session is not None and session.get(PIN_SESSION_KEY, 0) > time.time()
+
+
+@contextmanager
+def replica_reads_for(request):
+    """Routes this thread's designated reads to the replica, unless the session is pinned."""
+    previous = getattr(_state, "replica", False)
+    pinned = is_pinned(request)
+    if pinned:
+        _count("pinned_requests")
+    _state.replica = replica_configured() and not pinned
+    try:
+        yield _state.replica
+    finally:
+        _state.replica = previous
+
+
+def replica_reads(view_func):
+    """Marks a read-heavy view whose queries may be served by the replica."""
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        with replica_reads_for(request):
+            return view_func(request, *args, **kwargs)
+    return wrapper
+
+
+class PrimaryPinMiddleware:
+    """Pins the session to the primary for a while after a request that wrote."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.wrote = False
+        _state.replica = False
+        response = self.get_response(request)
+        if _state.wrote and replica_configured() and hasattr(request, "session"):
+            request.session[PIN_SESSION_KEY] = time.time() + settings.REPLICA_PIN_SECONDS
+            _count("pins")
+        _state.wrote = False
+        return response
+
+
+class ReplicaRouter:
+    """Django database router: designated reads to "replica", everything else to "default"."""
+
+    def db_for_read(self, model, **hints):
+        if replica_allowed() and "replica" in settings.DATABASES:
+            return "replica"
+        return "default"
+
+    def db_for_write(self, model, **hints):
+        return "default"
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == "default"
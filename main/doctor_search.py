@@ -0,0 +1,296 @@
+"""
+In-process typeahead index over doctor names and specializations.
+
+    search_doctors("cardiolgy")  ->  [{"id", "name", "specialization", "is_in", "score"}, ...]
+
+Every worker keeps its own index; for a few thousand doctors it is a few
+MB and a query takes well under a millisecond (python manage.py benchmark
+search). Matching is per word, on three structures:
+
+- a sorted vocabulary, bisected for prefix matches ("car" -> "cardiology");
+- trigram postings (trigram -> words) for typos ("cardiolgy" -> "cardiology"),
+  scored by the Dice coefficient of the two words' trigram sets;
+- word postings (word -> doctor ids).
+
+Every query word has to match a word of the doctor, exactly, as a prefix or
+fuzzily; the best match per query word adds to the doctor's score.
+
+The index follows the doctors table version and a doctor list version
+(see cache_utils) that the views bump with bump_doctors() when they change
+a doctor's users row: a name edit, an in/out toggle, a deletion. Patient
+registrations and edits also write the users table, but leave the index
+alone. When either version changed, or after the doctors cache TTL, the
+next search re-reads the doctor list (one query) and re-indexes only the
+doctors that were added, removed or changed.
+"""
+import bisect
+import heapq
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+
+from .cache_utils import bump_version, get_version
+from .supabase_client import supabase
+
+# Bumped for writes to users rows of doctors (see bump_doctors)
+DOCTORS_NAMESPACE = "doctor_list"
+
+# Query words that never narrow the result ("Dr. Santos")
+STOP_WORDS = {"dr", "doc", "doctor"}
+
+MIN_FUZZY_LENGTH = 3
+MIN_SIMILARITY = 0.5
+
+EXACT_SCORE = 1.0
+PREFIX_SCORE = 0.9
+FUZZY_WEIGHT = 0.8
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text):
+    """Lower-case words with accents stripped: "Peña-Cruz" -> ["pena", "cruz"]."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(c for c in text if not unicodedata.combining(c))
+    return _WORD.findall(text.lower())
+
+
+def trigrams(word):
+    padded = f"  {word} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def specialization_of(row):
+    """The specialization of a users row with an embedded doctors(...) relation."""
+    doctors = row.get("doctors")
+    if isinstance(doctors, list):
+        doctors = doctors[0] if doctors else None
+    return (doctors or {}).get("specialization")
+
+
+class DoctorSearchIndex:
+    def __init__(self):
+        self._docs = {}          # doctor id -> document
+        self._word_docs = {}     # word -> {doctor id}
+        self._gram_words = {}    # trigram -> {word}
+        self._vocabulary = []    # sorted words, for prefix lookups
+        self._lock = threading.RLock()
+        self._refresh_lock = threading.Lock()
+        self._versions = None
+        self._loaded_at = 0.0
+        self.loads = 0
+        self.updated_docs = 0
+        self.searches = 0
+        self.search_seconds = 0.0
+
+    # ------------------------------------------------------------
+    # INDEXING
+    # ------------------------------------------------------------
+    def _add(self, doc):
+        self._docs[doc["id"]] = doc
+        for word in doc["words"]:
+            ids = self._word_docs.get(word)
+            if ids is None:
+                ids = self._word_docs[word] = set()
+                bisect.insort(self._vocabulary, word)
+                for gram in trigrams(word):
+                    self._gram_words.setdefault(gram, set()).add(word)
+            ids.add(doc["id"])
+
+    def _remove(self, doctor_id):
+        doc = self._docs.pop(doctor_id, None)
+        if doc is None:
+            return
+        for word in doc["words"]:
+            ids = self._word_docs[word]
+            ids.discard(doctor_id)
+            if ids:
+                continue
+            del self._word_docs[word]
+            del self._vocabulary[bisect.bisect_left(self._vocabulary, word)]
+            for gram in trigrams(word):
+                words = self._gram_words[gram]
+                words.discard(word)
+                if not words:
+                    del self._gram_words[gram]
+
+    def update(self, doctors):
+        """
+        Makes the index match doctors (dicts with id, first_name, last_name,
+        specialization, is_in), touching only the ones that differ.
+        Returns the number of doctors added, changed or removed.
+        """
+        with self._lock:
+            changed = 0
+            seen = set()
+            for d in doctors:
+                doctor_id = d["id"]
+                seen.add(doctor_id)
+                name = f"{d['first_name']} {d['last_name']}"
+                is_in = bool(d.get("is_in", True))
+                current = self._docs.get(doctor_id)
+                if (current is not None and current["name"] == name
+                        and current["specialization"] == d["specialization"] and current["is_in"] == is_in):
+                    continue
+                self._remove(doctor_id)
+                self._add({
+                    "id": doctor_id,
+                    "name": name,
+                    "specialization": d["specialization"],
+                    "is_in": is_in,
+                    "words": tuple(dict.fromkeys(normalize(f"{name} {d['specialization']}"))),
+                })
+                changed += 1
+            for doctor_id in self._docs.keys() - seen:
+                self._remove(doctor_id)
+                changed += 1
+            self.updated_docs += changed
+            return changed
+
+    # ------------------------------------------------------------
+    # SEARCH
+    # ------------------------------------------------------------
+    def _matches(self, term):
+        """{word: similarity} for every indexed word that term matches."""
+        matches = {}
+        if term in self._word_docs:
+            matches[term] = EXACT_SCORE
+
+        vocabulary = self._vocabulary
+        for i in range(bisect.bisect_left(vocabulary, term), len(vocabulary)):
+            if not vocabulary[i].startswith(term):
+                break
+            matches.setdefault(vocabulary[i], PREFIX_SCORE)
+
+        if len(term) >= MIN_FUZZY_LENGTH:
+            grams = trigrams(term)
+            shared = Counter()
+            for gram in grams:
+                shared.update(self._gram_words.get(gram, ()))
+            for word, count in shared.items():
+                if word in matches:
+                    continue
+                similarity = 2 * count / (len(grams) + len(word) + 1)  # a word has len + 1 trigrams
+                if similarity >= MIN_SIMILARITY:
+                    matches[word] = FUZZY_WEIGHT * similarity
+        return matches
+
+    def search(self, query, limit=8, available_only=False):
+        started = time.perf_counter()
+        terms = [t for t in dict.fromkeys(normalize(query)) if t not in STOP_WORDS]
+        if not terms:
+            return []
+
+        with self._lock:
+            scores = None
+            for term in terms:
+                # Weakest matches first, so a doctor ends up with its best one
+                best = {}
+                for word, similarity in sorted(self._matches(term).items(), key=lambda m: m[1]):
+                    best.update(dict.fromkeys(self._word_docs[word], similarity))
+                if scores is None:
+                    scores = best
+                else:
+                    scores = {i: s + best[i] for i, s in scores.items() if i in best}
+                if not scores:
+                    break
+
+            docs = (self._docs[i] for i in scores or ())
+            if available_only:
+                docs = (d for d in docs if d["is_in"])
+            ranked = heapq.nsmallest(
+                limit, docs, key=lambda d: (-scores[d["id"]], not d["is_in"], d["name"])
+            )
+            results = [
+                {
+                    "id": d["id"],
+                    "name": d["name"],
+                    "specialization": d["specialization"],
+                    "is_in": d["is_in"],
+                    "score": round(scores[d["id"]] / len(terms), 3),
+                }
+                for d in ranked
+            ]
+
+        self.searches += 1
+        self.search_seconds += time.perf_counter() - started
+        return results
+
+    # ------------------------------------------------------------
+    # REFRESH
+    # ------------------------------------------------------------
+    def refresh_if_stale(self):
+        versions = (get_version(DOCTORS_NAMESPACE), get_version("table:doctors"))
+        max_age = settings.SUPABASE_CACHE_TABLE_TTLS.get("doctors", settings.SUPABASE_CACHE_TTL)
+        if versions == self._versions and time.monotonic() - self._loaded_at < max_age:
+            return
+        # Only the first load makes searches wait; later refreshes run in
+        # one thread while the others keep answering from the current index
+        if not self._refresh_lock.acquire(blocking=self._versions is None):
+            return
+        try:
+            if versions == self._versions and time.monotonic() - self._loaded_at < max_age:
+                return
+            doctors = fetch_doctors()
+            self.update(doctors)
+            self._versions = versions
+            self._loaded_at = time.monotonic()
+            self.loads += 1
+        except Exception as e:
+            print("Error refreshing doctor search index:", e)
+        finally:
+            self._refresh_lock.release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "doctors": len(self._docs),
+                "words": len(self._word_docs),
+                "trigrams": len(self._gram_words),
+                "loads": self.loads,
+                "updated_docs": self.updated_docs,
+                "searches": self.searches,
+                "mean_search_ms": (
+                    round(self.search_seconds / self.searches * 1000, 3) if self.searches else None
+                ),
+            }
+
+
+def bump_doctors():
+    """Call after changing a doctor's users row, so every worker's index picks it up."""
+    bump_version(DOCTORS_NAMESPACE)
+
+
+def fetch_doctors():
+    """Every doctor with a specialization, as the booking pages list them."""
+    response = supabase.table("users").select(
+        "id, first_name, last_name, is_in, doctors(specialization)"
+    ).eq("is_doctor", True).execute()
+    doctors = []
+    for row in response.data or []:
+        specialization = specialization_of(row)
+        if specialization:
+            doctors.append({
+                "id": row["id"],
+                "first_name": row["first_name"],
+                "last_name": row["last_name"],
+                "is_in": row.get("is_in", True),
+                "specialization": specialization,
+            })
+    return doctors
+
+
+_index = DoctorSearchIndex()
+
+
+def search_doctors(query, limit=8, available_only=False):
+    _index.refresh_if_stale()
+    return _index.search(query, limit=limit, available_only=available_only)
+
+
+def search_stats():
+    return _index.stats()
@@ -1,6 +1,26 @@
-from django.core.mail import send_mail
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-def send_appointment_confirmation_email(user_name, user_email, doctor_name, appointment_date, appointment_time, status="Booked"):
+from django.core.mail import EmailMessage, send_mail, get_connection
+
+# The email backend (SendGrid) is created on the first email a worker
+# sends and then reused, rather than imported at startup or rebuilt for
+# every message.
+_connection = None
+_connection_pid = None
+
+
+def get_email_connection():
+    global _connection, _connection_pid
+    if _connection is None or _connection_pid != os.getpid():
+        _connection = get_connection(fail_silently=False)
+        _connection_pid = os.getpid()
+    return _connection
+
+
+def appointment_email(user_name, doctor_name, appointment_date, appointment_time, status="Booked"):
+    """(subject, message) of the appointment notification for status."""
     subject = f"Your MedLink Appointment {status}"
 
     if status == "Booked":
@@ -13,6 +33,8 @@ def send_appointment_confirmation_email(user_name, user_email, doctor_name, appo
         action = "has been approved"
     elif status == "Rescheduled":
         action = "has been rescheduled"
+    elif status == "Reminder":
+        action = "is coming up soon"
     else:
         action = "updated"
 
@@ -27,10 +49,100 @@ Your appointment {action}!
 
 Thank you for choosing MedLink!
 """
+    return subject, message
+
+
+def send_appointment_confirmation_email(user_name, user_email, doctor_name, appointment_date, appointment_time, status="Booked"):
+    subject, message = appointment_email(user_name, doctor_name, appointment_date, appointment_time, status)
 
     try:
-        send_mail(subject, message, None, [user_email], fail_silently=False)
+        send_mail(subject, message, None, [user_email], connection=get_email_connection())
         return True
     except Exception as e:
         print("Email failed:", e)
-        return False
\ No newline at end of file
+        return False
+
+
+# ============================================================
+# BATCHED NOTIFICATIONS
+# ============================================================
+# Bulk actions hand their emails to one background thread per worker,
+# which sends each batch over a single backend connection. The view
+# returns without waiting for the email provider.
+_executor = None
+_executor_pid = None
+_executor_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {"batches": 0, "queued": 0, "sent": 0, "failed": 0}
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    # Threads do not survive a fork; start the sender in each worker
+    if _executor is None or _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor is None or _executor_pid != os.getpid():
+                _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="email-batch")
+                _executor_pid = os.getpid()
+    return _executor
+
+
+def _count(name, n=1):
+    with _stats_lock:
+        _stats[name] += n
+
+
+def send_appointment_emails(notifications):
+    """
+    Sends the notifications now, one message at a time over one backend
+    connection; returns a True / False per notification, so the caller
+    knows exactly which went out when the batch fails partway.
+    """
+    if not notifications:
+        return []
+    # Its own connection: the request threads share get_email_connection()
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as e:
+        print(f"Email batch of {len(notifications)} failed:", e)
+        _count("failed", len(notifications))
+        return [False] * len(notifications)
+
+    results = []
+    try:
+        for n in notifications:
+            subject, message = appointment_email(
+                n["user_name"], n["doctor_name"], n["appointment_date"], n["appointment_time"], n["status"]
+            )
+            try:
+                sent = connection.send_messages([EmailMessage(subject, message, None, [n["user_email"]])]) or 0
+            except Exception as e:
+                print(f"Email to {n['user_email']} failed:", e)
+                sent = 0
+            results.append(bool(sent))
+    finally:
+        connection.close()
+    _count("sent", sum(results))
+    _count("failed", len(results) - sum(results))
+    return results
+
+
+def queue_appointment_emails(notifications):
+    """
+    Sends appointment emails in the background, as one batch.
+    notifications: dicts with the keyword arguments of
+    send_appointment_confirmation_email (user_name, user_email, doctor_name,
+    appointment_date, appointment_time, status).
+    """
+    notifications = [n for n in notifications if n.get("user_email")]
+    if not notifications:
+        return
+    _count("batches")
+    _count("queued", len(notifications))
+    _get_executor().submit(send_appointment_emails, notifications)
+
+
+def email_stats():
+    with _stats_lock:
+        return dict(_stats)
@@ -0,0 +1,150 @@
+"""
+Streaming exports of the appointment and patient_records tables.
+
+    for chunk in export_lines("appointments", "csv", doctor_name="Ana Cruz"):
+        ...
+
+Rows are read in keyset pages (id > last id, ordered by id, EXPORT_PAGE_SIZE
+at a time) straight from Supabase, bypassing the query cache, and written
+out as they arrive. Only one page is held at a time, so memory does not
+grow with the table. The user_id / appointment_id references of
+patient_records are resolved with one users and one appointment query per
+page (.in_("id", ...)) instead of an embed per row.
+
+Filters match the list pages:
+- appointments: doctor_name (doctors only see their own appointments);
+- patient_records: search, a case-insensitive match on the patient's first
+  or last name, applied to each page once the names are resolved.
+
+CSV cells that start like a spreadsheet formula (=, +, -, @, tab, CR) are
+prefixed with ' so names, reasons and doctor notes open as plain text in
+Excel / Sheets. JSONL is written unchanged.
+
+Used by the export views and by "python manage.py export_data". Both may
+pass client=supabase.replica to read from the read replica (see
+db_routing); the default is the primary.
+"""
+import csv
+import json
+
+from django.conf import settings
+
+from .supabase_client import supabase
+
+APPOINTMENT_FIELDS = [
+    "id", "patient_id", "first_name", "last_name", "user_email", "doctor_name",
+    "appointment_date", "appointment_time", "status", "reason_for_visit",
+]
+
+RECORD_FIELDS = [
+    "id", "record_date", "user_id", "patient_first_name", "patient_last_name",
+    "appointment_id", "doctor_name", "appointment_date", "appointment_status",
+    "successful_appointment_visit", "doctor_notes",
+]
+
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+FORMATS = {
+    "csv": "text/csv",
+    "jsonl": "application/x-ndjson",
+}
+
+
+def keyset_pages(table, columns, page_size, apply_filters=None, client=None):
+    """Yields lists of rows of table in id order, page_size rows per request."""
+    client = client or supabase.uncached
+    last_id = None
+    while True:
+        query = client.table(table).select(columns)
+        if apply_filters:
+            query = apply_filters(query)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.order("id").limit(page_size).execute().data or []
+        if rows:
+            yield rows
+        if len(rows) < page_size:
+            return
+        last_id = rows[-1]["id"]
+
+
+def _lookup(table, columns, ids, client=None):
+    """{id: row} for the distinct non-null ids, in one request."""
+    ids = sorted({i for i in ids if i is not None})
+    if not ids:
+        return {}
+    rows = (client or supabase.uncached).table(table).select(columns).in_("id", ids).execute().data or []
+    return {row["id"]: row for row in rows}
+
+
+def appointment_rows(doctor_name=None, page_size=None, client=None):
+    def apply_filters(query):
+        return query.eq("doctor_name", doctor_name) if doctor_name else query
+
+    columns = ", ".join(APPOINTMENT_FIELDS)
+    for page in keyset_pages("appointment", columns, page_size or settings.EXPORT_PAGE_SIZE, apply_filters, client):
+        yield from page
+
+
+def patient_record_rows(search=None, page_size=None, client=None):
+    search = (search or "").strip().lower()
+    columns = "id, record_date, user_id, appointment_id, successful_appointment_visit, doctor_notes"
+    for page in keyset_pages("patient_records", columns, page_size or settings.EXPORT_PAGE_SIZE, client=client):
+        users = _lookup("users", "id, first_name, last_name", (r["user_id"] for r in page), client)
+        appointments = _lookup(
+            "appointment", "id, doctor_name, appointment_date, status", (r["appointment_id"] for r in page), client
+        )
+        for record in page:
+            user = users.get(record["user_id"]) or {}
+            first_name = user.get("first_name") or ""
+            last_name = user.get("last_name") or ""
+            if search and search not in first_name.lower() and search not in last_name.lower():
+                continue
+            appointment = appointments.get(record["appointment_id"]) or {}
+            yield {
+                "id": record["id"],
+                "record_date": record.get("record_date"),
+                "user_id": record["user_id"],
+                "patient_first_name": first_name,
+                "patient_last_name": last_name,
+                "appointment_id": record["appointment_id"],
+                "doctor_name": appointment.get("doctor_name"),
+                "appointment_date": appointment.get("appointment_date"),
+                "appointment_status": appointment.get("status"),
+                "successful_appointment_visit": record.get("successful_appointment_visit"),
+                "doctor_notes": record.get("doctor_notes"),
+            }
+
+
+DATASETS = {
+    "appointments": (appointment_rows, APPOINTMENT_FIELDS),
+    "patient_records": (patient_record_rows, RECORD_FIELDS),
+}
+
+
+def csv_safe(value):
+    """value, with a leading ' if a spreadsheet would read it as a formula."""
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+class _Echo:
+    """File-like object for csv.writer that hands back each line instead of storing it."""
+
+    def write(self, value):
+        return value
+
+
+def export_lines(dataset, fmt, **filters):
+    """Yields the export of dataset as text lines (header first for csv)."""
+    rows_func, fields = DATASETS[dataset]
+    rows = rows_func(**filters)
+    if fmt == "csv":
+        writer = csv.DictWriter(_Echo(), fieldnames=fields, extrasaction="ignore")
+        yield writer.writeheader()
+        for row in rows:
+            yield writer.writerow({f: csv_safe(row.get(f)) for f in fields})
+    else:
+        for row in rows:
+            yield json.dumps({f: row.get(f) for f in fields}, default=str) + "\n"
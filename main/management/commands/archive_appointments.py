@@ -0,0 +1,79 @@
+"""
+python manage.py archive_appointments [--days 365] [--batch-size 500]
+    [--max-batches N] [--dry-run] [--no-report]
+
+Moves Completed / Cancelled / Declined appointments older than --days, and
+their patient records, into the archive tables one batch at a time (see
+main/archive.py). Row counts of the hot and archive tables, and the median
+latency of the busiest hot-table queries, are printed before and after.
+The run invalidates the cached reads of those tables, so it refuses to run
+with the per-process locmem cache (see CACHE_BACKEND in medlink/settings.py).
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.archive import archivable_count, archive_batch, cutoff_date, invalidate, query_latencies, row_counts
+from main.cache_utils import require_shared_cache
+
+
+class Command(BaseCommand):
+    help = "Archives old finished appointments and their patient records."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.ARCHIVE_AFTER_DAYS,
+                            help="Archive appointments dated more than this many days ago.")
+        parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE)
+        parser.add_argument("--max-batches", type=int, help="Stop after this many batches.")
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would be archived.")
+        parser.add_argument("--no-report", action="store_true", help="Skip the row count / latency report.")
+
+    def handle(self, *args, **options):
+        if not options["dry_run"]:
+            try:
+                require_shared_cache("archive_appointments")
+            except ValueError as e:
+                raise CommandError(str(e))
+        cutoff = cutoff_date(options["days"])
+        self.stdout.write(f"Archiving finished appointments dated before {cutoff}.")
+
+        if not options["no_report"]:
+            before = self.report("Before")
+        if options["dry_run"]:
+            self.stdout.write(self.style.WARNING(f"Dry run: {archivable_count(cutoff):,} appointments to archive."))
+            return
+
+        started = time.monotonic()
+        batches = appointments = records = 0
+        while options["max_batches"] is None or batches < options["max_batches"]:
+            moved, moved_records = archive_batch(cutoff, options["batch_size"])
+            if not moved:
+                break
+            batches += 1
+            appointments += moved
+            records += moved_records
+            self.stdout.write(f"  batch {batches}: {moved} appointments, {moved_records} records")
+        invalidate()
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {appointments:,} appointments and {records:,} patient records "
+            f"in {batches} batches ({time.monotonic() - started:.1f}s)."
+        ))
+
+        if not options["no_report"]:
+            self.report("After", before)
+
+    def report(self, label, before=None):
+        counts, latencies = row_counts(), query_latencies()
+        self.stdout.write(f"{label}:")
+        for table, rows in counts.items():
+            if rows is None:
+                self.stdout.write(f"  {table:<26} {'?':>10}")
+                continue
+            previous = before[0].get(table) if before else None
+            change = f" ({rows - previous:+,})" if previous is not None else ""
+            self.stdout.write(f"  {table:<26} {rows:>10,}{change}")
+        for name, ms in latencies.items():
+            change = f" (was {before[1][name]:.1f} ms)" if before else ""
+            self.stdout.write(f"  {name:<26} {ms:>8.1f} ms{change}")
+        return counts, latencies
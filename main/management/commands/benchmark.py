@@ -0,0 +1,347 @@
+"""
+python manage.py benchmark <scenario> [--requests N] [--concurrency C]
+
+Micro-benchmarks for the performance work in main/. Each scenario prints
+the same summary (mean / p50 / p99 latency and throughput) so runs can be
+compared before and after a change.
+"""
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def run_timed(func, requests, concurrency):
+    """Calls func() `requests` times on `concurrency` threads; returns (timings, wall)."""
+    def timed(_):
+        start = time.perf_counter()
+        func()
+        return time.perf_counter() - start
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        timings = list(pool.map(timed, range(requests)))
+    return timings, time.perf_counter() - start
+
+
+class Command(BaseCommand):
+    help = "Runs a micro-benchmark and prints latency / throughput figures."
+
+    SCENARIOS = {
+        "transport": "bench_transport",
+        "hashing": "bench_hashing",
+        "sessions": "bench_sessions",
+        "avatars": "bench_avatars",
+        "public_pages": "bench_public_pages",
+        "search": "bench_search",
+        "import": "bench_import",
+        "backends": "bench_backends",
+    }
+
+    def add_arguments(self, parser):
+        parser.add_argument("scenario", choices=sorted(self.SCENARIOS))
+        parser.add_argument("--requests", type=int, default=50)
+        parser.add_argument("--concurrency", type=int, default=1)
+        parser.add_argument(
+            "--url",
+            help="Target base URL (defaults to SUPABASE_URL; point it at a local stand-in to run offline).",
+        )
+        parser.add_argument("--image", help="Photo to use for the avatars scenario (default: a generated 12MP image).")
+        parser.add_argument("--doctors", type=int, default=5000, help="Synthetic doctors for the search scenario.")
+        parser.add_argument("--rows", type=int, default=50000, help="CSV rows for the import scenario.")
+
+    def handle(self, *args, **options):
+        getattr(self, self.SCENARIOS[options["scenario"]])(**options)
+
+    def report(self, label, timings, wall):
+        self.stdout.write(
+            f"{label:<28} n={len(timings):<5} "
+            f"mean={statistics.mean(timings) * 1000:8.2f}ms "
+            f"p50={percentile(timings, 50) * 1000:8.2f}ms "
+            f"p99={percentile(timings, 99) * 1000:8.2f}ms "
+            f"throughput={len(timings) / wall:8.1f}/s"
+        )
+
+    # ------------------------------------------------------------
+    # SCENARIOS
+    # ------------------------------------------------------------
+    def bench_transport(self, requests, concurrency, url=None, **options):
+        """New connection per request vs the pooled keep-alive transport."""
+        from main.supabase_client import supabase
+
+        base_url = (url or settings.SUPABASE_URL).rstrip("/")
+        target = f"{base_url}/rest/v1/users?select=id&limit=1"
+        headers = {
+            "apikey": settings.SUPABASE_ANON_KEY,
+            "Authorization": f"Bearer {settings.SUPABASE_ANON_KEY}",
+        }
+        timeout = httpx.Timeout(settings.SUPABASE_READ_TIMEOUT, connect=settings.SUPABASE_CONNECT_TIMEOUT)
+
+        def fresh_connection():
+            with httpx.Client(timeout=timeout) as client:
+                client.get(target, headers=headers)
+
+        pooled = supabase.transport.client
+
+        def pooled_connection():
+            pooled.get(target, headers=headers)
+
+        pooled_connection()  # warm the pool, as a running worker would be
+        self.report("new connection per request", *run_timed(fresh_connection, requests, concurrency))
+        self.report("pooled keep-alive transport", *run_timed(pooled_connection, requests, concurrency))
+        self.stdout.write(f"transport: {supabase.transport.stats()}")
+
+    def bench_hashing(self, requests, concurrency, **options):
+        """Login-style password checks: inline in request threads vs the bounded pool."""
+        from django.contrib.auth.hashers import check_password, make_password
+        from main.password_utils import HashingBusy, hash_pool, verify_password
+
+        encoded = make_password("Correct-Horse-1")
+        rejected = []
+
+        def inline_check():
+            check_password("Correct-Horse-1", encoded)
+
+        def pooled_check():
+            try:
+                verify_password("Correct-Horse-1", encoded)
+            except HashingBusy:
+                rejected.append(1)
+
+        self.report("inline check_password", *run_timed(inline_check, requests, concurrency))
+        self.report("hashing pool", *run_timed(pooled_check, requests, concurrency))
+        self.stdout.write(f"rejected as busy: {len(rejected)}")
+        self.stdout.write(f"pool: {hash_pool.stats()}")
+
+    def bench_sessions(self, requests, concurrency, **options):
+        """
+        A logged-in request's session round trip: cached_db vs signed cookie.
+        Runs sequentially (--concurrency is ignored) so DB queries and cache
+        reads can be counted; cached_db needs the sessions table migrated.
+        """
+        from importlib import import_module
+
+        from django.core.cache import cache
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        identity = {
+            "user_id": 42, "user_email": "patient@example.com", "first_name": "Juan",
+            "role": "user", "is_doctor": False,
+        }
+
+        for engine in ("django.contrib.sessions.backends.cached_db", "main.signed_sessions"):
+            store_class = import_module(engine).SessionStore
+            store = store_class()
+            store.update(identity)
+            store.save()
+            key = store.session_key
+            cache_reads = []
+
+            def round_trip():
+                # What the dashboard does: read the identity, then flash a message
+                session = store_class(key)
+                session.get("user_id"), session.get("role"), session.get("first_name")
+                session["last_seen"] = time.time()
+                session.save()
+
+            original_get = cache.get
+
+            def counting_get(*args, **kwargs):
+                cache_reads.append(1)
+                return original_get(*args, **kwargs)
+
+            cache.get = counting_get
+            try:
+                # Sequential so the query count belongs to this connection
+                with CaptureQueriesContext(connection) as queries:
+                    timings, wall = run_timed(round_trip, requests, 1)
+            finally:
+                del cache.get
+            label = engine.rsplit(".", 1)[-1]
+            self.report(label, timings, wall)
+            self.stdout.write(
+                f"{'':<28} db queries={len(queries)} cache reads={len(cache_reads)} cookie bytes={len(key)}"
+            )
+
+    def bench_avatars(self, requests, concurrency, image=None, **options):
+        """Avatar resize/encode cost and the image weight of a 12-card all_doctors page."""
+        import io
+
+        from main.avatar_utils import Image, render_variants
+
+        if Image is None:
+            self.stderr.write("Pillow is not installed; avatars are uploaded unchanged.")
+            return
+
+        if image:
+            with open(image, "rb") as f:
+                original = f.read()
+        else:
+            # Detail at every scale, so small variants do not collapse to a flat colour
+            buffer = io.BytesIO()
+            Image.effect_mandelbrot((4000, 3000), (-2.2, -1.2, 1.0, 1.2), 256).convert("RGB").save(buffer, "JPEG", quality=90)
+            original = buffer.getvalue()
+
+        self.report("resize + encode variants", *run_timed(lambda: render_variants(io.BytesIO(original)), requests, concurrency))
+
+        cards = 12
+        self.stdout.write(f"{'original upload':<20} {len(original):>10,} bytes   page of {cards}: {len(original) * cards:>12,}")
+        for filename, content, _ in render_variants(io.BytesIO(original)):
+            self.stdout.write(f"{filename:<20} {len(content):>10,} bytes   page of {cards}: {len(content) * cards:>12,}")
+
+    def bench_public_pages(self, requests, concurrency, **options):
+        """Anonymous GETs of the public pages with the page/fragment caches off and on."""
+        from django.test import Client, override_settings
+        from main.page_cache import bump_public_pages, public_page_stats
+
+        urls = ["/", "/about/", "/privacy/", "/hello/", "/all-doctors/"]
+
+        for label, ttl in (("uncached", 0), ("cached", settings.PUBLIC_PAGE_CACHE_TTL or 600)):
+            with override_settings(PUBLIC_PAGE_CACHE_TTL=ttl):
+                bump_public_pages()
+                for url in urls:
+                    client = Client(HTTP_HOST="localhost")
+                    client.get(url)  # warm: first render fills the caches
+                    timings, wall = run_timed(lambda: client.get(url), requests, concurrency)
+                    self.report(f"{label} {url}", timings, wall)
+        self.stdout.write(f"public page cache: {public_page_stats()}")
+
+    def bench_search(self, requests, concurrency, doctors=5000, **options):
+        """Typeahead queries against the doctor search index vs a linear scan."""
+        import random
+        from main.doctor_search import DoctorSearchIndex, normalize
+
+        rng = random.Random(42)
+        first = ["Maria", "Jose", "Ana", "Juan", "Carmela", "Ramon", "Luz", "Paolo", "Rosario", "Miguel",
+                 "Andrea", "Gabriel", "Patricia", "Rafael", "Teresa", "Antonio", "Kristine", "Joaquin"]
+        last = ["Santos", "Reyes", "Cruz", "Bautista", "Ocampo", "Garcia", "Mendoza", "Torres", "Villanueva",
+                "Ramos", "Aquino", "Castillo", "Navarro", "Dela Cruz", "Fernandez", "Lopez", "Gonzales"]
+        specializations = ["General Physician", "Dentist", "Pediatrician", "Cardiologist", "Dermatologist",
+                           "Gynecologist", "Neurologist", "Ophthalmologist", "Orthopedic Surgeon", "Psychiatrist"]
+        rows = [
+            {
+                "id": i,
+                "first_name": f"{rng.choice(first)}{'' if i % 3 else rng.choice('abcdefgh')}",
+                "last_name": f"{rng.choice(last)}{i}",
+                "specialization": rng.choice(specializations),
+                "is_in": rng.random() < 0.8,
+            }
+            for i in range(1, doctors + 1)
+        ]
+        queries = ["car", "cardiologist", "cardiolgist", "maria sant", "dr reyes", "pedia", "dermatolgy",
+                   "jose cruz", "nuerologist", "ana", "orthopedic", "psych"]
+
+        index = DoctorSearchIndex()
+        start = time.perf_counter()
+        index.update(rows)
+        self.stdout.write(f"index build: {doctors} doctors in {(time.perf_counter() - start) * 1000:.1f}ms, "
+                          f"{index.stats()}")
+
+        haystack = [(row, " ".join(normalize(f"{row['first_name']} {row['last_name']} {row['specialization']}")))
+                    for row in rows]
+        for query in queries:
+            terms = normalize(query)
+            timings, wall = run_timed(
+                lambda: [r for r, text in haystack if all(t in text for t in terms)][:8], requests, concurrency
+            )
+            self.report(f"scan {query!r}", timings, wall)
+            timings, wall = run_timed(lambda: index.search(query), requests, concurrency)
+            self.report(f"index {query!r}", timings, wall)
+            top = index.search(query, limit=1)
+            self.stdout.write(f"{'':<28} top: {top[0]['name']} ({top[0]['specialization']})" if top else "")
+
+        changed = dict(rows[0], is_in=not rows[0]["is_in"])
+        start = time.perf_counter()
+        index.update([changed] + rows[1:])
+        self.stdout.write(f"incremental update (1 doctor toggled): {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    def bench_import(self, requests, concurrency, rows=50000, **options):
+        """CSV parsing/validation of `rows` rows, and password hashing: request pool vs process pool."""
+        import csv
+        import io
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        from itertools import islice
+        from main.bulk_import import _hash, _init_worker, clean_row
+        from main.password_utils import hash_password
+
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["first_name", "last_name", "email", "role", "specialization", "password"])
+        for i in range(rows):
+            role = ("patient", "doctor", "staff")[i % 3]
+            writer.writerow([f"First{i}", f"Last{i}", f"user{i}@example.com", role,
+                             "Cardiologist" if role == "doctor" else "", ""])
+        buffer.seek(0)
+
+        start = time.perf_counter()
+        valid = sum(1 for row in csv.DictReader(buffer) if clean_row(row)[1] is None)
+        parse = time.perf_counter() - start
+        self.stdout.write(f"parse + validate: {valid:,} rows in {parse:.2f}s ({valid / parse:,.0f} rows/s)")
+
+        passwords = [f"password-{i}" for i in range(requests)]
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            list(pool.map(hash_password, passwords))
+        threaded = requests / (time.perf_counter() - start)
+
+        workers = settings.IMPORT_HASH_WORKERS
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker) as pool:
+            list(pool.map(_hash, islice(passwords, workers)))  # start the workers
+            start = time.perf_counter()
+            list(pool.map(_hash, passwords, chunksize=max(1, requests // (workers * 4))))
+            processes = requests / (time.perf_counter() - start)
+
+        for label, rate in (("hash_password pool", threaded), (f"process pool x{workers}", processes)):
+            self.stdout.write(
+                f"{label:<28} {rate:8.1f} hashes/s   {rows:,} rows: {rows / rate / 60:8.1f} min"
+            )
+
+    def bench_backends(self, requests, concurrency, **options):
+        """The hot views' data access on DATA_BACKEND=supabase (cold and cached) and =orm."""
+        from django.db import connections
+        from main.repositories import get_repository
+        from main.supabase_client import supabase
+
+        orm, rest = get_repository("orm"), get_repository("supabase")
+        sample = (orm.appointments() or [{}])[0]
+        doctor = sample.get("doctor_name", "")
+        email = sample.get("user_email", "")
+        day = sample.get("appointment_date", "2000-01-01")
+        views = {
+            "appointment_list_page": lambda repo: repo.appointments(),
+            "  (doctor)": lambda repo: repo.appointments(doctor),
+            "user_dashboard": lambda repo: repo.user_appointments(email),
+            "appointment_history": lambda repo: repo.user_appointments(email, newest_first=True),
+            "patient_records_list_page": lambda repo: repo.patient_records(),
+            "get_booked_times": lambda repo: repo.booked_times(day, doctor),
+            "user_management_page": lambda repo: repo.users_by_last_name(),
+            "admin_dashboard": lambda repo: repo.admin_dashboard(),
+        }
+
+        def cold(fetch):
+            supabase.query_cache.clear()
+            fetch(rest)
+
+        for view, fetch in views.items():
+            self.stdout.write(view)
+            for label, call in (
+                ("supabase (no cache)", lambda: cold(fetch)),
+                ("supabase (cached)", lambda: fetch(rest)),
+                ("orm", lambda: fetch(orm)),
+            ):
+                call()  # warm: connections, and the query cache for the cached run
+                timings, wall = run_timed(call, requests, concurrency)
+                self.report(f"  {label}", timings, wall)
+        connections.close_all()
@@ -0,0 +1,61 @@
+"""
+python manage.py export_data {appointments,patient_records} [--format csv|jsonl]
+    [--output FILE] [--doctor "First Last"] [--search NAME] [--page-size 1000]
+    [--replica]
+
+Streams a table export to FILE (or stdout) with the same code and filters
+as the export views (see main/exports.py). Progress goes to stderr.
+--replica reads from SUPABASE_REPLICA_URL instead of the primary.
+"""
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from main.exports import DATASETS, FORMATS, export_lines
+
+
+class Command(BaseCommand):
+    help = "Exports appointments or patient records as CSV / JSONL, page by page."
+
+    def add_arguments(self, parser):
+        parser.add_argument("dataset", choices=sorted(DATASETS))
+        parser.add_argument("--format", choices=sorted(FORMATS), default="csv")
+        parser.add_argument("--output", help="File to write (default: stdout).")
+        parser.add_argument("--doctor", help="appointments: only this doctor's (doctor_name).")
+        parser.add_argument("--search", help="patient_records: patient first/last name contains.")
+        parser.add_argument("--page-size", type=int, default=settings.EXPORT_PAGE_SIZE)
+        parser.add_argument("--replica", action="store_true", help="Read from the read replica.")
+
+    def handle(self, *args, **options):
+        dataset = options["dataset"]
+        from main.supabase_client import supabase
+
+        filters = {"page_size": options["page_size"]}
+        if options["replica"]:
+            filters["client"] = supabase.replica
+        if dataset == "appointments":
+            filters["doctor_name"] = options["doctor"]
+        else:
+            filters["search"] = options["search"]
+
+        out = open(options["output"], "w", newline="", encoding="utf-8") if options["output"] else sys.stdout
+        started = time.monotonic()
+        rows = 0
+        try:
+            for line in export_lines(dataset, options["format"], **filters):
+                out.write(line)
+                rows += 1
+                if rows % 10000 == 0:
+                    self.stderr.write(f"  {rows:,} lines ({rows / (time.monotonic() - started):,.0f}/s)")
+        finally:
+            if out is not sys.stdout:
+                out.close()
+
+        if options["format"] == "csv":
+            rows -= 1  # header
+        elapsed = time.monotonic() - started
+        self.stderr.write(self.style.SUCCESS(
+            f"Exported {rows:,} {dataset} rows in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:,.0f} rows/s)."
+        ))
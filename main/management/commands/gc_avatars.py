@@ -0,0 +1,124 @@
+"""
+python manage.py gc_avatars [--dry-run] [--page-size 100] [--batch-size 100] [--min-age-hours 24]
+
+Reclaims space in the Supabase "avatars" bucket. Every object that is not
+referenced by a users.profile_image URL (directly, or as a variant in the
+same folder as the referenced one) is an orphan: old uploads from before
+avatars were cleaned up on change, or leftovers of deleted users.
+
+The bucket and the users table are both read in pages. Orphans younger
+than --min-age-hours are kept, since an upload in progress is stored
+before its URL is saved.
+"""
+import time
+from datetime import datetime, timedelta, timezone
+
+from django.core.management.base import BaseCommand
+
+from main.avatar_utils import BUCKET, avatar_folder, object_path
+
+
+def human_bytes(count):
+    for unit in ("B", "KB", "MB"):
+        if count < 1024:
+            return f"{count:,.1f} {unit}"
+        count /= 1024
+    return f"{count:,.1f} GB"
+
+
+class Command(BaseCommand):
+    help = "Deletes avatar objects that no user references any more."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--dry-run", action="store_true", help="Only report what would be deleted.")
+        parser.add_argument("--page-size", type=int, default=100, help="Rows / objects fetched per request.")
+        parser.add_argument("--batch-size", type=int, default=100, help="Objects removed per delete request.")
+        parser.add_argument("--min-age-hours", type=float, default=24)
+
+    def handle(self, *args, **options):
+        from main.supabase_client import supabase
+
+        started = time.monotonic()
+        page_size = options["page_size"]
+        bucket = supabase.storage.from_(BUCKET)
+
+        folders, files = self.referenced(supabase, page_size)
+        self.stdout.write(f"users with an avatar: {len(folders) + len(files)}")
+
+        cutoff = datetime.now(timezone.utc) - timedelta(hours=options["min_age_hours"])
+        scanned = scanned_bytes = 0
+        orphans = []
+        for path, item in self.walk(bucket, "", page_size):
+            size = (item.get("metadata") or {}).get("size") or 0
+            scanned += 1
+            scanned_bytes += size
+            folder = path.rsplit("/", 1)[0] if "/" in path else None
+            if path in files or folder in folders:
+                continue
+            created = item.get("created_at")
+            if created and datetime.fromisoformat(created.replace("Z", "+00:00")) > cutoff:
+                continue
+            orphans.append((path, size))
+
+        orphan_bytes = sum(size for _, size in orphans)
+        self.stdout.write(f"objects scanned: {scanned} ({human_bytes(scanned_bytes)})")
+        self.stdout.write(f"orphans: {len(orphans)} ({human_bytes(orphan_bytes)})")
+
+        if options["dry_run"]:
+            for path, size in orphans:
+                self.stdout.write(f"  would delete {path} ({human_bytes(size)})")
+            self.stdout.write(self.style.WARNING(f"Dry run: {human_bytes(orphan_bytes)} reclaimable."))
+            return
+
+        reclaimed = deleted = 0
+        batch_size = options["batch_size"]
+        for start in range(0, len(orphans), batch_size):
+            batch = orphans[start:start + batch_size]
+            try:
+                bucket.remove([path for path, _ in batch])
+            except Exception as e:
+                self.stderr.write(f"Batch {start // batch_size + 1} failed: {e}")
+                continue
+            deleted += len(batch)
+            reclaimed += sum(size for _, size in batch)
+            self.stdout.write(f"  deleted {deleted}/{len(orphans)}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Deleted {deleted} objects, reclaimed {human_bytes(reclaimed)} "
+            f"in {time.monotonic() - started:.1f}s."
+        ))
+
+    def referenced(self, supabase, page_size):
+        """(folders, files) referenced by users.profile_image, read in id order pages."""
+        folders, files = set(), set()
+        last_id = 0
+        while True:
+            rows = supabase.uncached.table("users").select("id, profile_image")\
+                .not_.is_("profile_image", "null")\
+                .gt("id", last_id).order("id").limit(page_size).execute().data or []
+            for row in rows:
+                url = row["profile_image"]
+                folder = avatar_folder(url)
+                if folder:
+                    folders.add(folder)
+                elif object_path(url):
+                    files.add(object_path(url))
+            if len(rows) < page_size:
+                return folders, files
+            last_id = rows[-1]["id"]
+
+    def walk(self, bucket, prefix, page_size):
+        """Yields (path, item) for every object under prefix, one listing page at a time."""
+        offset = 0
+        while True:
+            items = bucket.list(prefix or None, {"limit": page_size, "offset": offset})
+            for item in items:
+                path = f"{prefix}/{item['name']}" if prefix else item["name"]
+                if item.get("id") is None:
+                    # Folders have no id; each avatar upload is one folder
+                    yield from self.walk(bucket, path, page_size)
+                else:
+                    yield path, item
+            if len(items) < page_size:
+                return
+            offset += page_size
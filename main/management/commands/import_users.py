@@ -0,0 +1,46 @@
+"""
+python manage.py import_users clinic.csv [--report report.csv] [--batch-size 500]
+    [--workers N] [--dry-run]
+
+Creates patients, doctors and staff from a CSV file (columns: first_name,
+last_name, email, role, specialization, password; see main/bulk_import.py).
+The per-row report, including generated temporary passwords, is written as
+CSV to --report (default: stdout). Keep it safe.
+"""
+import csv
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from main.bulk_import import REPORT_FIELDS, import_users
+
+
+class Command(BaseCommand):
+    help = "Bulk-imports users from CSV with batched lookups and inserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("csv_file")
+        parser.add_argument("--report", help="Where to write the per-row report (default: stdout).")
+        parser.add_argument("--batch-size", type=int, help="Rows per lookup / insert (IMPORT_BATCH_SIZE).")
+        parser.add_argument("--workers", type=int, help="Hashing processes (IMPORT_HASH_WORKERS).")
+        parser.add_argument("--dry-run", action="store_true", help="Validate and dedupe without inserting.")
+
+    def handle(self, *args, **options):
+        report_file = open(options["report"], "w", newline="", encoding="utf-8") if options["report"] else sys.stdout
+        writer = csv.DictWriter(report_file, fieldnames=REPORT_FIELDS)
+        writer.writeheader()
+        try:
+            with open(options["csv_file"], newline="", encoding="utf-8-sig") as f:
+                result = import_users(
+                    f, writer.writerow,
+                    batch_size=options["batch_size"],
+                    hash_workers=options["workers"],
+                    dry_run=options["dry_run"],
+                )
+        except (OSError, ValueError) as e:
+            raise CommandError(str(e))
+        finally:
+            if report_file is not sys.stdout:
+                report_file.close()
+
+        self.stderr.write(self.style.SUCCESS(("Dry run: " if options["dry_run"] else "") + result.summary()))
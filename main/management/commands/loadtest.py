@@ -0,0 +1,144 @@
+"""
+python manage.py loadtest [--profiles sync gthread uvicorn] [--duration 15] [--concurrency 16]
+
+Starts gunicorn locally with each worker profile from gunicorn.conf.py,
+drives the hot URLs from main/urls.py with concurrent keep-alive clients,
+and prints throughput and p99 latency per URL and profile.
+
+Logged-in pages are only included when a session cookie is given
+(--session-cookie, copied from a browser session against the same
+database), since the app has no test users to log in with.
+"""
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import httpx
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from .benchmark import percentile
+
+PUBLIC_URLS = ["/", "/about/", "/privacy/", "/all-doctors/", "/login/"]
+USER_URLS = ["/user-dashboard/", "/history/", "/profile/", "/book-appointment/"]
+ADMIN_URLS = ["/admin-dashboard/", "/appointments/", "/patient-records/", "/users/"]
+
+
+def wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        with socket.socket() as sock:
+            if sock.connect_ex(("127.0.0.1", port)) == 0:
+                return True
+        time.sleep(0.2)
+    return False
+
+
+class Command(BaseCommand):
+    help = "Load-tests the hot URLs under each gunicorn worker profile."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--profiles", nargs="+", default=["sync", "gthread"],
+                            choices=["sync", "gthread", "uvicorn"])
+        parser.add_argument("--duration", type=float, default=15, help="Seconds per profile.")
+        parser.add_argument("--concurrency", type=int, default=16, help="Concurrent clients.")
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument("--workers", type=int, help="Override WEB_CONCURRENCY for every profile.")
+        parser.add_argument("--session-cookie", help="sessionid value of a logged-in user.")
+        parser.add_argument("--admin", action="store_true", help="Treat the session as staff and hit admin URLs.")
+        parser.add_argument("--urls", nargs="+", help="Explicit URL paths instead of the built-in hot list.")
+
+    def handle(self, *args, **options):
+        urls = options["urls"] or PUBLIC_URLS[:]
+        if options["session_cookie"] and not options["urls"]:
+            urls += ADMIN_URLS if options["admin"] else USER_URLS
+
+        results = {}
+        for profile in options["profiles"]:
+            self.stdout.write(f"--- {profile} ---")
+            server = self.start_server(profile, options)
+            try:
+                results[profile] = self.drive(urls, options)
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+        self.stdout.write("\nprofile    url                       requests   req/s    p50 ms    p99 ms  errors")
+        for profile, per_url in results.items():
+            for url, (timings, errors, wall) in per_url.items():
+                if not timings:
+                    self.stdout.write(f"{profile:<10} {url:<25} {0:>8}       -         -         -  {errors:>6}")
+                    continue
+                self.stdout.write(
+                    f"{profile:<10} {url:<25} {len(timings):>8} {len(timings) / wall:>7.1f} "
+                    f"{percentile(timings, 50) * 1000:>9.1f} {percentile(timings, 99) * 1000:>9.1f}  {errors:>6}"
+                )
+
+    def start_server(self, profile, options):
+        env = {
+            **os.environ,
+            "GUNICORN_WORKER_CLASS": profile,
+            "GUNICORN_BIND": f"127.0.0.1:{options['port']}",
+            "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "medlink.settings"),
+        }
+        if options["workers"]:
+            env["WEB_CONCURRENCY"] = str(options["workers"])
+        server = subprocess.Popen(
+            [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py"],
+            cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        )
+        if not wait_for_port(options["port"]):
+            server.kill()
+            raise CommandError(f"gunicorn ({profile}) did not start on port {options['port']}.")
+        return server
+
+    def drive(self, urls, options):
+        base_url = f"http://127.0.0.1:{options['port']}"
+        headers = {}
+        if options["session_cookie"]:
+            headers["Cookie"] = f"sessionid={options['session_cookie']}"
+
+        timings = defaultdict(list)
+        errors = defaultdict(int)
+        lock = threading.Lock()
+        deadline = time.monotonic() + options["duration"]
+
+        def client_loop(offset):
+            with httpx.Client(base_url=base_url, headers=headers, timeout=30) as client:
+                i = offset
+                while time.monotonic() < deadline:
+                    url = urls[i % len(urls)]
+                    i += 1
+                    start = time.perf_counter()
+                    try:
+                        ok = client.get(url).status_code < 500
+                    except httpx.HTTPError:
+                        ok = False
+                    elapsed = time.perf_counter() - start
+                    with lock:
+                        if ok:
+                            timings[url].append(elapsed)
+                        else:
+                            errors[url] += 1
+
+        # One untimed pass so lazy imports / first client builds are not measured
+        with httpx.Client(base_url=base_url, headers=headers, timeout=30) as client:
+            for url in urls:
+                try:
+                    client.get(url)
+                except httpx.HTTPError:
+                    pass
+
+        start = time.monotonic()
+        threads = [threading.Thread(target=client_loop, args=(n,)) for n in range(options["concurrency"])]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wall = time.monotonic() - start
+        return {url: (timings[url], errors[url], wall) for url in urls}
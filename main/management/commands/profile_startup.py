@@ -0,0 +1,109 @@
+"""
+python manage.py profile_startup [--top N] [--output report.json] [--compare old.json]
+
+Measures worker cold start in a fresh interpreter, the way a gunicorn
+worker (or a Render free-tier spin-up) pays for it:
+
+  1. import medlink.wsgi         (django.setup(), app loading)
+  2. import main.urls            (views, done by the first request)
+  3. first Supabase client       (lazy; built on the first query)
+  4. first email connection      (lazy; built on the first email)
+
+It also runs `python -X importtime` and lists the slowest imports. Save a
+report with --output and pass it to --compare later to catch regressions.
+"""
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+PHASES_SCRIPT = """
+import json, time
+phases = {}
+t = time.perf_counter()
+import medlink.wsgi
+phases["import medlink.wsgi"] = time.perf_counter() - t
+t = time.perf_counter()
+import main.urls
+phases["import main.urls (views)"] = time.perf_counter() - t
+t = time.perf_counter()
+from main.supabase_client import supabase
+if supabase is not None:
+    supabase.uncached
+phases["first Supabase client"] = time.perf_counter() - t
+t = time.perf_counter()
+from main.email_utils import get_email_connection
+get_email_connection()
+phases["first email connection"] = time.perf_counter() - t
+print(json.dumps(phases))
+"""
+
+
+def parse_importtime(stderr):
+    """[(module, self_us, cumulative_us)] from `python -X importtime` output."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        rows.append((module.strip(), int(self_us), int(cumulative_us)))
+    return rows
+
+
+class Command(BaseCommand):
+    help = "Profiles worker cold start: import and lazy initialisation times."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=20, help="Number of slowest imports to list.")
+        parser.add_argument("--output", help="Write the report as JSON to this path.")
+        parser.add_argument("--compare", help="Previous JSON report to diff against.")
+
+    def run_interpreter(self, *flags):
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "medlink.settings")}
+        result = subprocess.run(
+            [sys.executable, *flags, "-c", PHASES_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if result.returncode != 0:
+            raise CommandError(result.stderr.strip().splitlines()[-1] if result.stderr else "Interpreter failed.")
+        # The phase JSON is the last stdout line; anything before it is app logging
+        return json.loads(result.stdout.strip().splitlines()[-1]), result.stderr
+
+    def handle(self, *args, **options):
+        phases, _ = self.run_interpreter()
+        _, importtime = self.run_interpreter("-X", "importtime")
+        imports = parse_importtime(importtime)
+
+        report = {
+            "phases_ms": {name: round(seconds * 1000, 1) for name, seconds in phases.items()},
+            "total_ms": round(sum(phases.values()) * 1000, 1),
+            "slowest_imports_ms": {
+                module: round(cumulative / 1000, 1)
+                for module, _, cumulative in sorted(imports, key=lambda r: r[2], reverse=True)[:options["top"]]
+            },
+        }
+
+        previous = None
+        if options["compare"]:
+            with open(options["compare"]) as fh:
+                previous = json.load(fh)
+
+        self.stdout.write("Startup phases:")
+        for name, ms in report["phases_ms"].items():
+            delta = ""
+            if previous and name in previous.get("phases_ms", {}):
+                delta = f"  ({ms - previous['phases_ms'][name]:+.1f}ms)"
+            self.stdout.write(f"  {name:<28} {ms:8.1f}ms{delta}")
+        self.stdout.write(f"  {'total':<28} {report['total_ms']:8.1f}ms")
+
+        self.stdout.write(f"\nSlowest imports (cumulative, top {options['top']}):")
+        for module, ms in report["slowest_imports_ms"].items():
+            self.stdout.write(f"  {ms:8.1f}ms  {module}")
+
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(report, fh, indent=2)
+            self.stdout.write(f"\nReport written to {options['output']}")
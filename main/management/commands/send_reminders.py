@@ -0,0 +1,61 @@
+"""
+python manage.py send_reminders [--days 3] [--batch-size 100] [--dry-run]
+    [--loop SECONDS]
+
+Emails a reminder for every Approved appointment within --days days that
+has not had one, and records it in appointment_reminders for the user
+dashboard (see main/reminders.py). The dashboard only shows reminders this
+job recorded, so something must run it. The Procfile's worker process keeps
+it running as a simple scheduler with --loop 3600; or run it from cron,
+e.g. hourly:
+
+    0 * * * * cd /app && python manage.py send_reminders
+
+Overlapping runs are safe: each batch is claimed before it is sent. New
+reminders bump the patients' cached pages, so the job refuses to run with
+the per-process locmem cache (see CACHE_BACKEND in medlink/settings.py).
+"""
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from main.cache_utils import require_shared_cache
+from main.reminders import run_reminders
+
+
+class Command(BaseCommand):
+    help = "Records and emails upcoming appointment reminders, in batches."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.REMINDER_DAYS)
+        parser.add_argument("--batch-size", type=int, default=settings.REMINDER_BATCH_SIZE)
+        parser.add_argument("--dry-run", action="store_true", help="Only count what would be recorded.")
+        parser.add_argument("--loop", type=float, metavar="SECONDS",
+                            help="Run again every SECONDS instead of exiting.")
+
+    def handle(self, *args, **options):
+        if not options["dry_run"]:
+            try:
+                require_shared_cache("send_reminders")
+            except ValueError as e:
+                raise CommandError(str(e))
+        while True:
+            try:
+                stats = run_reminders(
+                    days=options["days"], batch_size=options["batch_size"], dry_run=options["dry_run"]
+                )
+            except Exception as e:
+                if not options["loop"]:
+                    raise
+                self.stderr.write(f"Reminder run failed: {e}")
+            else:
+                style = self.style.SUCCESS if not stats["failed"] else self.style.WARNING
+                self.stdout.write(style(
+                    f"{stats['due']} due, {stats['recorded']} new reminders, "
+                    f"{stats['sent']} emailed, {stats['failed']} failed in {stats['elapsed']:.1f}s"
+                    + (" (dry run)" if options["dry_run"] else "")
+                ))
+            if not options["loop"]:
+                return
+            time.sleep(options["loop"])
@@ -0,0 +1,82 @@
+# Generated by Django 5.2.6 on 2026-10-19 14:02
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Appointment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_name', models.TextField()),
+                ('last_name', models.TextField()),
+                ('user_email', models.TextField()),
+                ('doctor_name', models.TextField()),
+                ('appointment_date', models.DateField()),
+                ('appointment_time', models.TextField()),
+                ('status', models.TextField(default='Pending')),
+                ('reason_for_visit', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'appointment',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='User',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('first_name', models.TextField()),
+                ('last_name', models.TextField()),
+                ('email', models.TextField(unique=True)),
+                ('password', models.TextField()),
+                ('is_admin', models.BooleanField(default=False)),
+                ('is_doctor', models.BooleanField(default=False)),
+                ('is_superadmin', models.BooleanField(default=False)),
+                ('is_in', models.BooleanField(default=True)),
+                ('profile_image', models.TextField(blank=True, null=True)),
+                ('age', models.IntegerField(blank=True, null=True)),
+                ('gender', models.TextField(blank=True, null=True)),
+                ('bio', models.TextField(blank=True, null=True)),
+                ('allergies', models.TextField(blank=True, null=True)),
+                ('medical_conditions', models.TextField(blank=True, null=True)),
+                ('notifications_read_id', models.BigIntegerField(default=0)),
+            ],
+            options={
+                'db_table': 'users',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='PatientRecord',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('record_date', models.DateField(null=True)),
+                ('successful_appointment_visit', models.BooleanField(default=False)),
+                ('doctor_notes', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'patient_records',
+                'managed': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='Doctor',
+            fields=[
+                ('user', models.OneToOneField(db_column='doctor_id', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='doctor', serialize=False, to='main.user')),
+                ('specialization', models.TextField(blank=True, null=True)),
+            ],
+            options={
+                'db_table': 'doctors',
+                'managed': False,
+            },
+        ),
+    ]
@@ -1,3 +1,78 @@
+"""
+ORM models of the Supabase tables, for the "orm" data backend
+(DATA_BACKEND, see main/repositories.py).
+
+The tables are owned by the Supabase migrations (supabase/migrations/), so
+every model is unmanaged: Django never creates or alters them. Only the
+columns the app reads are declared.
+"""
 from django.db import models
 
-# Create your models here.
+
+class User(models.Model):
+    first_name = models.TextField()
+    last_name = models.TextField()
+    email = models.TextField(unique=True)
+    password = models.TextField()
+    is_admin = models.BooleanField(default=False)
+    is_doctor = models.BooleanField(default=False)
+    is_superadmin = models.BooleanField(default=False)
+    is_in = models.BooleanField(default=True)
+    profile_image = models.TextField(null=True, blank=True)
+    age = models.IntegerField(null=True, blank=True)
+    gender = models.TextField(null=True, blank=True)
+    bio = models.TextField(null=True, blank=True)
+    allergies = models.TextField(null=True, blank=True)
+    medical_conditions = models.TextField(null=True, blank=True)
+    notifications_read_id = models.BigIntegerField(default=0)
+
+    class Meta:
+        managed = False
+        db_table = "users"
+
+    def __str__(self):
+        return f"{self.first_name} {self.last_name}"
+
+
+class Doctor(models.Model):
+    user = models.OneToOneField(
+        User, on_delete=models.CASCADE, primary_key=True, db_column="doctor_id", related_name="doctor"
+    )
+    specialization = models.TextField(null=True, blank=True)
+
+    class Meta:
+        managed = False
+        db_table = "doctors"
+
+
+class Appointment(models.Model):
+    patient = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, null=True, db_column="patient_id", db_constraint=False,
+        related_name="appointments",
+    )
+    first_name = models.TextField()
+    last_name = models.TextField()
+    user_email = models.TextField()
+    doctor_name = models.TextField()
+    appointment_date = models.DateField()
+    appointment_time = models.TextField()
+    status = models.TextField(default="Pending")
+    reason_for_visit = models.TextField(null=True, blank=True)
+
+    class Meta:
+        managed = False
+        db_table = "appointment"
+
+
+class PatientRecord(models.Model):
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_column="user_id", related_name="records")
+    appointment = models.ForeignKey(
+        Appointment, on_delete=models.SET_NULL, null=True, db_column="appointment_id", related_name="records"
+    )
+    record_date = models.DateField(null=True)
+    successful_appointment_visit = models.BooleanField(default=False)
+    doctor_notes = models.TextField(null=True, blank=True)
+
+    class Meta:
+        managed = False
+        db_table = "patient_records"
@@ -0,0 +1,171 @@
+"""
+Page caches: per user for the patient pages, shared for anonymous visitors.
+
+cache_user_page covers the patient pages (user_dashboard, appointment_history).
+
+Patients reload their dashboard to check on approvals, and every load
+re-fetches and re-processes all their appointments. The rendered page is
+cached under the user's version number (see cache_utils): every view that
+writes one of the user's appointments calls bump_user_pages(patient_id), so
+a cached page is served until something actually changed, or for at most
+USER_PAGE_CACHE_TTL seconds (the pages depend on today's date as well).
+
+Pages carry an ETag; a browser revalidating with If-None-Match gets a 304.
+
+A page is neither served from nor stored in the cache when:
+- flash messages are pending (they are rendered into the page once);
+- the browser has no CSRF cookie yet (the render is what sets it);
+- the response is not a plain 200, was built from stale data, or was
+  marked with never_cache_page() (an error render: an empty page shown
+  because the fetch failed must not outlive the failure).
+The CSRF cookie is part of the key, so cached forms always carry a token
+that matches the browser's cookie.
+
+cache_anonymous_page caches public pages (home, about, ...) once for every
+visitor who is not logged in, for PUBLIC_PAGE_CACHE_TTL seconds (0 turns it
+off). Logged-in users and requests with pending messages always get a fresh
+render. bump_public_pages() drops them all at once.
+"""
+import hashlib
+import threading
+from datetime import date
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+
+from .cache_utils import bump_version, versioned_key
+
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "bypassed": 0, "not_modified": 0}
+_public_stats = {"hits": 0, "misses": 0, "bypassed": 0, "not_modified": 0}
+
+PUBLIC_NAMESPACE = "public-pages"
+
+
+def _namespace(user_id):
+    return f"user-pages:{user_id}"
+
+
+def bump_user_pages(*user_ids):
+    """Invalidates the cached pages of every given user (None is ignored)."""
+    for user_id in {u for u in user_ids if u is not None}:
+        bump_version(_namespace(user_id))
+
+
+def bump_public_pages():
+    bump_version(PUBLIC_NAMESPACE)
+
+
+def _count(name, stats=_stats):
+    with _stats_lock:
+        stats[name] += 1
+
+
+def _with_hit_rate(stats):
+    with _stats_lock:
+        stats = dict(stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else None
+    return stats
+
+
+def user_page_stats():
+    return _with_hit_rate(_stats)
+
+
+def public_page_stats():
+    return _with_hit_rate(_public_stats)
+
+
+def _finish(request, response, etag, private=True):
+    response["ETag"] = etag
+    # Always revalidated so a change shows on the next reload
+    patch_cache_control(response, no_cache=True, **({"private": True} if private else {"public": True}))
+    return get_conditional_response(request, etag=etag, response=response) or response
+
+
+def never_cache_page(response):
+    """Keeps response out of the page caches (and the browser's)."""
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+def _cacheable(response):
+    return (
+        response.status_code == 200 and not response.streaming and not response.has_header("Warning")
+        and "no-store" not in response.get("Cache-Control", "")
+    )
+
+
+def _etag(content):
+    return f'"{hashlib.md5(content, usedforsecurity=False).hexdigest()}"'
+
+
+def cache_user_page(view_func):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        user_id = request.session.get("user_id")
+        csrf_cookie = request.COOKIES.get(settings.CSRF_COOKIE_NAME)
+        if (request.method not in ("GET", "HEAD") or not user_id or not csrf_cookie
+                or len(get_messages(request))):
+            _count("bypassed")
+            return view_func(request, *args, **kwargs)
+
+        key = versioned_key(
+            _namespace(user_id), view_func.__name__, request.get_full_path(),
+            date.today().isoformat(), hashlib.sha256(csrf_cookie.encode()).hexdigest()[:16],
+        )
+        cached = cache.get(key)
+        if cached is not None:
+            _count("hits")
+            content, content_type, etag = cached
+            response = _finish(request, HttpResponse(content, content_type=content_type), etag)
+            if response.status_code == 304:
+                _count("not_modified")
+            return response
+
+        _count("misses")
+        response = view_func(request, *args, **kwargs)
+        if not _cacheable(response):
+            return response
+
+        etag = _etag(response.content)
+        cache.set(key, (response.content, response["Content-Type"], etag), settings.USER_PAGE_CACHE_TTL)
+        response = _finish(request, response, etag)
+        if response.status_code == 304:
+            _count("not_modified")
+        return response
+    return wrapper
+
+
+def cache_anonymous_page(view_func):
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        timeout = settings.PUBLIC_PAGE_CACHE_TTL
+        if (not timeout or request.method not in ("GET", "HEAD")
+                or request.session.get("user_id") or len(get_messages(request))):
+            _count("bypassed", _public_stats)
+            return view_func(request, *args, **kwargs)
+
+        key = versioned_key(PUBLIC_NAMESPACE, view_func.__name__, request.get_full_path())
+        cached = cache.get(key)
+        if cached is not None:
+            _count("hits", _public_stats)
+            content, content_type, etag = cached
+            response = _finish(request, HttpResponse(content, content_type=content_type), etag, private=False)
+        else:
+            _count("misses", _public_stats)
+            response = view_func(request, *args, **kwargs)
+            if not _cacheable(response):
+                return response
+            etag = _etag(response.content)
+            cache.set(key, (response.content, response["Content-Type"], etag), timeout)
+            response = _finish(request, response, etag, private=False)
+        if response.status_code == 304:
+            _count("not_modified", _public_stats)
+        return response
+    return wrapper
@@ -0,0 +1,56 @@
+"""
+Pagination done by the database.
+
+paginate_query() asks Supabase for one page (offset/limit via .range())
+together with the total row count, and wraps the result in a regular
+Django Page, so templates keep using has_next, number, paginator.num_pages
+and so on. The cost of a page no longer depends on the size of the table.
+"""
+import math
+from collections.abc import Sequence
+
+from django.core.paginator import Paginator
+
+
+class _Window(Sequence):
+    """The fetched rows of one page, posing as the full result list to Paginator."""
+
+    def __init__(self, rows, offset, total):
+        self.rows = rows
+        self.offset = offset
+        self.total = total
+
+    def __len__(self):
+        return self.total
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self.rows[index.start - self.offset:index.stop - self.offset]
+        return self.rows[index - self.offset]
+
+
+def paginate_query(build_query, page_number, per_page):
+    """
+    build_query() must return a fresh select builder made with count="exact"
+    and a stable order. Out-of-range or invalid page numbers behave like
+    Paginator.get_page(): they fall back to the last / first page.
+    """
+    try:
+        number = max(1, int(page_number))
+    except (TypeError, ValueError):
+        number = 1
+
+    def fetch(number):
+        start = (number - 1) * per_page
+        return build_query().range(start, start + per_page - 1).execute()
+
+    response = fetch(number)
+    total = response.count or 0
+    last_page = max(1, math.ceil(total / per_page))
+    if number > last_page:
+        number = last_page
+        response = fetch(number)
+        total = response.count or 0
+
+    window = _Window(response.data or [], (number - 1) * per_page, total)
+    return Paginator(window, per_page).get_page(number)
@@ -0,0 +1,177 @@
+"""
+Password hashing off the request path.
+
+PBKDF2 costs tens of milliseconds of CPU per call. Running it inline means
+a login burst at clinic opening uses every worker thread at once. Here
+hashing goes through a small bounded pool per process:
+
+- at most PASSWORD_HASH_WORKERS hashes run at once (hashlib's PBKDF2
+  releases the GIL, so threads are enough and other requests keep running);
+- at most PASSWORD_HASH_MAX_PENDING requests wait for a slot; beyond that
+  HashingBusy is raised so the view can answer "try again" right away. A
+  hash that outlives PASSWORD_HASH_TIMEOUT also raises HashingBusy; its slot
+  stays taken until the hash actually finishes;
+- queueing / hashing times are kept for /metrics/.
+
+Bulk hashing in a web worker (the admin CSV upload) goes through the same
+pool via HashPoolExecutor, so it counts against the same limits as logins.
+"""
+import os
+import threading
+import time
+from concurrent.futures import Executor, ThreadPoolExecutor, TimeoutError as FutureTimeout
+
+from django.conf import settings
+from django.contrib.auth.hashers import PBKDF2PasswordHasher, check_password, make_password
+
+
+class HashingBusy(Exception):
+    """Raised when the hashing queue is full."""
+
+
+class TunablePBKDF2PasswordHasher(PBKDF2PasswordHasher):
+    """PBKDF2-SHA256 with the iteration count taken from PASSWORD_HASH_ITERATIONS."""
+    iterations = settings.PASSWORD_HASH_ITERATIONS or PBKDF2PasswordHasher.iterations
+
+
+class HashPool:
+    def __init__(self, max_workers, max_pending, timeout):
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_workers + max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self.running = 0
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.timed_out = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.hash_total = 0.0
+
+    @property
+    def executor(self):
+        # Threads do not survive a fork; build the pool in each worker
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix="password-hash"
+                    )
+                    self._pid = os.getpid()
+        return self._executor
+
+    def run(self, func, *args, **kwargs):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise HashingBusy("Too many password checks in progress.")
+
+        submitted = time.monotonic()
+        with self._lock:
+            self.pending += 1
+
+        def task():
+            started = time.monotonic()
+            with self._lock:
+                self.pending -= 1
+                self.running += 1
+                waited = started - submitted
+                self.wait_total += waited
+                self.wait_max = max(self.wait_max, waited)
+            try:
+                return func(*args, **kwargs)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+                    self.hash_total += time.monotonic() - started
+
+        try:
+            future = self.executor.submit(task)
+        except Exception:
+            self._slots.release()
+            raise
+        # Released when the hash finishes, not when the caller gives up on it
+        future.add_done_callback(lambda _: self._slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            with self._lock:
+                self.timed_out += 1
+            raise HashingBusy("Password check timed out.") from None
+
+    def stats(self):
+        done = self.completed or 1
+        return {
+            "workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "running": self.running,
+            "queued": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "timed_out": self.timed_out,
+            "avg_wait_ms": round(self.wait_total / done * 1000, 2),
+            "max_wait_ms": round(self.wait_max * 1000, 2),
+            "avg_hash_ms": round(self.hash_total / done * 1000, 2),
+        }
+
+
+hash_pool = HashPool(
+    max_workers=settings.PASSWORD_HASH_WORKERS,
+    max_pending=settings.PASSWORD_HASH_MAX_PENDING,
+    timeout=settings.PASSWORD_HASH_TIMEOUT,
+)
+
+
+class HashPoolExecutor(Executor):
+    """
+    An Executor whose tasks run on a HashPool (hash_pool by default). At most
+    max_workers of its tasks hold a pool slot at once; a task that finds the
+    pool full fails with HashingBusy.
+    """
+
+    def __init__(self, max_workers, pool=None):
+        self.pool = pool or hash_pool
+        # These threads only wait on the pool; the hashing runs on its threads
+        self._callers = ThreadPoolExecutor(max_workers, thread_name_prefix="hash-pool-caller")
+
+    def submit(self, fn, /, *args, **kwargs):
+        return self._callers.submit(self.pool.run, fn, *args, **kwargs)
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        self._callers.shutdown(wait, cancel_futures=cancel_futures)
+
+
+def hash_password(password):
+    """make_password() on the hashing pool."""
+    return hash_pool.run(make_password, password)
+
+
+def verify_password(password, encoded):
+    """check_password() on the hashing pool."""
+    return hash_pool.run(check_password, password, encoded)
+
+
+def _check_and_rehash(password, encoded):
+    upgraded = []
+    valid = check_password(password, encoded, setter=lambda raw: upgraded.append(make_password(raw)))
+    return valid, upgraded[0] if upgraded else None
+
+
+def verify_password_for_upgrade(password, encoded):
+    """
+    (valid, new_hash), both computed on the hashing pool.
+
+    new_hash is a fresh hash when the password is correct but the stored one
+    uses an old algorithm or iteration count, else None. The caller saves it,
+    so no database write ever holds a hashing slot.
+    """
+    return hash_pool.run(_check_and_rehash, password, encoded)
+
+
+def hashing_stats():
+    return hash_pool.stats()
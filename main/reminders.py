@@ -0,0 +1,157 @@
+"""
+Appointment reminders, precomputed by "python manage.py send_reminders".
+
+run_reminders() finds the Approved appointments dated from today to
+REMINDER_DAYS days ahead with one range query, records a row in
+appointment_reminders for each one not reminded yet, and emails the
+patients in batches of REMINDER_BATCH_SIZE over one backend connection
+each. A reminder is keyed on (appointment_id, appointment_date,
+appointment_time), so a rescheduled appointment is reminded again for its
+new slot and never twice for the same one.
+
+Each batch is claimed before it is sent: one update sets claimed_at on the
+rows that are still unsent and unclaimed, and only the rows it returns are
+emailed, so overlapping runs (cron and --loop) never send the same
+reminder. emailed_at is then set per message that went out; rows whose
+message failed are released for the next run. A claim left by a run that
+died is taken over after REMINDER_CLAIM_SECONDS.
+
+The user dashboard reads these rows (reminders_for) instead of deriving
+reminders from every appointment on each page load.
+"""
+import time
+from datetime import date, datetime, timedelta, timezone
+
+from django.conf import settings
+
+from .email_utils import send_appointment_emails
+from .page_cache import bump_user_pages
+from .supabase_client import supabase
+
+TABLE = "appointment_reminders"
+APPOINTMENT_COLUMNS = (
+    "id, patient_id, first_name, last_name, user_email, doctor_name, appointment_date, appointment_time"
+)
+LOOKUP_CHUNK = 500
+
+
+def _key(row, id_field):
+    return (row[id_field], str(row["appointment_date"])[:10], row["appointment_time"])
+
+
+def due_appointments(today, days):
+    """Approved appointments dated today .. today + days, in one query."""
+    return supabase.uncached.table("appointment").select(APPOINTMENT_COLUMNS)\
+        .eq("status", "Approved")\
+        .gte("appointment_date", today.isoformat())\
+        .lte("appointment_date", (today + timedelta(days=days)).isoformat())\
+        .order("appointment_date").order("id")\
+        .execute().data or []
+
+
+def _existing(appointment_ids):
+    rows = []
+    for start in range(0, len(appointment_ids), LOOKUP_CHUNK):
+        chunk = appointment_ids[start:start + LOOKUP_CHUNK]
+        rows += supabase.uncached.table(TABLE).select("*").in_("appointment_id", chunk).execute().data or []
+    return rows
+
+
+def _now():
+    return datetime.now(timezone.utc)
+
+
+def _claim(ids):
+    """The rows of ids this run may send: unsent, and unclaimed or claimed too long ago."""
+    expired = (_now() - timedelta(seconds=settings.REMINDER_CLAIM_SECONDS)).strftime("%Y-%m-%dT%H:%M:%SZ")
+    return supabase.table(TABLE).update({"claimed_at": _now().isoformat()})\
+        .in_("id", ids)\
+        .is_("emailed_at", "null")\
+        .or_(f"claimed_at.is.null,claimed_at.lt.{expired}")\
+        .execute().data or []
+
+
+def run_reminders(today=None, days=None, batch_size=None, dry_run=False):
+    """One pass; returns {"due", "recorded", "sent", "failed", "elapsed"}."""
+    started = time.monotonic()
+    today = today or date.today()
+    days = settings.REMINDER_DAYS if days is None else days
+    batch_size = batch_size or settings.REMINDER_BATCH_SIZE
+    stats = {"due": 0, "recorded": 0, "sent": 0, "failed": 0}
+
+    due = due_appointments(today, days)
+    stats["due"] = len(due)
+    if not due:
+        stats["elapsed"] = time.monotonic() - started
+        return stats
+
+    existing = {_key(row, "appointment_id"): row for row in _existing(sorted({a["id"] for a in due}))}
+    new = [
+        {
+            "appointment_id": a["id"],
+            "patient_id": a.get("patient_id"),
+            "user_email": a.get("user_email"),
+            "doctor_name": a["doctor_name"],
+            "appointment_date": str(a["appointment_date"])[:10],
+            "appointment_time": a["appointment_time"],
+        }
+        for a in due if _key(a, "id") not in existing
+    ]
+    if dry_run:
+        stats["recorded"] = len(new)
+        stats["elapsed"] = time.monotonic() - started
+        return stats
+
+    if new:
+        new = supabase.table(TABLE).upsert(
+            new, on_conflict="appointment_id,appointment_date,appointment_time", ignore_duplicates=True
+        ).execute().data or []
+        stats["recorded"] = len(new)
+        bump_user_pages(*(row.get("patient_id") for row in new))
+
+    names = {a["id"]: f"{a.get('first_name')} {a.get('last_name')}" for a in due}
+    pending = [row for row in list(existing.values()) + new if not row.get("emailed_at") and row.get("user_email")]
+    for start in range(0, len(pending), batch_size):
+        batch = _claim([row["id"] for row in pending[start:start + batch_size]])
+        if not batch:
+            continue
+        results = send_appointment_emails([
+            {
+                "user_name": names.get(row["appointment_id"], ""),
+                "user_email": row["user_email"],
+                "doctor_name": row["doctor_name"],
+                "appointment_date": row["appointment_date"],
+                "appointment_time": row["appointment_time"],
+                "status": "Reminder",
+            }
+            for row in batch
+        ])
+        sent = [row["id"] for row, ok in zip(batch, results) if ok]
+        failed = [row["id"] for row, ok in zip(batch, results) if not ok]
+        if sent:
+            supabase.table(TABLE).update({"emailed_at": _now().isoformat()}).in_("id", sent).execute()
+        if failed:
+            supabase.table(TABLE).update({"claimed_at": None}).in_("id", failed).execute()
+        stats["sent"] += len(sent)
+        stats["failed"] += len(failed)
+
+    stats["elapsed"] = time.monotonic() - started
+    return stats
+
+
+def reminders_for(user_email, appointments, today=None):
+    """
+    The appointments (already fetched for the page) that have a reminder for
+    their current slot and are still Approved and not past.
+    """
+    today = (today or date.today()).isoformat()
+    rows = supabase.table(TABLE).select("appointment_id, appointment_date, appointment_time")\
+        .eq("user_email", user_email).gte("appointment_date", today)\
+        .execute().data or []
+    reminded = {_key(row, "appointment_id") for row in rows}
+    return [
+        appt for appt in appointments
+        if appt.get("status") == "Approved"
+        and str(appt["appointment_date"])[:10] >= today
+        and _key(appt, "id") in reminded
+    ]
@@ -0,0 +1,196 @@
+"""
+Data access for the hot views, with two interchangeable backends chosen per
+deployment by DATA_BACKEND:
+
+- SupabaseRepository: PostgREST through main.supabase_client (cached reads,
+  circuit breaker, replica routing), as the app always did;
+- OrmRepository: the Django ORM (main/models.py) over a direct, pooled
+  connection to DATABASE_URL. Related rows come from select_related joins,
+  the dashboard counts from one aggregate query per table, and an
+  appointment and its patient record are created in one transaction.
+
+Both return plain dicts shaped like the PostgREST responses (dates as
+"YYYY-MM-DD" strings, embeds as nested dicts), so views and templates do
+not care which one is in use. ORM writes invalidate the Supabase query
+cache of the tables they touch, so the two paths can run side by side.
+
+    from .repositories import get_repository
+    appointments = get_repository().appointments(doctor_name)
+"""
+from datetime import date, datetime
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q
+
+from .db_routing import note_write
+from .models import Appointment, PatientRecord, User
+from .supabase_client import supabase
+
+USER_LIST_COLUMNS = [
+    "id", "first_name", "last_name", "email", "is_admin", "is_doctor", "is_superadmin", "is_in", "profile_image",
+]
+APPOINTMENT_COLUMNS = [
+    "id", "patient_id", "first_name", "last_name", "user_email", "doctor_name",
+    "appointment_date", "appointment_time", "status", "reason_for_visit",
+]
+RECORD_COLUMNS = ["id", "user_id", "appointment_id", "record_date", "successful_appointment_visit", "doctor_notes"]
+
+
+def _plain(row):
+    """Dates as the ISO strings PostgREST returns."""
+    return {k: v.isoformat() if isinstance(v, (date, datetime)) else v for k, v in row.items()}
+
+
+class SupabaseRepository:
+    name = "supabase"
+
+    def appointments(self, doctor_name=None):
+        """Every appointment (a doctor's only, if given), soonest first."""
+        query = supabase.table("appointment").select("*").order("appointment_date", desc=False)
+        if doctor_name:
+            query = query.eq("doctor_name", doctor_name)
+        return query.execute().data or []
+
+    def user_appointments(self, user_email, newest_first=False):
+        return supabase.table("appointment").select("*").eq("user_email", user_email)\
+            .order("appointment_date", desc=newest_first).execute().data or []
+
+    def patient_records(self):
+        """Records newest first, with user_id / appointment_id embedded as on the list page."""
+        return supabase.table("patient_records")\
+            .select("*, user_id(first_name, last_name), appointment_id(doctor_name, appointment_date, status)")\
+            .order("record_date", desc=True).execute().data or []
+
+    def booked_times(self, appointment_date, doctor_name, exclude_id=None):
+        query = supabase.table("appointment").select("appointment_time")\
+            .eq("appointment_date", appointment_date).eq("doctor_name", doctor_name)
+        if exclude_id:
+            query = query.neq("id", exclude_id)
+        return [row["appointment_time"] for row in query.execute().data or []]
+
+    def users_by_last_name(self):
+        return supabase.table("users").select(", ".join(USER_LIST_COLUMNS))\
+            .order("last_name", desc=False).execute().data or []
+
+    def admin_dashboard(self, doctor_name=None):
+        """The admin dashboard's counts, five latest appointments and five newest users."""
+        def count(query):
+            return query.execute().count or 0
+
+        def users():
+            return supabase.table("users").select("id", count="exact")
+
+        pending = supabase.table("appointment").select("id", count="exact").eq("status", "Pending")
+        recent = supabase.table("appointment").select("*").order("appointment_date", desc=True).limit(5)
+        if doctor_name:
+            pending = pending.eq("doctor_name", doctor_name)
+            recent = recent.eq("doctor_name", doctor_name)
+        return {
+            "total_patients": count(users().eq("is_doctor", False).eq("is_admin", False)),
+            "total_doctors": count(users().eq("is_doctor", True)),
+            "active_doctors": count(users().eq("is_doctor", True).eq("is_in", True)),
+            "total_appointments": count(supabase.table("appointment").select("id", count="exact")),
+            "pending_appointments": count(pending),
+            "appointments": recent.execute().data or [],
+            "recent_activity": supabase.table("users").select(", ".join(USER_LIST_COLUMNS)).eq("is_admin", False)
+                .order("id", desc=True).limit(5).execute().data or [],
+        }
+
+    def create_appointment(self, appointment, record):
+        """Inserts the appointment, then its patient record (record gets appointment_id)."""
+        inserted = supabase.table("appointment").insert(appointment).execute().data[0]
+        supabase.table("patient_records").insert(dict(record, appointment_id=inserted["id"])).execute()
+        return inserted
+
+
+class OrmRepository:
+    name = "orm"
+
+    def appointments(self, doctor_name=None):
+        query = Appointment.objects.order_by("appointment_date")
+        if doctor_name:
+            query = query.filter(doctor_name=doctor_name)
+        return [_plain(row) for row in query.values(*APPOINTMENT_COLUMNS)]
+
+    def user_appointments(self, user_email, newest_first=False):
+        order = "-appointment_date" if newest_first else "appointment_date"
+        query = Appointment.objects.filter(user_email=user_email).order_by(order)
+        return [_plain(row) for row in query.values(*APPOINTMENT_COLUMNS)]
+
+    def patient_records(self):
+        query = PatientRecord.objects.select_related("user", "appointment").order_by("-record_date")
+        records = []
+        for record in query:
+            appointment = record.appointment
+            records.append(_plain({
+                "id": record.id,
+                "record_date": record.record_date,
+                "successful_appointment_visit": record.successful_appointment_visit,
+                "doctor_notes": record.doctor_notes,
+                "user_id": {"first_name": record.user.first_name, "last_name": record.user.last_name},
+                "appointment_id": _plain({
+                    "doctor_name": appointment.doctor_name,
+                    "appointment_date": appointment.appointment_date,
+                    "status": appointment.status,
+                }) if appointment else None,
+            }))
+        return records
+
+    def booked_times(self, appointment_date, doctor_name, exclude_id=None):
+        query = Appointment.objects.filter(appointment_date=appointment_date, doctor_name=doctor_name)
+        if exclude_id:
+            query = query.exclude(id=exclude_id)
+        return list(query.values_list("appointment_time", flat=True))
+
+    def users_by_last_name(self):
+        return list(User.objects.order_by("last_name").values(*USER_LIST_COLUMNS))
+
+    def admin_dashboard(self, doctor_name=None):
+        users = User.objects.aggregate(
+            total_patients=Count("id", filter=Q(is_doctor=False, is_admin=False)),
+            total_doctors=Count("id", filter=Q(is_doctor=True)),
+            active_doctors=Count("id", filter=Q(is_doctor=True, is_in=True)),
+        )
+        pending = Q(status="Pending", doctor_name=doctor_name) if doctor_name else Q(status="Pending")
+        appointments = Appointment.objects.aggregate(
+            total_appointments=Count("id"),
+            pending_appointments=Count("id", filter=pending),
+        )
+        recent = Appointment.objects.order_by("-appointment_date")
+        if doctor_name:
+            recent = recent.filter(doctor_name=doctor_name)
+        return {
+            **users,
+            **appointments,
+            "appointments": [_plain(row) for row in recent.values(*APPOINTMENT_COLUMNS)[:5]],
+            "recent_activity": list(
+                User.objects.filter(is_admin=False).order_by("-id").values(*USER_LIST_COLUMNS)[:5]
+            ),
+        }
+
+    def create_appointment(self, appointment, record):
+        """Both rows in one transaction: no appointment is left without its record."""
+        with transaction.atomic():
+            created = Appointment.objects.create(**appointment)
+            PatientRecord.objects.create(appointment=created, **record)
+        for table in ("appointment", "patient_records"):
+            supabase.invalidate(table)
+        note_write()
+        return _plain({column: getattr(created, column) for column in APPOINTMENT_COLUMNS})
+
+
+BACKENDS = {
+    "supabase": SupabaseRepository,
+    "orm": OrmRepository,
+}
+
+_repositories = {}
+
+
+def get_repository(backend=None):
+    """The repository for backend (default: DATA_BACKEND), one per process."""
+    backend = backend or settings.DATA_BACKEND
+    if backend not in _repositories:
+        _repositories[backend] = BACKENDS[backend]()
+    return _repositories[backend]
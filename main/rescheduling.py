@@ -0,0 +1,240 @@
+"""
+Rescheduling a doctor's appointments when they are unavailable for a range
+of dates.
+
+plan_unavailability() proposes a new home for every Pending / Approved
+appointment of the doctor in the range, from three queries: the doctors
+(see doctor_search.fetch_doctors), the affected appointments, and the
+bookings of the doctor and their colleagues of the same specialization from
+the start of the range to SEARCH_DAYS after its end. Proposals are made in
+one pass over the appointments, marking each chosen slot as taken:
+
+1. the same date and time with a colleague of the same specialization who
+   is in and free then (the least busy one that day);
+2. otherwise the doctor's own next free slot after the range;
+3. otherwise none; staff have to handle it by hand.
+
+apply_proposals() checks every accepted target (a known slot and date, and
+the doctor themselves or a colleague of the same specialization who is in),
+re-reads the accepted appointments and drops any that changed since the
+plan. The remaining moves go to the database as one conditional update (the
+reschedule_appointments RPC): a move only goes through if the appointment
+is still exactly as it was read and its target slot is still free, so a
+change made in the meantime (a cancellation, an edit, a delete, a booking)
+is never overwritten and the move is reported as changed or taken. The
+moves that went through are logged to appointment_events and the patients'
+emails are queued as one batch.
+"""
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+from .appointment_events import event, log_events
+from .db_routing import note_write
+from .doctor_search import fetch_doctors
+from .email_utils import queue_appointment_emails
+from .page_cache import bump_user_pages
+from .supabase_client import supabase
+
+TIME_SLOTS = [
+    "08:00 AM", "08:30 AM", "09:00 AM", "09:30 AM", "10:00 AM", "10:30 AM",
+    "11:00 AM", "11:30 AM", "12:00 PM", "12:30 PM", "01:00 PM", "01:30 PM",
+    "02:00 PM", "02:30 PM", "03:00 PM", "03:30 PM", "04:00 PM", "04:30 PM",
+    "05:00 PM",
+]
+
+SEARCH_DAYS = 14
+ACTIVE_STATUSES = ["Pending", "Approved"]
+FREEING_STATUSES = ["Cancelled", "Declined"]
+
+
+def normalize_time(value):
+    """"9:00 AM" / "09:00" -> "09:00 AM", as the slots are stored; None if unparseable."""
+    for fmt in ("%I:%M %p", "%H:%M", "%H:%M:%S"):
+        try:
+            return datetime.strptime((value or "").strip(), fmt).strftime("%I:%M %p")
+        except ValueError:
+            continue
+    return None
+
+
+def _bookings(doctor_names, start, end):
+    """{(doctor_name, "YYYY-MM-DD", "hh:mm AM")} of the slots taken between start and end."""
+    rows = supabase.uncached.table("appointment").select("doctor_name, appointment_date, appointment_time")\
+        .in_("doctor_name", sorted(doctor_names))\
+        .gte("appointment_date", start.isoformat())\
+        .lte("appointment_date", end.isoformat())\
+        .not_.in_("status", FREEING_STATUSES)\
+        .execute().data or []
+    return {
+        (row["doctor_name"], row["appointment_date"][:10], normalize_time(row["appointment_time"]))
+        for row in rows
+    }
+
+
+def plan_unavailability(doctor_id, start, end, search_days=SEARCH_DAYS):
+    """(doctor, proposals) for doctor_id being away from start to end (dates, inclusive)."""
+    doctors = fetch_doctors()
+    doctor = next((d for d in doctors if str(d["id"]) == str(doctor_id)), None)
+    if doctor is None:
+        raise ValueError("Doctor not found or has no specialization.")
+    name = f"{doctor['first_name']} {doctor['last_name']}"
+    colleagues = sorted(
+        f"{d['first_name']} {d['last_name']}"
+        for d in doctors
+        if d["id"] != doctor["id"] and d["specialization"] == doctor["specialization"] and d.get("is_in", True)
+    )
+
+    affected = supabase.uncached.table("appointment").select("*")\
+        .eq("doctor_name", name)\
+        .gte("appointment_date", start.isoformat())\
+        .lte("appointment_date", end.isoformat())\
+        .in_("status", ACTIVE_STATUSES)\
+        .order("appointment_date").order("id")\
+        .execute().data or []
+
+    last_day = end + timedelta(days=search_days)
+    booked = _bookings(set(colleagues) | {name}, start, last_day)
+    load = Counter((doctor_name, day) for doctor_name, day, _ in booked)
+
+    proposals = []
+    for appointment in affected:
+        day = appointment["appointment_date"][:10]
+        slot = normalize_time(appointment["appointment_time"])
+        target = None
+
+        free = [c for c in colleagues if (c, day, slot) not in booked]
+        if free and slot:
+            colleague = min(free, key=lambda c: load[(c, day)])
+            target = {"kind": "reassign", "doctor_name": colleague, "appointment_date": day, "appointment_time": slot}
+        else:
+            candidate = end + timedelta(days=1)
+            while target is None and candidate <= last_day:
+                for time_slot in TIME_SLOTS:
+                    if (name, candidate.isoformat(), time_slot) not in booked:
+                        target = {"kind": "move", "doctor_name": name,
+                                  "appointment_date": candidate.isoformat(), "appointment_time": time_slot}
+                        break
+                candidate += timedelta(days=1)
+
+        if target:
+            key = (target["doctor_name"], target["appointment_date"], target["appointment_time"])
+            booked.add(key)
+            load[key[:2]] += 1
+        proposals.append({
+            "appointment": appointment,
+            "expected": {"doctor_name": name, "appointment_date": day, "appointment_time": slot},
+            "target": target,
+        })
+
+    return dict(doctor, name=name), proposals
+
+
+def _valid_target(a, doctors):
+    """The target of accepted proposal a with its time normalized, or None if it is not a slot it could move to."""
+    target, expected = a.get("target"), a.get("expected")
+    if not isinstance(target, dict) or not isinstance(expected, dict):
+        return None
+    try:
+        day = date.fromisoformat(str(target.get("appointment_date"))[:10]).isoformat()
+    except ValueError:
+        return None
+    slot = normalize_time(target.get("appointment_time"))
+    source = doctors.get(expected.get("doctor_name"))
+    doctor = doctors.get(target.get("doctor_name"))
+    if slot not in TIME_SLOTS or source is None or doctor is None:
+        return None
+    # The doctor's own later slot, or a colleague of the same specialization who is in
+    if doctor is not source and (not doctor.get("is_in", True) or doctor["specialization"] != source["specialization"]):
+        return None
+    return {"doctor_name": target["doctor_name"], "appointment_date": day, "appointment_time": slot}
+
+
+def apply_proposals(accepted, actor=None):
+    """
+    accepted: [{"id", "expected": {doctor_name, appointment_date, appointment_time},
+    "target": {doctor_name, appointment_date, appointment_time}}].
+    Returns {id: outcome}: "rescheduled", "changed" (the appointment moved
+    or changed status since the plan), "taken" (the target slot was booked
+    meanwhile), "invalid" (the target is not a slot, a date, or a doctor it
+    could move to) or "not_found". Each move is logged as a "rescheduled"
+    event by actor ({"actor_id", "actor_role"}).
+    """
+    if not accepted:
+        return {}
+    doctors = {f"{d['first_name']} {d['last_name']}": d for d in fetch_doctors()}
+    ids = [a["id"] for a in accepted]
+    current = {
+        row["id"]: row
+        for row in supabase.uncached.table("appointment").select("*").in_("id", ids).execute().data or []
+    }
+
+    outcomes = {}
+    moves = {}
+    claimed = set()
+    for a in accepted:
+        row = current.get(a["id"])
+        target = _valid_target(a, doctors)
+        expected = a["expected"] if target else {}
+        if row is None:
+            outcomes[a["id"]] = "not_found"
+        elif target is None:
+            outcomes[a["id"]] = "invalid"
+        elif (row["status"] not in ACTIVE_STATUSES
+              or row["doctor_name"] != expected.get("doctor_name")
+              or row["appointment_date"][:10] != expected.get("appointment_date")
+              or normalize_time(row["appointment_time"]) != expected.get("appointment_time")):
+            outcomes[a["id"]] = "changed"
+        elif tuple(target.values()) in claimed:
+            # The RPC only sees bookings from before it runs, not the batch's own moves
+            outcomes[a["id"]] = "taken"
+        else:
+            claimed.add(tuple(target.values()))
+            moves[row["id"]] = (row, target)
+
+    if not moves:
+        return outcomes
+
+    # One conditional update for the whole batch: a move only goes through
+    # if the row is still exactly as read above and the target slot is free
+    # (supabase/migrations/20261019200000_reschedule_appointments.sql)
+    results = supabase.rpc("reschedule_appointments", {"moves": [
+        {
+            "id": row["id"],
+            "status": row["status"],
+            "doctor_name": row["doctor_name"],
+            "appointment_date": row["appointment_date"][:10],
+            "appointment_time": row["appointment_time"],
+            "new_doctor_name": slot["doctor_name"],
+            "new_date": slot["appointment_date"],
+            "new_time": slot["appointment_time"],
+        }
+        for row, slot in moves.values()
+    ]}).execute().data or []
+    supabase.invalidate("appointment")
+    note_write()
+    outcomes.update({result["appointment_id"]: result["outcome"] for result in results})
+
+    updates = []
+    events = []
+    for appointment_id, (row, slot) in moves.items():
+        outcomes.setdefault(appointment_id, "changed")
+        if outcomes[appointment_id] != "rescheduled":
+            continue
+        updates.append(dict(row, **slot))
+        events.append(event(row, "rescheduled", row["status"], row["status"], actor or {}, **slot))
+
+    if updates:
+        log_events(events)
+        bump_user_pages(*(row.get("patient_id") for row in updates))
+        queue_appointment_emails([
+            {
+                "user_name": f"{row.get('first_name')} {row.get('last_name')}",
+                "user_email": row.get("user_email"),
+                "doctor_name": row["doctor_name"],
+                "appointment_date": row["appointment_date"],
+                "appointment_time": row["appointment_time"],
+                "status": "Rescheduled",
+            }
+            for row in updates
+        ])
+    return outcomes
@@ -0,0 +1,139 @@
+"""
+Keeps views responsive while Supabase is slow or down.
+
+- CircuitBreaker: after repeated transport failures/timeouts, calls fail
+  fast with CircuitOpenError for a cool-down period instead of tying up
+  every worker on hung HTTP requests.
+- serve_stale_on_error: read-only views opt in to being served the last
+  known good query result when the live call fails. The page is rendered
+  with a "stale data" banner (see the supabase_status context processor)
+  and a `Warning: 110` header.
+"""
+import contextvars
+import threading
+import time
+from functools import wraps
+
+import httpx
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Supabase while the circuit is open."""
+
+
+# Failures that mean "Supabase is unreachable", as opposed to a bad query
+OUTAGE_ERRORS = (httpx.TransportError, CircuitOpenError)
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.rejected = 0
+        self.trips = 0
+        self._lock = threading.Lock()
+        self._trial_running = False
+
+    def _before_call(self):
+        with self._lock:
+            if self.state == self.OPEN:
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    self.rejected += 1
+                    raise CircuitOpenError("Supabase circuit is open; failing fast.")
+                self.state = self.HALF_OPEN
+            if self.state == self.HALF_OPEN:
+                # Only one trial request probes a recovering backend
+                if self._trial_running:
+                    self.rejected += 1
+                    raise CircuitOpenError("Supabase circuit is half-open; trial in progress.")
+                self._trial_running = True
+
+    def _on_success(self):
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_running = False
+
+    def _on_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.trips += 1
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def call(self, func, *args, **kwargs):
+        self._before_call()
+        try:
+            result = func(*args, **kwargs)
+        except httpx.TransportError:
+            self._on_failure()
+            raise
+        except Exception:
+            # The backend answered (e.g. a PostgREST 4xx): it is reachable
+            self._on_success()
+            raise
+        self._on_success()
+        return result
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "rejected_calls": self.rejected,
+        }
+
+
+# ============================================================
+# STALE-WHILE-ERROR FOR READ-ONLY VIEWS
+# ============================================================
+_stale_allowed = contextvars.ContextVar("supabase_stale_allowed", default=False)
+_served_stale = contextvars.ContextVar("supabase_served_stale", default=False)
+
+stale_stats = {"served": 0}
+
+
+def stale_allowed():
+    return _stale_allowed.get()
+
+
+def mark_served_stale():
+    stale_stats["served"] += 1
+    _served_stale.set(True)
+
+
+def served_stale():
+    return _served_stale.get()
+
+
+def serve_stale_on_error(view_func):
+    """Lets a read-only view fall back to the last known good query results."""
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        allowed_token = _stale_allowed.set(True)
+        served_token = _served_stale.set(False)
+        try:
+            response = view_func(request, *args, **kwargs)
+            if _served_stale.get():
+                response["Warning"] = '110 - "Response is Stale"'
+                response["Cache-Control"] = "no-store"
+            return response
+        finally:
+            _stale_allowed.reset(allowed_token)
+            _served_stale.reset(served_token)
+    return _wrapped_view
+
+
+def supabase_status(request):
+    """Context processor: lets templates show a banner for stale data."""
+    return {"serving_stale_data": served_stale()}
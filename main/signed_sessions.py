@@ -0,0 +1,104 @@
+"""
+Stateless session engine (SESSION_MODE=signed).
+
+The whole session lives in a signed cookie, so reading `user_id`, `role`,
+`is_doctor`, ... costs no cache or database lookup. The payload is kept
+small: the identity keys the views use are stored under one-letter
+aliases, together with a payload version, an issue time and a random
+session id (jti).
+
+Signed cookies cannot be deleted server-side, so a revocation list in the
+default cache covers the cases that must end a session everywhere:
+- flush() (logout, change_password, delete_account) revokes the cookie's jti;
+- revoke_user_sessions(user_id) (delete_account, delete_user) rejects every
+  cookie for that user issued before now.
+Both entries expire with SESSION_COOKIE_AGE, when the cookie would anyway.
+Use a shared CACHE_BACKEND so revocations reach every worker.
+"""
+import secrets
+import time
+
+from django.conf import settings
+from django.contrib.sessions.backends import signed_cookies
+from django.core import signing
+from django.core.cache import cache
+
+PAYLOAD_VERSION = 1
+
+ALIASES = {
+    "user_id": "u",
+    "user_email": "e",
+    "first_name": "f",
+    "role": "r",
+    "is_doctor": "d",
+    "_jti": "j",
+    "_iat": "i",
+}
+EXPANSIONS = {short: name for name, short in ALIASES.items()}
+
+SALT = "django.contrib.sessions.backends.signed_cookies"
+
+
+def _revoked_jti_key(jti):
+    return f"session:revoked:{jti}"
+
+
+def _revoked_user_key(user_id):
+    return f"session:revoked-before:{user_id}"
+
+
+def revoke_user_sessions(user_id):
+    """Invalidates every signed session of user_id issued up to now."""
+    cache.set(_revoked_user_key(user_id), time.time(), timeout=settings.SESSION_COOKIE_AGE)
+
+
+class SessionStore(signed_cookies.SessionStore):
+
+    def load(self):
+        try:
+            payload = signing.loads(
+                self.session_key,
+                serializer=self.serializer,
+                max_age=self.get_session_cookie_age(),
+                salt=SALT,
+            )
+        except Exception:
+            self.create()
+            return {}
+
+        if payload.pop("v", None) != PAYLOAD_VERSION:
+            # Cookie from an older payload format: start a fresh session
+            self.create()
+            return {}
+
+        session = {EXPANSIONS.get(k, k): v for k, v in payload.items()}
+        if self._is_revoked(session):
+            self.create()
+            return {}
+        return session
+
+    def _is_revoked(self, session):
+        jti = session.get("_jti")
+        if jti and cache.get(_revoked_jti_key(jti)):
+            return True
+        user_id = session.get("user_id")
+        if user_id is not None:
+            revoked_before = cache.get(_revoked_user_key(user_id))
+            if revoked_before and session.get("_iat", 0) <= revoked_before:
+                return True
+        return False
+
+    def _get_session_key(self):
+        session = self._session
+        if session and "_jti" not in session:
+            session["_jti"] = secrets.token_urlsafe(9)
+            session["_iat"] = int(time.time())
+        payload = {ALIASES.get(k, k): v for k, v in session.items()}
+        payload["v"] = PAYLOAD_VERSION
+        return signing.dumps(payload, compress=True, salt=SALT, serializer=self.serializer)
+
+    def flush(self):
+        jti = self._session.get("_jti")
+        if jti:
+            cache.set(_revoked_jti_key(jti), True, timeout=self.get_session_cookie_age())
+        super().flush()
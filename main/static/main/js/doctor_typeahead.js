@@ -0,0 +1,65 @@
+// Doctor typeahead backed by /doctors/search/ (main/doctor_search.py).
+//
+//   attachDoctorTypeahead(input, {url, available: true, onPick: doctor => ...})
+//
+// doctor is {id, name, specialization, is_in, score}.
+function attachDoctorTypeahead(input, options) {
+  const list = document.createElement("ul");
+  list.className = "doctor-suggestions";
+  list.style.cssText =
+    "display:none;position:absolute;z-index:20;left:0;right:0;margin:2px 0 0;padding:0;" +
+    "list-style:none;background:#fff;border:1px solid #ccd;border-radius:8px;" +
+    "box-shadow:0 6px 18px rgba(0,0,0,.12);max-height:260px;overflow-y:auto;";
+  input.parentNode.style.position = "relative";
+  input.parentNode.appendChild(list);
+  input.setAttribute("autocomplete", "off");
+
+  let timer = null;
+  let latest = 0;
+
+  function close() {
+    list.style.display = "none";
+    list.innerHTML = "";
+  }
+
+  function show(results) {
+    list.innerHTML = "";
+    if (!results.length) {
+      close();
+      return;
+    }
+    results.forEach(doctor => {
+      const item = document.createElement("li");
+      item.style.cssText = "padding:8px 12px;cursor:pointer;" + (doctor.is_in ? "" : "color:#999;");
+      item.textContent = "Dr. " + doctor.name + " — " + doctor.specialization + (doctor.is_in ? "" : " (not in)");
+      item.addEventListener("mousedown", event => {
+        event.preventDefault();
+        input.value = doctor.name;
+        close();
+        options.onPick(doctor);
+      });
+      list.appendChild(item);
+    });
+    list.style.display = "block";
+  }
+
+  input.addEventListener("input", () => {
+    clearTimeout(timer);
+    const query = input.value.trim();
+    if (!query) {
+      close();
+      return;
+    }
+    timer = setTimeout(() => {
+      const request = ++latest;
+      const params = new URLSearchParams({q: query});
+      if (options.available) params.set("available", "1");
+      fetch(options.url + "?" + params, {headers: {"Accept": "application/json"}})
+        .then(response => response.ok ? response.json() : {results: []})
+        .then(data => { if (request === latest) show(data.results); })
+        .catch(close);
+    }, 120);
+  });
+  input.addEventListener("blur", close);
+  input.addEventListener("keydown", event => { if (event.key === "Escape") close(); });
+}
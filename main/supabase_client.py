@@ -1,9 +1,390 @@
-from supabase import create_client, Client
 from django.conf import settings
+from collections import OrderedDict
+import copy
+import os
+import re
 import sys
+import threading
+import time
 
-# Initialize supabase to None first
-supabase: Client | None = None
+import httpx
+
+from .cache_utils import get_version, bump_version
+from .db_routing import replica_allowed, note_write, count_replica_read
+from .resilience import CircuitBreaker, OUTAGE_ERRORS, stale_allowed, mark_served_stale, stale_stats
+
+try:
+    import h2  # noqa: F401  (lets httpx negotiate HTTP/2)
+    HTTP2_AVAILABLE = True
+except ImportError:
+    HTTP2_AVAILABLE = False
+
+
+# ============================================================
+# HTTP TRANSPORT
+# ============================================================
+class PooledTransport:
+    """
+    One keep-alive connection pool per worker process.
+
+    Without this, every supabase Client opens separate httpx pools for
+    PostgREST, storage and auth with library defaults. Here all of them
+    share one explicitly sized httpx.Client. httpx/httpcore pools are
+    thread-safe, so gthread and ASGI threads reuse the same connections.
+
+    The pool remembers the pid it was built in. In a forked child
+    (gunicorn --preload) it is rebuilt on first use and the inherited one
+    is dropped without close(): closing it would send TLS/HTTP2 shutdown
+    frames on sockets the master still owns.
+    """
+
+    def __init__(self, timeout, limits, http2=True):
+        self.timeout = timeout
+        self.limits = limits
+        self.http2 = http2 and HTTP2_AVAILABLE
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.pools_built = 0
+
+    def _count_request(self, request):
+        self.requests += 1
+
+    @property
+    def client(self):
+        if self._client is None or self._pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._pid != os.getpid():
+                    self._client = httpx.Client(
+                        timeout=self.timeout,
+                        limits=self.limits,
+                        http2=self.http2,
+                        follow_redirects=True,
+                        event_hooks={"request": [self._count_request]},
+                    )
+                    self._pid = os.getpid()
+                    self.pools_built += 1
+        return self._client
+
+    def reset(self):
+        """Forget the pool (used after fork); the next call builds a new one."""
+        self._client = None
+        self._pid = None
+
+    def stats(self):
+        pool = getattr(getattr(self._client, "_transport", None), "_pool", None)
+        return {
+            "pid": self._pid,
+            "http2": self.http2,
+            "max_connections": self.limits.max_connections,
+            "max_keepalive_connections": self.limits.max_keepalive_connections,
+            "open_connections": len(getattr(pool, "connections", [])),
+            "requests": self.requests,
+            "pools_built": self.pools_built,
+        }
+
+
+# ============================================================
+# QUERY RESULT CACHE
+# ============================================================
+# Reads (GET/HEAD) are cached per table + normalised filter chain.
+# Any insert / update / upsert / delete through the wrapper bumps the
+# table version, which invalidates every cached read touching that
+# table on every worker (see cache_utils).
+WRITE_METHODS = {"POST", "PATCH", "PUT", "DELETE"}
+
+# Embeds that go through a foreign-key column instead of the table name,
+# e.g. select("*, user_id(first_name)") on patient_records
+EMBED_TABLES = {
+    "user_id": "users",
+    "patient_id": "users",
+    "doctor_id": "users",
+    "appointment_id": "appointment",
+}
+
+EMBED_PATTERN = re.compile(r"(?:\w+:)?(\w+)(?:!\w+)?\s*\(")
+
+_MISSING = object()
+
+
+def referenced_tables(table, request):
+    """Every table a request reads from: the base table plus its embeds."""
+    tables = {table}
+    for name in EMBED_PATTERN.findall(request.params.get("select", "")):
+        tables.add(EMBED_TABLES.get(name, name))
+    return sorted(tables)
+
+
+def request_key(table, builder):
+    """Normalised cache key for a built (but not executed) request."""
+    request = builder.request
+    params = tuple(sorted(request.params.multi_items()))
+    headers = tuple(
+        (name, request.headers.get(name, ""))
+        for name in ("accept", "prefer", "range")
+    )
+    return (table, type(builder).__name__, request.http_method, params, headers)
+
+
+class QueryCache:
+    """
+    Size-bounded LRU of query responses with a TTL per entry.
+
+    A second LRU keeps the last good response per key regardless of TTL
+    or version, so read-only pages can still render during an outage. Only
+    primary responses go there (see CachedSupabaseClient.read_through).
+    """
+
+    def __init__(self, max_entries=512, ttl=30, table_ttls=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.table_ttls = table_ttls or {}
+        self._entries = OrderedDict()
+        self._last_good = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def ttl_for(self, tables):
+        return min(self.table_ttls.get(t, self.ttl) for t in tables)
+
+    def get(self, key, versions):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return _MISSING
+            response, entry_versions, expires = entry
+            if entry_versions != versions or expires <= time.monotonic():
+                del self._entries[key]
+                self.misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return response
+
+    def set(self, key, versions, response, ttl, last_good=True):
+        with self._lock:
+            if last_good:
+                self._last_good[key] = response
+                self._last_good.move_to_end(key)
+                while len(self._last_good) > self.max_entries:
+                    self._last_good.popitem(last=False)
+
+            if ttl <= 0:
+                return
+            self._entries[key] = (response, versions, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def last_good(self, key):
+        with self._lock:
+            return self._last_good.get(key, _MISSING)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._last_good.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+class CachedQuery:
+    """Wraps a postgrest request builder and caches execute() for reads."""
+
+    def __init__(self, client, table, builder):
+        self._client = client
+        self._table = table
+        self._builder = builder
+
+    def __getattr__(self, name):
+        attr = getattr(self._builder, name)
+        if not callable(attr):
+            return attr
+
+        def chain(*args, **kwargs):
+            result = attr(*args, **kwargs)
+            # Filters return the same / a new builder: keep wrapping it
+            if hasattr(result, "request") and hasattr(result, "execute"):
+                return CachedQuery(self._client, self._table, result)
+            return result
+
+        return chain
+
+    def execute(self):
+        request = self._builder.request
+        if request.http_method in WRITE_METHODS:
+            response = self._client.breaker.call(self._builder.execute)
+            self._client.invalidate(self._table)
+            note_write()
+            return response
+
+        tables = referenced_tables(self._table, request)
+        key = request_key(self._table, self._builder)
+        if replica_allowed() and self._client.has_replica:
+            return self._client.read_through(key, tables, self._execute_on_replica, replica=True)
+        return self._client.read_through(key, tables, self._builder.execute)
+
+    def _execute_on_replica(self):
+        """The same read against the replica endpoint; the primary if that is unreachable."""
+        try:
+            response = self._client.on_replica(self._table, self._builder).execute()
+        except OUTAGE_ERRORS as e:
+            print(f"Replica read of {self._table} failed, using the primary: {e}")
+            count_replica_read(fallback=True)
+            return self._builder.execute()
+        count_replica_read()
+        return response
+
+
+class CachedSupabaseClient:
+    """
+    Drop-in wrapper around the supabase Client.
+
+    table()/from_() return caching query builders that go through the
+    circuit breaker; everything else (storage, rpc, auth) goes straight to
+    the wrapped client. Use `supabase.uncached` for reads that must never
+    be served from cache (password checks, double-booking checks).
+
+    Each thread gets its own supabase Client from client_factory. Those
+    objects are cheap (they share the process-wide PooledTransport) and
+    keep the library's lazily-initialised sub-clients out of cross-thread
+    races. The query cache and circuit breaker are shared per process.
+
+    With a replica configured, cached reads made inside @replica_reads
+    views are sent to it instead (see main/db_routing.py).
+    """
+
+    def __init__(self, client_factory, query_cache, breaker=None, transport=None, replica_factory=None):
+        self._client_factory = client_factory
+        self._replica_factory = replica_factory
+        self._local = threading.local()
+        self.query_cache = query_cache
+        self.breaker = breaker or CircuitBreaker()
+        self.transport = transport
+
+    @property
+    def uncached(self):
+        """This thread's plain supabase Client (no caching, no breaker)."""
+        local = self._local
+        if getattr(local, "pid", None) != os.getpid():
+            local.client = self._client_factory()
+            local.pid = os.getpid()
+        return local.client
+
+    @property
+    def has_replica(self):
+        return self._replica_factory is not None
+
+    @property
+    def replica(self):
+        """
+        This thread's plain Client for the read replica (see db_routing);
+        the primary one when no replica is configured. Reads only.
+        """
+        if self._replica_factory is None:
+            return self.uncached
+        local = self._local
+        if getattr(local, "replica_pid", None) != os.getpid():
+            local.replica = self._replica_factory()
+            local.replica_pid = os.getpid()
+        return local.replica
+
+    def on_replica(self, table_name, builder):
+        """A copy of the read builder that sends its request to the replica."""
+        target = self.replica.table(table_name).select("*").request
+        request = builder.request
+        headers = request.headers.copy()
+        for name in ("apikey", "authorization"):
+            if name in target.headers:
+                headers[name] = target.headers[name]
+        replica_builder = copy.copy(builder)
+        replica_builder.request = type(request)(
+            target.session, target.path, request.http_method, headers, request.params, request.auth, request.json,
+        )
+        return replica_builder
+
+    def __getattr__(self, name):
+        return getattr(self.uncached, name)
+
+    def table(self, table_name):
+        return CachedQuery(self, table_name, self.uncached.table(table_name))
+
+    from_ = table
+
+    def invalidate(self, table_name):
+        self.query_cache.invalidations += 1
+        bump_version(f"table:{table_name}")
+
+    def table_versions(self, tables):
+        return tuple(get_version(f"table:{t}") for t in tables)
+
+    def read_through(self, key, tables, fetch, replica=False):
+        """
+        The cached response for key, or fetch() stored under the current
+        table versions. Replica reads are cached under their own key and
+        kept out of the last-good copies: a lagging replica may answer with
+        rows older than the version they would be stored under, and primary
+        reads must never be served those.
+        """
+        versions = self.table_versions(tables)
+        cache_key = key + ("replica",) if replica else key
+        cached = self.query_cache.get(cache_key, versions)
+        if cached is not _MISSING:
+            # Views mutate the rows they get back; never hand out the cached copy
+            return copy.deepcopy(cached)
+
+        try:
+            response = self.breaker.call(fetch)
+        except OUTAGE_ERRORS:
+            stale = self.query_cache.last_good(key)
+            if stale is _MISSING or not stale_allowed():
+                raise
+            mark_served_stale()
+            return copy.deepcopy(stale)
+
+        self.query_cache.set(
+            cache_key, versions, copy.deepcopy(response), self.query_cache.ttl_for(tables), last_good=not replica
+        )
+        return response
+
+
+def cache_stats():
+    if supabase is None:
+        return {}
+    return supabase.query_cache.stats()
+
+
+def resilience_stats():
+    if supabase is None:
+        return {}
+    return {**supabase.breaker.stats(), "stale_responses_served": stale_stats["served"]}
+
+
+def transport_stats():
+    if supabase is None or supabase.transport is None:
+        return {}
+    return supabase.transport.stats()
+
+
+# Initialize supabase to None first. Nothing below opens a connection or
+# imports the supabase package: the real client is built on first use.
+supabase: CachedSupabaseClient | None = None
 
 try:
     SUPABASE_URL = settings.SUPABASE_URL
@@ -13,13 +394,66 @@ try:
         print("CRITICAL ERROR: Supabase URL or Key is missing from Django settings!")
         print(f"URL: {SUPABASE_URL}, Key is present: {bool(SUPABASE_ANON_KEY)}")
     else:
-        # 🛑 Sticking to the bare minimum function call to bypass the keyword argument error.
-        supabase = create_client(
-            SUPABASE_URL,
-            SUPABASE_ANON_KEY
+        # supabase-py ignores its own timeout options once an httpx client
+        # is passed in, so timeouts live on the pooled transport.
+        transport = PooledTransport(
+            timeout=httpx.Timeout(
+                settings.SUPABASE_READ_TIMEOUT,
+                connect=settings.SUPABASE_CONNECT_TIMEOUT,
+            ),
+            limits=httpx.Limits(
+                max_connections=settings.SUPABASE_POOL_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.SUPABASE_POOL_MAX_KEEPALIVE,
+                keepalive_expiry=settings.SUPABASE_KEEPALIVE_EXPIRY,
+            ),
+            http2=settings.SUPABASE_HTTP2,
+        )
+        os.register_at_fork(after_in_child=transport.reset)
+
+        def client_factory():
+            # Imported here: the supabase package (auth, realtime, pydantic
+            # models) is the slowest import in the app, and most worker
+            # cold starts serve a page before they ever need it.
+            from supabase import create_client
+            from supabase.lib.client_options import SyncClientOptions
+
+            client = create_client(
+                SUPABASE_URL,
+                SUPABASE_ANON_KEY,
+                options=SyncClientOptions(httpx_client=transport.client),
+            )
+            print(f"DEBUG: Supabase Client Initialized Successfully (pid {os.getpid()}).")
+            return client
+
+        replica_factory = None
+        if settings.SUPABASE_REPLICA_URL:
+            def replica_factory():
+                from supabase import create_client
+                from supabase.lib.client_options import SyncClientOptions
+
+                client = create_client(
+                    settings.SUPABASE_REPLICA_URL,
+                    settings.SUPABASE_REPLICA_KEY or SUPABASE_ANON_KEY,
+                    options=SyncClientOptions(httpx_client=transport.client),
+                )
+                print(f"DEBUG: Supabase replica client initialized (pid {os.getpid()}).")
+                return client
+
+        supabase = CachedSupabaseClient(
+            client_factory,
+            QueryCache(
+                max_entries=settings.SUPABASE_CACHE_MAX_ENTRIES,
+                ttl=settings.SUPABASE_CACHE_TTL,
+                table_ttls=settings.SUPABASE_CACHE_TABLE_TTLS,
+            ),
+            CircuitBreaker(
+                failure_threshold=settings.SUPABASE_BREAKER_FAILURES,
+                reset_timeout=settings.SUPABASE_BREAKER_RESET_SECONDS,
+            ),
+            transport,
+            replica_factory,
         )
-        print("DEBUG: Supabase Client Initialized Successfully (Bare minimum call).")
 
 except Exception as e:
     print(f"CRITICAL ERROR DURING SUPABASE CLIENT SETUP: {e}", file=sys.stderr)
-    supabase = None
\ No newline at end of file
+    supabase = None
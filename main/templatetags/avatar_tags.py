@@ -0,0 +1,31 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+
+from main.avatar_utils import variant_urls
+
+register = template.Library()
+
+
+@register.simple_tag
+def avatar(url, sizes="96px", **attrs):
+    """
+    <img> for a users.profile_image URL. Pipeline uploads get a <picture>
+    with WebP and JPEG srcsets so the browser fetches the smallest variant
+    that fits `sizes`; older uploads fall back to a plain lazy <img>.
+
+        {% avatar doc.profile_image sizes="260px" alt=doc.first_name %}
+    """
+    extra = format_html_join("", ' {}="{}"', attrs.items())
+    variants = variant_urls(url)
+    if not variants:
+        return format_html('<img src="{}" loading="lazy" decoding="async"{}>', url, extra)
+
+    def srcset(ext):
+        return ", ".join(f"{urls[ext]} {size}w" for size, urls in variants.items())
+
+    largest = variants[max(variants)]
+    return format_html(
+        '<picture><source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" loading="lazy" decoding="async"{}></picture>',
+        srcset("webp"), sizes, largest["jpg"], srcset("jpg"), sizes, extra,
+    )
@@ -0,0 +1,152 @@
+"""
+Rate limiting with fixed-window counters kept in the Django cache.
+
+Views declare their own limits:
+
+    @rate_limit("20/m", key="ip", methods=["POST"])
+    @rate_limit("5/m", key="email", methods=["POST"])
+    def login_page(request): ...
+
+ThrottleMiddleware checks them in process_view, i.e. before the view runs,
+so a throttled request never reaches Supabase or the password hasher.
+Counters live in the default cache and are bumped with cache.add() +
+cache.incr(), which are atomic in the sqlite, redis, memcached and locmem
+backends, so concurrent requests never read the same count. With a shared
+backend (CACHE_BACKEND=sqlite/redis/memcached) a client is limited across
+all workers; with locmem each worker limits on its own.
+"""
+import hashlib
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.contrib import messages
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.shortcuts import redirect
+
+PERIODS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+class RateLimit:
+    def __init__(self, rate, key, methods):
+        count, period = rate.split("/")
+        self.rate = rate
+        self.capacity = int(count)
+        self.period = PERIODS[period[0]]
+        self.key = key
+        self.methods = {m.upper() for m in methods} if methods else None
+
+
+def rate_limit(rate, key="ip", methods=("POST",)):
+    """
+    Declares a limit on a view. rate is "<count>/<s|m|h|d>"; key is one of
+    "ip", "email" (from POST data) or "user" (session user_id). Stack the
+    decorator to combine limits; a request must be within every one of them.
+    """
+    def decorator(view_func):
+        view_func.rate_limits = getattr(view_func, "rate_limits", []) + [RateLimit(rate, key, methods)]
+        return view_func
+    return decorator
+
+
+# ============================================================
+# CLIENT IDENTIFICATION
+# ============================================================
+def client_ip(request):
+    # Behind Render's proxy REMOTE_ADDR is the proxy; the client is the
+    # entry THROTTLE_PROXY_COUNT hops from the right of X-Forwarded-For.
+    proxies = settings.THROTTLE_PROXY_COUNT
+    forwarded = request.META.get("HTTP_X_FORWARDED_FOR")
+    if proxies and forwarded:
+        hops = [h.strip() for h in forwarded.split(",") if h.strip()]
+        if len(hops) >= proxies:
+            return hops[-proxies]
+    return request.META.get("REMOTE_ADDR", "")
+
+
+def identity(request, key):
+    if key == "ip":
+        value = client_ip(request)
+    elif key == "email":
+        value = (request.POST.get("email") or "").strip().lower()
+    elif key == "user":
+        value = str(request.session.get("user_id") or "")
+    else:
+        raise ValueError(f"Unknown rate limit key {key!r}")
+    if not value:
+        return None
+    # Hashed: keeps emails out of cache keys and keys memcached-safe
+    return hashlib.sha256(value.encode()).hexdigest()[:32]
+
+
+# ============================================================
+# FIXED-WINDOW COUNTERS
+# ============================================================
+def take_hit(counter_key, limit):
+    """Counts a request in the current window; returns (allowed, retry_after_seconds)."""
+    now = time.time()
+    window = int(now // limit.period)
+    key = f"{counter_key}:{window}"
+    cache.add(key, 0, timeout=limit.period + 1)
+    try:
+        count = cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr(): this request opens the window again
+        cache.add(key, 1, timeout=limit.period + 1)
+        count = 1
+    if count > limit.capacity:
+        return False, (window + 1) * limit.period - now
+    return True, 0
+
+
+_stats_lock = threading.Lock()
+_stats = defaultdict(lambda: {"allowed": 0, "throttled": 0})
+
+
+def throttle_stats():
+    with _stats_lock:
+        return {view: dict(counts) for view, counts in _stats.items()}
+
+
+class ThrottleMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        limits = getattr(view_func, "rate_limits", None)
+        if not limits or not settings.THROTTLE_ENABLED:
+            return None
+
+        view_name = view_func.__name__
+        for limit in limits:
+            if limit.methods and request.method not in limit.methods:
+                continue
+            ident = identity(request, limit.key)
+            if ident is None:
+                continue
+            allowed, retry_after = take_hit(f"throttle:{view_name}:{limit.key}:{ident}", limit)
+            if not allowed:
+                with _stats_lock:
+                    _stats[view_name]["throttled"] += 1
+                return self.throttled(request, retry_after)
+
+        with _stats_lock:
+            _stats[view_name]["allowed"] += 1
+        return None
+
+    def throttled(self, request, retry_after):
+        retry_after = max(1, int(retry_after + 0.999))
+        wants_json = "json" in request.headers.get("accept", "")
+        if request.method == "POST" and not wants_json:
+            # Form posts go back to the (unthrottled) GET page with a message
+            messages.error(request, f"Too many attempts. Please wait {retry_after} seconds and try again.")
+            response = redirect(request.path)
+        else:
+            response = JsonResponse({"error": "Too many requests. Please slow down."}, status=429)
+        response["Retry-After"] = str(retry_after)
+        return response
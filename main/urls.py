@@ -15,12 +15,15 @@ urlpatterns = [
     path("logout/", views.logout_page, name="logout"),
     path("admin-dashboard/", views.admin_dashboard, name="admin_dashboard"),
     path("all-doctors/", views.all_doctors, name="all_doctors"),
+    path("doctors/search/", views.doctor_search, name="doctor_search"),
     path("about/", views.about, name="about"),
     
     # --- User Side ---
     path("user-dashboard/", views.user_dashboard, name="user_dashboard"),
     path('user/cancel/<int:appointment_id>/', views.user_cancel_appointment, name='user_cancel_appointment'),
     path("history/", views.appointment_history, name="appointment_history"), 
+    path("notifications/", views.notifications_feed, name="notifications_feed"),
+    path("notifications/read/", views.mark_notifications_read, name="mark_notifications_read"),
     path('book-appointment/', views.book_appointment, name='book_appointment'),
     path('profile/', views.profile_page, name='user_profile'),
     path('profile/upload-image/', views.update_profile_picture, name='update_profile_picture'),
@@ -29,10 +32,14 @@ urlpatterns = [
     # --- Admin / Staff Side ---
     path('register-appointment/', views.register_appointment, name='register_appointment'),
     path('register-staff/', views.register_admin_page, name='register_admin'),
+    path('users/import/', views.import_users_page, name='import_users'),
     path('appointments/', views.appointment_list_page, name='appointment_list'),
     path('appointments/edit/<int:appointment_id>/', views.edit_appointment, name='edit_appointment'),
     path('appointments/delete/<int:appointment_id>/', views.delete_appointment, name='delete_appointment'),
+    path('appointments/bulk/', views.bulk_appointment_action, name='bulk_appointment_action'),
+    path('appointments/export/', views.export_appointments, name='export_appointments'),
     path('patient-records/', views.patient_records_list_page, name='patient_records_list'),
+    path('patient-records/export/', views.export_patient_records, name='export_patient_records'),
     path('users/', views.user_management_page, name='user_management'),
     path('users/edit/<int:user_id>/', views.edit_user_page, name='edit_user'),
     path('appointments/complete/<int:appointment_id>/', views.complete_appointment, name='complete_appointment'),
@@ -49,4 +56,8 @@ urlpatterns = [
     path('settings/change-password/', views.change_password, name='change_password'),
     path('settings/delete-account/', views.delete_account, name='delete_account'),
     path('toggle-is-in/<int:user_id>/', views.toggle_is_in, name='toggle_is_in'),
+    path('users/<int:user_id>/unavailable/', views.doctor_unavailable, name='doctor_unavailable'),
+
+    # --- Monitoring ---
+    path('metrics/', views.system_metrics, name='system_metrics'),
 ]
\ No newline at end of file
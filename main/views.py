@@ -1,18 +1,41 @@
 # ============================================================
 # IMPORTS
 # ============================================================
+import csv
+import io
+import json
 import os
-import time # To generate unique filenames
+import time
 from datetime import datetime, timedelta, date
 from functools import wraps
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect
 from django.contrib import messages
-from django.contrib.auth.hashers import make_password, check_password
-
-from .supabase_client import supabase 
-from supabase import create_client, Client
-from .email_utils import send_appointment_confirmation_email
+from django.conf import settings
+from django.core.cache import cache
+
+from .supabase_client import supabase, cache_stats, resilience_stats, transport_stats
+from .resilience import serve_stale_on_error, served_stale
+from .password_utils import (
+    hash_password, verify_password, verify_password_for_upgrade, HashingBusy, HashPoolExecutor, hashing_stats,
+)
+from .throttling import rate_limit, throttle_stats
+from .signed_sessions import revoke_user_sessions
+from .page_cache import cache_user_page, cache_anonymous_page, bump_user_pages, never_cache_page, user_page_stats, public_page_stats
+from .cache_utils import get_version, versioned_key
+from .pagination import paginate_query
+from .conditional import conditional_on_tables, conditional_stats
+from .avatar_utils import store_avatar, delete_avatar, validate as validate_avatar, InvalidImage, avatar_stats
+from .doctor_search import bump_doctors, search_doctors, search_stats
+from .exports import export_lines, FORMATS as EXPORT_FORMATS
+from .bulk_import import import_users
+from .rescheduling import plan_unavailability, apply_proposals, TIME_SLOTS, SEARCH_DAYS
+from .reminders import reminders_for
+from .archive import archived_history, archived_records
+from .db_routing import replica_reads, replica_allowed, routing_stats
+from .repositories import get_repository
+from .appointment_events import actor_of, event, status_events, log_events, events_after, latest_events, unread_count
+from .email_utils import send_appointment_confirmation_email, queue_appointment_emails, email_stats
 today = date.today().isoformat()
 from django.core.paginator import Paginator
 from django.http import JsonResponse
@@ -87,9 +110,11 @@ def view_patient_health(request, patient_id):
 # ============================================================
 # PUBLIC / BASIC VIEWS
 # ============================================================
+@cache_anonymous_page
 def hello_page(request):
     return HttpResponse("Hello, Django Page!")
 
+@cache_anonymous_page
 def home_page(request):
     return render(request, "home.html")
 
@@ -101,6 +126,8 @@ def forgot_password_page(request):
 # AUTHENTICATION PAGES (LOGIN / LOGOUT)
 # ============================================================
 # --- LOGIN PAGE ---
+@rate_limit("20/m", key="ip")
+@rate_limit("5/m", key="email")
 def login_page(request):
     if request.method == "POST":
         email = request.POST.get("email")
@@ -111,7 +138,7 @@ def login_page(request):
             return render(request, "login-student.html")
 
         try:
-            response = supabase.table("users").select("*").eq("email", email).execute()
+            response = supabase.uncached.table("users").select("*").eq("email", email).execute()
 
             if not response.data:
                 messages.error(request, "Email not found!")
@@ -119,10 +146,19 @@ def login_page(request):
 
             user = response.data[0]
 
-            if not check_password(password, user["password"]):
+            valid, new_hash = verify_password_for_upgrade(password, user["password"])
+            if not valid:
                 messages.error(request, "Incorrect password!")
                 return render(request, "login-student.html")
 
+            # The stored hash is outdated (algorithm / iteration count
+            # changed): save the upgraded one, without blocking the login.
+            if new_hash:
+                try:
+                    supabase.table("users").update({"password": new_hash}).eq("id", user["id"]).execute()
+                except Exception as e:
+                    print(f"Password hash upgrade failed for user {user['id']}: {e}")
+
             # Set session
             request.session["user_id"] = user["id"]
             request.session["user_email"] = user["email"]
@@ -146,6 +182,9 @@ def login_page(request):
                 request.session["role"] = "user"
                 return redirect("user_dashboard")
 
+        except HashingBusy:
+            messages.error(request, "MedLink is busy right now. Please try again in a moment.")
+            return render(request, "login-student.html")
         # [FIX] Added the missing except block here
         except Exception as e:
             print(f"DEBUG: Exception occurred: {str(e)}")
@@ -164,6 +203,7 @@ def logout_page(request):
 # REGISTRATION PAGES
 # ============================================================
 # --- USER REGISTRATION (Explicitly sets is_doctor: False) ---
+@rate_limit("10/h", key="ip")
 def register_page(request):
     if request.method == "POST":
         first_name = request.POST.get("first_name")
@@ -180,12 +220,12 @@ def register_page(request):
 
         try:
             # Check if email already exists
-            response = supabase.table(table_name).select("email").eq("email", email).execute()
+            response = supabase.uncached.table(table_name).select("email").eq("email", email).execute()
             if response.data:
                 messages.error(request, "Email already registered!")
                 return render(request, "register-student.html")
 
-            hashed_password = make_password(password)
+            hashed_password = hash_password(password)
 
             # Insert new user with explicit False flags
             supabase.table(table_name).insert({
@@ -200,6 +240,9 @@ def register_page(request):
             messages.success(request, "Account created successfully! Please log in.")
             return redirect("login")
 
+        except HashingBusy:
+            messages.error(request, "MedLink is busy right now. Please try again in a moment.")
+            return render(request, "register-student.html")
         except Exception as e:
             messages.error(request, "Unexpected error: " + str(e))
             return render(request, "register-student.html")
@@ -239,38 +282,20 @@ def register_admin_page(request):
 
         try:
             # Check if email exists
-            response = supabase.table("users").select("email").eq("email", email).execute()
+            response = supabase.uncached.table("users").select("email").eq("email", email).execute()
             if response.data:
                 messages.error(request, "Email already registered!")
                 return render(request, "register-admin.html")
 
-            # --- NEW: HANDLE IMAGE UPLOAD ---
-            profile_image_url = None
-            if is_doctor_flag and request.FILES.get("profile_picture"):
-                image_file = request.FILES["profile_picture"]
-                try:
-                    # 1. Unique filename
-                    file_ext = image_file.name.split('.')[-1]
-                    # We don't have user_id yet, so we use email hash or timestamp
-                    filename = f"doc_{int(time.time())}.{file_ext}"
-                    
-                    # 2. Upload to 'avatars' bucket
-                    supabase.storage.from_("avatars").upload(
-                        file=image_file.read(),
-                        path=filename,
-                        file_options={"content-type": image_file.content_type}
-                    )
-                    
-                    # 3. Get Public URL
-                    profile_image_url = supabase.storage.from_("avatars").get_public_url(filename)
-                except Exception as e:
-                    print(f"Image upload failed: {e}")
-                    # Decide: Fail completely, or continue without image?
-                    # Let's log it but continue (optional)
-            
-            hashed_password = make_password(password)
+            # --- HANDLE IMAGE UPLOAD ---
+            # Checked before the insert so a bad file does not leave a half-made doctor
+            image_file = request.FILES.get("profile_picture") if is_doctor_flag else None
+            if image_file:
+                validate_avatar(image_file)
 
-            # Insert into users table (Included profile_image)
+            hashed_password = hash_password(password)
+
+            # Insert into users table; profile_image is filled in once the avatar is stored
             user_insert = supabase.table("users").insert({
                 "first_name": first_name,
                 "last_name": last_name,
@@ -279,12 +304,23 @@ def register_admin_page(request):
                 "is_admin": is_admin_flag,
                 "is_doctor": is_doctor_flag,
                 "is_superadmin": False,
-                "profile_image": profile_image_url  # <--- Added this
+                "profile_image": None
             }).execute()
 
             # Get newly inserted user ID
             user_id = user_insert.data[0]["id"]
 
+            if image_file:
+                def save_profile_image(public_url):
+                    supabase.table("users").update({"profile_image": public_url}).eq("id", user_id).execute()
+
+                try:
+                    # Resized, re-encoded and uploaded in the background (main/avatar_utils.py)
+                    store_avatar(image_file, f"user_{user_id}", save_profile_image)
+                except Exception as e:
+                    # The doctor exists already; an avatar can be added later
+                    print(f"Image upload failed: {e}")
+
             # If doctor → insert into doctors table
             if is_doctor_flag:
                 supabase.table("doctors").insert({
@@ -295,6 +331,12 @@ def register_admin_page(request):
             messages.success(request, f"{role.capitalize()} {first_name} added successfully!")
             return redirect("user_management")
 
+        except HashingBusy:
+            messages.error(request, "MedLink is busy right now. Please try again in a moment.")
+            return render(request, "register-admin.html")
+        except InvalidImage as e:
+            messages.error(request, str(e))
+            return render(request, "register-admin.html")
         except Exception as e:
             print("DEBUG ERROR:", e)
             messages.error(request, f"Unexpected error: {e}")
@@ -303,6 +345,69 @@ def register_admin_page(request):
     return render(request, "register-admin.html")
 
 
+# --- BULK IMPORT (CSV) ---
+@superadmin_required
+def import_users_page(request):
+    context = {"max_rows": settings.IMPORT_MAX_UPLOAD_ROWS}
+    if request.method == "POST":
+        upload = request.FILES.get("csv_file")
+        if not upload:
+            messages.error(request, "Choose a CSV file to import.")
+            return render(request, "import-users.html", context)
+
+        lines = io.TextIOWrapper(upload.file, encoding="utf-8-sig", newline="")
+        try:
+            # Counted first so an oversized file is refused before anything is inserted
+            rows = sum(1 for _ in csv.reader(lines)) - 1
+            if rows > settings.IMPORT_MAX_UPLOAD_ROWS:
+                messages.error(
+                    request,
+                    f"The file has {rows} rows; uploads are limited to {settings.IMPORT_MAX_UPLOAD_ROWS}. "
+                    "Use \"manage.py import_users\" for larger files.",
+                )
+                return render(request, "import-users.html", context)
+            lines.seek(0)
+
+            report = []
+            # The login hashing pool, not the command's process pool:
+            # spawning processes inside a web worker is slow, and an upload
+            # must not hash beyond the limit logins are held to.
+            with HashPoolExecutor(settings.IMPORT_WEB_HASH_WORKERS) as pool:
+                result = import_users(
+                    lines, report.append,
+                    batch_size=settings.IMPORT_WEB_BATCH_SIZE,
+                    executor=pool,
+                    deadline=time.monotonic() + settings.IMPORT_WEB_TIME_LIMIT,
+                )
+        except (UnicodeDecodeError, csv.Error, ValueError) as e:
+            messages.error(request, f"Could not read the CSV file: {e}")
+            return render(request, "import-users.html", context)
+        except Exception as e:
+            print("Bulk import failed:", e)
+            messages.error(request, f"Import failed: {e}")
+            return render(request, "import-users.html", context)
+
+        print("Bulk import:", result.summary())
+        counts = result.counts
+        messages.success(
+            request,
+            f"{counts['created']} created, {counts['duplicate']} duplicates, "
+            f"{counts['invalid']} invalid, {counts['failed']} failed.",
+        )
+        if counts["skipped"]:
+            messages.error(
+                request,
+                f"{counts['skipped']} rows were skipped to stay within the time limit. "
+                "Upload them again, or use \"manage.py import_users\".",
+            )
+        context["report"] = report
+        response = render(request, "import-users.html", context)
+        response["Cache-Control"] = "no-store"  # the report holds temporary passwords
+        return response
+
+    return render(request, "import-users.html", context)
+
+
 # ============================================================
 # PROFILE / USER SETTINGS
 # ============================================================
@@ -347,31 +452,21 @@ def update_profile_picture(request):
     if request.method == "POST" and request.FILES.get("profile_picture"):
         user_id = request.session.get("user_id")
         image_file = request.FILES["profile_picture"]
-        
-        try:
-            # 1. Create a unique filename to prevent caching issues
-            file_ext = image_file.name.split('.')[-1]
-            file_path = f"user_{user_id}_{int(time.time())}.{file_ext}"
-            
-            # 2. Read file content
-            file_content = image_file.read()
-            
-            # 3. Upload to Supabase Storage (Bucket: 'avatars')
-            # Note: Ensure you created a public bucket named 'avatars' in Supabase
-            supabase.storage.from_("avatars").upload(
-                file=file_content,
-                path=file_path,
-                file_options={"content-type": image_file.content_type}
-            )
-            
-            # 4. Get the Public URL
-            public_url = supabase.storage.from_("avatars").get_public_url(file_path)
-            
-            # 5. Update the Users table
+
+        def save_profile_image(public_url):
+            old = supabase.uncached.table("users").select("profile_image").eq("id", user_id).single().execute()
             supabase.table("users").update({"profile_image": public_url}).eq("id", user_id).execute()
-            
-            messages.success(request, "Profile picture updated successfully!")
-            
+            # The replaced picture is no longer referenced anywhere
+            delete_avatar((old.data or {}).get("profile_image"))
+
+        try:
+            # Validated here; resized to thumbnail/profile sizes, encoded as
+            # WebP + JPEG and uploaded to the 'avatars' bucket in the background
+            store_avatar(image_file, f"user_{user_id}", save_profile_image)
+            messages.success(request, "Profile picture updated! It may take a few seconds to appear.")
+
+        except InvalidImage as e:
+            messages.error(request, str(e))
         except Exception as e:
             print(f"Error uploading image: {e}")
             messages.error(request, "Failed to upload image. Please try again.")
@@ -380,6 +475,7 @@ def update_profile_picture(request):
 
 
 # --- USER SETTINGS: CHANGE PASSWORD ---
+@rate_limit("5/m", key="user")
 def change_password(request):
     # 1. Security: Ensure user is logged in
     user_id = request.session.get("user_id")
@@ -393,7 +489,7 @@ def change_password(request):
 
         try:
             # Fetch current user data to get the real password hash
-            response = supabase.table("users").select("*").eq("id", user_id).single().execute()
+            response = supabase.uncached.table("users").select("*").eq("id", user_id).single().execute()
             user = response.data
 
             if not user:
@@ -401,7 +497,7 @@ def change_password(request):
                 return redirect("user_dashboard")
 
             # --- RULE 1: Verify Old Password ---
-            if not check_password(old_password, user["password"]):
+            if not verify_password(old_password, user["password"]):
                 messages.error(request, "Incorrect current password.")
                 return render(request, "change_password.html")
 
@@ -425,7 +521,7 @@ def change_password(request):
                 return render(request, "change_password.html")
 
             # Validation passed: Hash and Update
-            new_hashed_password = make_password(new_password)
+            new_hashed_password = hash_password(new_password)
             supabase.table("users").update({"password": new_hashed_password}).eq("id", user_id).execute()
 
             messages.success(request, "Password updated successfully! Please log in again.")
@@ -433,6 +529,8 @@ def change_password(request):
             request.session.flush()
             return redirect("login")
 
+        except HashingBusy:
+            messages.error(request, "MedLink is busy right now. Please try again in a moment.")
         except Exception as e:
             print(f"Error changing password: {e}")
             messages.error(request, "An unexpected error occurred.")
@@ -453,14 +551,18 @@ def delete_account(request):
         
         try:
             # Verify user exists and password matches (Safety check)
-            response = supabase.table("users").select("*").eq("id", user_id).single().execute()
+            response = supabase.uncached.table("users").select("*").eq("id", user_id).single().execute()
             user = response.data
 
-            if user and check_password(password_confirmation, user["password"]):
+            if user and verify_password(password_confirmation, user["password"]):
                 # DELETE ACTION
                 supabase.table("users").delete().eq("id", user_id).execute()
+                delete_avatar(user.get("profile_image"))
+                if user.get("is_doctor"):
+                    bump_doctors()
                 
-                # Clear session
+                # Clear session (and any other signed session of this user)
+                revoke_user_sessions(user_id)
                 request.session.flush()
                 messages.success(request, "Your account has been successfully deleted.")
                 return redirect("login")
@@ -468,6 +570,9 @@ def delete_account(request):
                 messages.error(request, "Incorrect password. Account deletion aborted.")
                 return redirect("user_profile") # Or wherever the settings page is
 
+        except HashingBusy:
+            messages.error(request, "MedLink is busy right now. Please try again in a moment.")
+            return redirect("user_profile")
         except Exception as e:
             print(f"Error deleting account: {e}")
             messages.error(request, "Could not delete account. Please try again.")
@@ -510,6 +615,9 @@ def update_personal_info(request):
             }
             
             supabase.table("users").update(update_data).eq("id", user_id).execute()
+            bump_user_pages(user_id)  # the dashboard greets by first name
+            if request.session.get("role") == "doctor":
+                bump_doctors()
             
             request.session["first_name"] = first_name
             messages.success(request, "Profile updated successfully!")
@@ -606,7 +714,7 @@ def book_appointment(request):
             return render(request, "book_appointment.html", context)
 
         # Check if timeslot is already booked
-        existing_response = supabase.table("appointment").select("*") \
+        existing_response = supabase.uncached.table("appointment").select("*") \
             .eq("doctor_name", doctor_name) \
             .eq("appointment_date", appointment_date) \
             .eq("appointment_time", appointment_time) \
@@ -634,19 +742,15 @@ def book_appointment(request):
             "status": "Pending",
         }
 
-        inserted = supabase.table("appointment").insert(appointment_data).execute()
-        new_appointment_id = inserted.data[0]["id"]
-
-        # ======================================================
-        # ADD MATCHING PATIENT RECORD (same as register_appointment)
-        # ======================================================
-        supabase.table("patient_records").insert({
+        # Inserted with its matching patient record (same as register_appointment)
+        inserted = get_repository().create_appointment(appointment_data, {
             "user_id": user_id,
-            "appointment_id": new_appointment_id,
             "record_date": appointment_date,
             "successful_appointment_visit": False,
             "doctor_notes": "Appointment scheduled."
-        }).execute()
+        })
+        log_events([event(inserted, "created", None, "Pending", actor_of(request))])
+        bump_user_pages(user_id)
 
         messages.success(request, "Appointment booked successfully!")
         return redirect("user_dashboard")
@@ -687,6 +791,8 @@ def user_cancel_appointment(request, appointment_id):
             }
             
             supabase.table("appointment").update(update_data).eq("id", appointment_id).execute()
+            log_events(status_events([appointment], "Cancelled", actor_of(request)))
+            bump_user_pages(appointment.get("patient_id"), request.session.get("user_id"))
             
             messages.success(request, "Appointment cancelled successfully.")
             
@@ -789,7 +895,7 @@ def register_appointment(request):
 
         # Check for double booking
         try:
-            existing = supabase.table("appointment").select("*") \
+            existing = supabase.uncached.table("appointment").select("*") \
                 .eq("doctor_name", doctor_name) \
                 .eq("appointment_date", appointment_date) \
                 .eq("appointment_time", appointment_time) \
@@ -815,17 +921,15 @@ def register_appointment(request):
                 "reason_for_visit": reason_for_visit,
                 "status": "Pending"
             }
-            insert_res = supabase.table("appointment").insert(appointment_data).execute()
-            new_app_id = insert_res.data[0]["id"]
-
-            # Create patient record
-            supabase.table("patient_records").insert({
+            # Create the appointment with its patient record
+            inserted = get_repository().create_appointment(appointment_data, {
                 "user_id": patient_id,
-                "appointment_id": new_app_id,
                 "record_date": appointment_date,
                 "successful_appointment_visit": False,
                 "doctor_notes": "Appointment scheduled."
-            }).execute()
+            })
+            log_events([event(inserted, "created", None, "Pending", actor_of(request))])
+            bump_user_pages(patient_id)
         except Exception as e:
             print("Error saving appointment:", e)
             messages.error(request, "Could not save appointment due to server error.")
@@ -843,31 +947,26 @@ def register_appointment(request):
 # APPOINTMENT LIST & ADMIN ACTIONS
 # ============================================================
 # --- APPOINTMENT LIST ---
+def session_doctor_name(request):
+    """The logged-in doctor's name as stored in appointment.doctor_name, or None."""
+    if not request.session.get("is_doctor"):
+        return None
+    # Fetch the doctor's name from the users table to match the appointment record
+    user_info = supabase.table("users").select("first_name, last_name")\
+        .eq("id", request.session.get("user_id")).single().execute()
+    if not user_info.data:
+        return None
+    # Constructed exactly as book_appointment stores it: "First Last"
+    return f"{user_info.data['first_name']} {user_info.data['last_name']}"
+
+
 @admin_required
+@conditional_on_tables("appointment", "users")
 def appointment_list_page(request):
     """Displays appointments. If user is a doctor, shows ONLY their appointments."""
     try:
-        # 1. Start the base query
-        query = supabase.table("appointment").select("*").order("appointment_date", desc=False)
-
-        # 2. Check if the user is a doctor
-        if request.session.get("is_doctor"):
-            user_id = request.session.get("user_id")
-            
-            # Fetch the doctor's name from the users table to match the appointment record
-            user_info = supabase.table("users").select("first_name, last_name").eq("id", user_id).single().execute()
-            
-            if user_info.data:
-                # Construct the name exactly as it is stored in the appointment table
-                # (Assuming you store it as "First Last" in book_appointment)
-                full_doctor_name = f"{user_info.data['first_name']} {user_info.data['last_name']}"
-                
-                # 3. Apply the filter
-                query = query.eq("doctor_name", full_doctor_name)
-
-        # 4. Execute the query (filtered or unfiltered)
-        response = query.execute()
-        appointments = response.data or []
+        # Doctors only see their own appointments
+        appointments = get_repository().appointments(session_doctor_name(request))
         
         context = {"appointments": appointments}
         return render(request, "appointments.html", context)
@@ -886,6 +985,8 @@ def approve_appointment(request, appointment_id):
         appointment = response.data[0]
         if appointment["status"] == "Pending":
             supabase.table("appointment").update({"status": "Approved"}).eq("id", appointment_id).execute()
+            log_events(status_events([appointment], "Approved", actor_of(request)))
+            bump_user_pages(appointment.get("patient_id"))
             try:
                 full_name = f"{appointment['first_name']} {appointment['last_name']}"
                 send_appointment_confirmation_email(
@@ -914,6 +1015,8 @@ def decline_appointment(request, appointment_id):
         if response.data:
             appointment = response.data[0]
             supabase.table("appointment").update({"status": "Declined"}).eq("id", appointment_id).execute()
+            log_events(status_events([appointment], "Declined", actor_of(request)))
+            bump_user_pages(appointment.get("patient_id"))
             try:
                 full_name = f"{appointment['first_name']} {appointment['last_name']}"
                 send_appointment_confirmation_email(
@@ -950,6 +1053,8 @@ def reinstate_appointment(request, appointment_id):
 
         appointment = response.data[0]
         supabase.table("appointment").update({"status": "Approved"}).eq("id", appointment_id).execute()
+        log_events(status_events([appointment], "Approved", actor_of(request)))
+        bump_user_pages(appointment.get("patient_id"))
         messages.success(request, "Appointment has been reinstated successfully.")
 
         try:
@@ -986,6 +1091,8 @@ def cancel_appointment(request, appointment_id):
 
         appointment = response.data[0]
         supabase.table("appointment").update({"status": "Cancelled"}).eq("id", appointment_id).execute()
+        log_events(status_events([appointment], "Cancelled", actor_of(request)))
+        bump_user_pages(appointment.get("patient_id"))
         messages.success(request, "Appointment has been cancelled successfully.")
 
         try:
@@ -1007,6 +1114,119 @@ def cancel_appointment(request, appointment_id):
 
     return redirect("appointment_list")
 
+# --- BULK APPROVE / DECLINE / CANCEL ---
+# action -> (new status, statuses it may be applied to, email status)
+BULK_ACTIONS = {
+    "approve": ("Approved", ["Pending"], "Approved"),
+    "decline": ("Declined", ["Pending"], "Declined"),
+    "cancel": ("Cancelled", ["Approved", "Pending"], "Cancelled"),
+}
+MAX_BULK_IDS = 500
+
+
+@admin_required
+@rate_limit("30/m", key="user")
+def bulk_appointment_action(request):
+    """
+    Applies one status transition to many appointments with one update per
+    status it applies to, filtered on that status, so an appointment changed
+    in the meantime is skipped rather than overwritten. Answers with per-ID
+    outcomes as JSON (Accept: application/json) or as a flash summary.
+    """
+    if request.method != "POST":
+        return redirect("appointment_list")
+
+    wants_json = "application/json" in request.headers.get("Accept", "")
+    action = request.POST.get("action")
+    ids = []
+    for value in request.POST.getlist("appointment_ids"):
+        try:
+            if int(value) not in ids:
+                ids.append(int(value))
+        except ValueError:
+            pass
+
+    error = None
+    if action not in BULK_ACTIONS:
+        error = "Unknown bulk action."
+    elif not ids:
+        error = "Select at least one appointment."
+    elif len(ids) > MAX_BULK_IDS:
+        error = f"Select at most {MAX_BULK_IDS} appointments at a time."
+    elif action == "cancel" and request.session.get("role") not in ["admin", "superadmin"]:
+        error = "Unauthorized action."
+    if error:
+        if wants_json:
+            return JsonResponse({"error": error}, status=400)
+        messages.error(request, error)
+        return redirect("appointment_list")
+
+    new_status, from_statuses, email_status = BULK_ACTIONS[action]
+    events = []
+    try:
+        # Doctors only act on their own appointments, as on the list page
+        doctor_name = session_doctor_name(request)
+        updated = []
+        # One update per status it applies to, so each event knows the old status
+        for from_status in from_statuses:
+            query = supabase.table("appointment").update({"status": new_status})\
+                .in_("id", ids).eq("status", from_status)
+            if doctor_name:
+                query = query.eq("doctor_name", doctor_name)
+            rows = query.execute().data or []
+            updated += rows
+            events += [event(row, "status", from_status, new_status, actor_of(request)) for row in rows]
+
+        outcomes = {row["id"]: {"id": row["id"], "outcome": "updated", "status": new_status} for row in updated}
+        rest = [i for i in ids if i not in outcomes]
+        if rest:
+            # Why the others were left alone, in one more query
+            current = supabase.uncached.table("appointment").select("id, status, doctor_name")\
+                .in_("id", rest).execute().data or []
+            found = {row["id"]: row for row in current}
+            for i in rest:
+                row = found.get(i)
+                if row is None:
+                    outcomes[i] = {"id": i, "outcome": "not_found", "status": None}
+                elif doctor_name and row["doctor_name"] != doctor_name:
+                    outcomes[i] = {"id": i, "outcome": "forbidden", "status": None}
+                else:
+                    outcomes[i] = {"id": i, "outcome": "skipped", "status": row["status"]}
+    except Exception as e:
+        print(f"Error in bulk {action}: {e}")
+        if wants_json:
+            return JsonResponse({"error": "Bulk update failed."}, status=502)
+        messages.error(request, "Bulk update failed. Please try again.")
+        return redirect("appointment_list")
+
+    log_events(events)
+    bump_user_pages(*(row.get("patient_id") for row in updated))
+    queue_appointment_emails([
+        {
+            "user_name": f"{row.get('first_name')} {row.get('last_name')}",
+            "user_email": row.get("user_email"),
+            "doctor_name": row.get("doctor_name"),
+            "appointment_date": row.get("appointment_date"),
+            "appointment_time": row.get("appointment_time"),
+            "status": email_status,
+        }
+        for row in updated
+    ])
+
+    results = [outcomes[i] for i in ids]
+    if wants_json:
+        return JsonResponse({"action": action, "status": new_status, "updated": len(updated), "results": results})
+
+    if updated:
+        messages.success(request, f"{len(updated)} appointment(s) {new_status.lower()}.")
+    skipped = [r for r in results if r["outcome"] != "updated"]
+    if skipped:
+        messages.warning(request, "Not changed: " + ", ".join(
+            f"#{r['id']} ({r['status'] or r['outcome'].replace('_', ' ')})" for r in skipped
+        ))
+    return redirect("appointment_list")
+
+
 # --- MARK APPOINTMENT COMPLETE (New from your old version) ---
 @admin_required
 def complete_appointment(request, appointment_id):
@@ -1018,7 +1238,10 @@ def complete_appointment(request, appointment_id):
 
     try:
         # 1. Update Appointment Status
-        supabase.table("appointment").update({"status": "Completed"}).eq("id", appointment_id).execute()
+        before = supabase.uncached.table("appointment").select("*").eq("id", appointment_id).execute().data or []
+        completed = supabase.table("appointment").update({"status": "Completed"}).eq("id", appointment_id).execute()
+        log_events(status_events(before, "Completed", actor_of(request)))
+        bump_user_pages(*(row.get("patient_id") for row in completed.data or []))
 
         # 2. Update Patient Record
         response = supabase.table('patient_records').update({
@@ -1069,12 +1292,7 @@ def edit_appointment(request, appointment_id):
 
         today = date.today()
 
-        times = [
-            "08:00 AM","08:30 AM","09:00 AM","09:30 AM","10:00 AM","10:30 AM",
-            "11:00 AM","11:30 AM","12:00 PM","12:30 PM","01:00 PM","01:30 PM",
-            "02:00 PM","02:30 PM","03:00 PM","03:30 PM","04:00 PM","04:30 PM",
-            "05:00 PM"
-        ]
+        times = TIME_SLOTS
 
         # Get booked times for selected date (excluding current appointment)
         booked_resp = supabase.table("appointment").select("appointment_time")\
@@ -1104,7 +1322,7 @@ def edit_appointment(request, appointment_id):
                 })
 
             # Check if selected date & time is already booked
-            conflict_resp = supabase.table("appointment").select("*")\
+            conflict_resp = supabase.uncached.table("appointment").select("*")\
                 .eq("appointment_date", new_date_str)\
                 .eq("appointment_time", new_time_str)\
                 .neq("id", appointment_id).execute()
@@ -1121,6 +1339,11 @@ def edit_appointment(request, appointment_id):
                 "appointment_date": new_date_str,
                 "appointment_time": new_time_str
             }).eq("id", appointment_id).execute()
+            log_events([event(
+                appointment, "rescheduled", appointment.get("status"), appointment.get("status"), actor_of(request),
+                appointment_date=new_date_str, appointment_time=new_time_str,
+            )])
+            bump_user_pages(appointment.get("patient_id"))
 
             # --- Send reschedule email ---
             user_name = appointment.get("user_name")  # adjust to your DB column
@@ -1157,7 +1380,7 @@ def edit_appointment(request, appointment_id):
 def delete_appointment(request, appointment_id):
     try:
         # [CHANGED] 1. Check status before deleting
-        check_response = supabase.table("appointment").select("status").eq("id", appointment_id).single().execute()
+        check_response = supabase.table("appointment").select("*").eq("id", appointment_id).single().execute()
         if check_response.data:
             status = check_response.data.get("status")
             if status != "Cancelled":
@@ -1174,6 +1397,8 @@ def delete_appointment(request, appointment_id):
         response = supabase.table("appointment").delete().eq("id", appointment_id).execute()
         
         if response.data:
+            log_events([event(check_response.data, "deleted", "Cancelled", None, actor_of(request))])
+            bump_user_pages(check_response.data.get("patient_id"))
             messages.success(request, f"Appointment #{appointment_id} deleted successfully.")
         else:
             messages.error(request, f"Could not delete appointment #{appointment_id}.")
@@ -1189,11 +1414,11 @@ def delete_appointment(request, appointment_id):
 # USER MANAGEMENT (ADMIN)
 # ============================================================
 @admin_required
+@replica_reads
 def user_management_page(request):
     """Fetches all users, separates them into Doctors and Patients, excluding admins."""
     try:
-        response = supabase.table("users").select("*").order("last_name", desc=False).execute()
-        all_users = response.data or []
+        all_users = get_repository().users_by_last_name()
 
         # Doctors: only users where is_doctor=True (admins are excluded)
         doctors = [u for u in all_users if u.get('is_doctor') == True and not u.get('is_admin')]
@@ -1248,6 +1473,8 @@ def edit_user_page(request, user_id):
             }
             
             supabase.table("users").update(update_data).eq("id", user_id).execute()
+            bump_user_pages(user_id)  # the patient's cached pages show their name
+            bump_doctors()  # the name or is_doctor may have changed
             
             messages.success(request, f"User {first_name} {last_name} (ID: {user_id}) updated successfully.")
             return redirect('user_management')
@@ -1282,6 +1509,7 @@ def toggle_is_in(request, user_id):
             # Toggle the value
             new_is_in = not current_is_in
             supabase.table("users").update({"is_in": new_is_in}).eq("id", user_id).execute()
+            bump_doctors()
 
             status_text = "active/bookable" if new_is_in else "inactive/not bookable"
             messages.success(request, f"User is now marked as {status_text}.")
@@ -1293,25 +1521,107 @@ def toggle_is_in(request, user_id):
     return redirect("user_management")    
 
 
+# --- DOCTOR UNAVAILABLE: BATCH RESCHEDULING ---
+@admin_required
+def doctor_unavailable(request, user_id):
+    """
+    Proposes new slots for a doctor's appointments in a date range (another
+    doctor of the same specialization at the same time, or the doctor's next
+    free slot) and applies the accepted ones in one batch.
+    See main/rescheduling.py.
+    """
+    if request.session.get("role") not in ["admin", "superadmin"]:
+        messages.error(request, "Unauthorized action.")
+        return redirect("user_management")
+
+    today = date.today()
+    context = {"user_id": user_id, "start": today.isoformat(), "end": today.isoformat(), "search_days": SEARCH_DAYS}
+
+    if request.method == "POST" and request.POST.get("step") == "apply":
+        accepted = []
+        for value in request.POST.getlist("accept"):
+            try:
+                proposal = json.loads(value)
+                accepted.append({
+                    "id": int(proposal["id"]),
+                    "expected": proposal["expected"],
+                    "target": proposal["target"],
+                })
+            except (ValueError, KeyError, TypeError):
+                continue
+        if not accepted:
+            messages.warning(request, "No proposals were selected; nothing was changed.")
+            return redirect("user_management")
+        try:
+            outcomes = apply_proposals(accepted, actor=actor_of(request))
+            if request.POST.get("mark_out"):
+                supabase.table("users").update({"is_in": False}).eq("id", user_id).execute()
+                bump_doctors()
+        except Exception as e:
+            print(f"Error applying reschedule for doctor {user_id}: {e}")
+            messages.error(request, "Rescheduling failed. Please try again.")
+            return redirect("user_management")
+
+        rescheduled = sum(1 for outcome in outcomes.values() if outcome == "rescheduled")
+        messages.success(request, f"{rescheduled} appointment(s) rescheduled; patients are being notified.")
+        skipped = {i: outcome for i, outcome in outcomes.items() if outcome != "rescheduled"}
+        if skipped:
+            messages.warning(request, "Not changed: " + ", ".join(
+                f"#{i} ({outcome.replace('_', ' ')})" for i, outcome in skipped.items()
+            ))
+        return redirect("user_management")
+
+    if request.method == "POST":
+        try:
+            start = date.fromisoformat(request.POST.get("start", ""))
+            end = date.fromisoformat(request.POST.get("end", ""))
+            search_days = min(max(int(request.POST.get("search_days") or SEARCH_DAYS), 1), 60)
+        except ValueError:
+            messages.error(request, "Enter a valid date range.")
+            return render(request, "doctor_unavailable.html", context)
+        if end < start:
+            messages.error(request, "The end date is before the start date.")
+            return render(request, "doctor_unavailable.html", context)
+
+        context.update(start=start.isoformat(), end=end.isoformat(), search_days=search_days)
+        try:
+            doctor, proposals = plan_unavailability(user_id, start, end, search_days)
+        except ValueError as e:
+            messages.error(request, str(e))
+            return redirect("user_management")
+        except Exception as e:
+            print(f"Error planning reschedule for doctor {user_id}: {e}")
+            messages.error(request, "Could not load the doctor's appointments.")
+            return render(request, "doctor_unavailable.html", context)
+
+        for p in proposals:
+            if p["target"]:
+                p["payload"] = json.dumps({"id": p["appointment"]["id"], "expected": p["expected"], "target": p["target"]})
+        context.update(doctor=doctor, proposals=proposals)
+
+    return render(request, "doctor_unavailable.html", context)
+
+
 # ============================================================
 # PATIENT RECORDS
 # ============================================================
 # --- PATIENT RECORDS LIST (New from your old version) ---
 @admin_required
+@conditional_on_tables("patient_records", "users", "appointment")
+@replica_reads
 def patient_records_list_page(request):
     """Displays all patient records with optional search by patient name."""
     try:
         search_query = request.GET.get("search", "").strip()
 
-        # Fetch all patient records with joined user name and appointment info (including status)
-        response = (
-            supabase.table("patient_records")
-            .select("*, user_id(first_name, last_name), appointment_id(doctor_name, appointment_date, status)")
-            .order("record_date", desc=True)
-            .execute()
-        )
+        # All patient records with joined user name and appointment info (including status)
+        records = get_repository().patient_records()
 
-        records = response.data or []
+        # Older records are in cold storage (main/archive.py); only read on request
+        include_archived = request.GET.get("archived") == "1"
+        if include_archived:
+            records += archived_records()
+            records.sort(key=lambda r: r.get("record_date") or "", reverse=True)
 
         # 🔎 Apply search filter (local filtering)
         if search_query:
@@ -1325,6 +1635,7 @@ def patient_records_list_page(request):
         context = {
             "records": records,
             "search": search_query,   # so input box can remember the value
+            "include_archived": include_archived,
         }
 
         return render(request, "patient_records_list.html", context)
@@ -1336,6 +1647,40 @@ def patient_records_list_page(request):
 
 
 
+# ============================================================
+# EXPORTS
+# ============================================================
+def _export_response(dataset, fmt, **filters):
+    fmt = fmt if fmt in EXPORT_FORMATS else "csv"
+    # Decided now: the rows are read after the view has returned
+    filters["client"] = supabase.replica if replica_allowed() else supabase.uncached
+    response = StreamingHttpResponse(export_lines(dataset, fmt, **filters), content_type=EXPORT_FORMATS[fmt])
+    filename = f"{dataset}-{date.today():%Y%m%d}.{fmt}"
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response["Cache-Control"] = "no-store"
+    return response
+
+
+@admin_required
+@rate_limit("10/m", key="user", methods=["GET"])
+@replica_reads
+def export_appointments(request):
+    """Streams the appointments the list page shows as CSV or JSONL (?format=jsonl)."""
+    return _export_response(
+        "appointments", request.GET.get("format"), doctor_name=session_doctor_name(request)
+    )
+
+
+@admin_required
+@rate_limit("10/m", key="user", methods=["GET"])
+@replica_reads
+def export_patient_records(request):
+    """Streams patient records, with the list page's ?search= filter, as CSV or JSONL."""
+    return _export_response(
+        "patient_records", request.GET.get("format"), search=request.GET.get("search", "").strip()
+    )
+
+
 # ============================================================
 # ADMIN DASHBOARD
 # ============================================================
@@ -1343,62 +1688,16 @@ def patient_records_list_page(request):
 # main/views.py
 
 @admin_required
+@serve_stale_on_error
+@replica_reads
 def admin_dashboard(request):
     try:
-        user_id = request.session.get("user_id")
         is_doctor = request.session.get("is_doctor", False)
 
-        # 1. Base counts (same as before)
-        patient_res = supabase.table("users").select("id", count='exact').eq("is_doctor", False).eq("is_admin", False).execute()
-        total_patients = patient_res.count or 0
-        
-        doc_res = supabase.table("users").select("id", count='exact').eq("is_doctor", True).execute()
-        total_doctors = doc_res.count or 0
-
-        active_doc_res = supabase.table("users").select("id", count='exact').eq("is_doctor", True).eq("is_in", True).execute()
-        active_doctors = active_doc_res.count or 0
-        
-        appt_res = supabase.table("appointment").select("id", count='exact').execute()
-        total_appointments = appt_res.count or 0
-
-        # --- [NEW] DOCTOR FILTERING LOGIC ---
-        pending_query = supabase.table("appointment").select("id", count='exact').eq("status", "Pending")
-        recent_appt_query = supabase.table("appointment").select("*").order("appointment_date", desc=True).limit(5)
-
-        if is_doctor:
-            # Fetch doctor's full name to match the 'doctor_name' column in appointments
-            # (Ideally, we would match by ID, but your system currently uses names)
-            user_info = supabase.table("users").select("first_name, last_name").eq("id", user_id).single().execute()
-            if user_info.data:
-                full_doctor_name = f"{user_info.data['first_name']} {user_info.data['last_name']}"
-                
-                # Filter Pending Count
-                pending_query = pending_query.eq("doctor_name", full_doctor_name)
-                
-                # Filter Recent List
-                recent_appt_query = recent_appt_query.eq("doctor_name", full_doctor_name)
-
-        # Execute the (potentially filtered) queries
-        pending_res = pending_query.execute()
-        pending_appointments = pending_res.count or 0
-
-        appointments_res = recent_appt_query.execute()
-        appointments = appointments_res.data or []
-        # ------------------------------------
-
-        recent_users_res = supabase.table("users").select("*").eq("is_admin", False).order("id", desc=True).limit(5).execute()
-        recent_activity = recent_users_res.data or []
-
-        context = {
-            "total_patients": total_patients,
-            "total_doctors": total_doctors,
-            "active_doctors": active_doctors,
-            "total_appointments": total_appointments,
-            "pending_appointments": pending_appointments,
-            "recent_activity": recent_activity, 
-            "appointments": appointments, 
-            "is_doctor": is_doctor, # Pass this so template can hide "Total Doctors" etc. if you want
-        }
+        # Counts, recent appointments and newest users; a doctor's pending
+        # count and recent list only cover their own appointments
+        context = get_repository().admin_dashboard(session_doctor_name(request) if is_doctor else None)
+        context["is_doctor"] = is_doctor  # Pass this so template can hide "Total Doctors" etc. if you want
         return render(request, "admin_dashboard.html", context)
 
     except Exception as e:
@@ -1413,6 +1712,8 @@ def admin_dashboard(request):
 
 # ... existing imports ...
 
+@cache_user_page
+@serve_stale_on_error
 def user_dashboard(request):
     if not request.session.get("user_id"):
         return redirect("login")
@@ -1422,15 +1723,11 @@ def user_dashboard(request):
         first_name = request.session.get("first_name", "User")
         
         # Fetch all appointments
-        response = supabase.table("appointment").select("*").eq("user_email", user_email).order("appointment_date", desc=False).execute()
-        all_appointments = response.data or []
+        all_appointments = get_repository().user_appointments(user_email)
 
         today = datetime.now().date()
-        reminder_threshold = today + timedelta(days=3)
 
         upcoming_appointments = []
-        reminders = []
-        status_notifications = []
 
         # Counters
         total_count = 0
@@ -1445,14 +1742,6 @@ def user_dashboard(request):
                 # Show Future or Today, BUT EXCLUDE Completed, Cancelled, AND Declined
                 if appt_date >= today and appt.get('status') not in ['Completed', 'Cancelled', 'Declined']:
                     upcoming_appointments.append(appt)
-                    
-                    # Create Reminder if Approved AND within 3 days
-                    if appt_date <= reminder_threshold and appt.get('status') == 'Approved':
-                        reminders.append(appt)
-
-                # Collect notifications for status changes
-                if appt.get('status') in ['Pending', 'Approved', 'Declined', 'Cancelled', 'Reinstated']:
-                    status_notifications.append(appt)
 
                 # Increment counters
                 total_count += 1
@@ -1464,12 +1753,17 @@ def user_dashboard(request):
             except ValueError:
                 continue
 
-        # Sort notifications by most recent date
-        status_notifications = sorted(
-            status_notifications, 
-            key=lambda x: x.get('updated_at', x['appointment_date']), 
-            reverse=True
-        )[:5]
+        # Reminders are recorded by "manage.py send_reminders" (main/reminders.py)
+        reminders = reminders_for(user_email, upcoming_appointments, today)
+
+        # Notifications come from the appointment event log (main/appointment_events.py)
+        user_id = request.session.get("user_id")
+        cursor = supabase.table("users").select("notifications_read_id").eq("id", user_id).execute().data
+        read_id = (cursor[0].get("notifications_read_id") if cursor else 0) or 0
+        status_notifications = latest_events(user_id)
+        for note in status_notifications:
+            note["unread"] = note["id"] > read_id
+        unread_notifications = unread_count(user_id, read_id)
 
         context = {
             "user_email": user_email,
@@ -1477,6 +1771,7 @@ def user_dashboard(request):
             "appointments": upcoming_appointments,
             "reminders": reminders, 
             "status_notifications": status_notifications,
+            "unread_notifications": unread_notifications,
             "total_count": total_count,
             "pending_count": pending_count,
             "completed_count": completed_count,
@@ -1485,9 +1780,11 @@ def user_dashboard(request):
 
     except Exception as e:
         print(f"Error: {e}")
-        return render(request, "user-dashboard.html", {"appointments": [], "total_count": 0})
+        # Empty because the fetch failed: never cache it as the patient's page
+        return never_cache_page(render(request, "user-dashboard.html", {"appointments": [], "total_count": 0}))
 
 
+@cache_user_page
 def appointment_history(request):
     if not request.session.get("user_id"):
         return redirect("login")
@@ -1496,8 +1793,13 @@ def appointment_history(request):
         user_email = request.session.get("user_email")
         
         # Fetch all appointments
-        response = supabase.table("appointment").select("*").eq("user_email", user_email).order("appointment_date", desc=True).execute()
-        all_appointments = response.data or []
+        all_appointments = get_repository().user_appointments(user_email, newest_first=True)
+
+        # Older appointments are in cold storage (main/archive.py); only read on request
+        include_archived = request.GET.get("archived") == "1"
+        if include_archived:
+            all_appointments += archived_history(user_email)
+            all_appointments.sort(key=lambda a: a.get("appointment_date") or "", reverse=True)
         
         today = datetime.now().date()
         past_appointments = []
@@ -1515,38 +1817,66 @@ def appointment_history(request):
             except ValueError:
                 continue
 
-        return render(request, "appointment_history.html", {"history": past_appointments})
+        return render(request, "appointment_history.html", {
+            "history": past_appointments, "include_archived": include_archived,
+        })
 
     except Exception as e:
         print(f"Error: {e}")
         return redirect("user_dashboard")
 
     
+@cache_anonymous_page
 def home(request):
     return render(request, "home.html")
 
+@cache_anonymous_page
 def about(request):
     return render(request, "about.html")
 
+def doctor_facets():
+    """
+    [{"specialization", "doctors", "available"}] from one grouped query
+    (supabase/migrations: doctor_specialization_facets), cached until a
+    doctors/users write.
+    """
+    key = versioned_key("table:doctors", "facets", get_version("table:users"))
+    facets = cache.get(key)
+    if facets is None:
+        try:
+            facets = supabase.rpc("doctor_specialization_facets").execute().data or []
+        except Exception as e:
+            print("Error fetching specialization facets:", e)
+            return []
+        cache.set(key, facets, settings.SUPABASE_CACHE_TABLE_TTLS.get("doctors", settings.SUPABASE_CACHE_TTL))
+    return facets
+
+
+@conditional_on_tables("users", "doctors")
+@serve_stale_on_error
 def all_doctors(request):
     specialty = request.GET.get("specialty")
+    cards_ttl = settings.PUBLIC_PAGE_CACHE_TTL
 
-    try:
-        # Fetch from doctors table AND join user info including profile_image
+    def doctors_query():
+        # Fetch from doctors table AND join user info including profile_image;
+        # only the requested page comes back, plus the total for the paginator
         query = (
             supabase.table("doctors")
-            .select("doctor_id, specialization, users!inner(first_name, last_name, email, is_in, profile_image)")
+            .select("doctor_id, specialization, users!inner(first_name, last_name, email, is_in, profile_image)",
+                    count="exact")
+            .order("doctor_id")
         )
-
         if specialty and specialty.lower() != "all":
             query = query.eq("specialization", specialty)
+        return query
 
-        response = query.execute()
-        doctors = response.data
+    try:
+        page_obj = paginate_query(doctors_query, request.GET.get("page"), 12)
 
         # Format output for template
         formatted_doctors = []
-        for d in doctors:
+        for d in page_obj.object_list:
             user = d.get("users", {})
             formatted_doctors.append({
                 "doctor_id": d.get("doctor_id"),
@@ -1557,23 +1887,42 @@ def all_doctors(request):
                 "is_in": user.get("is_in", False),
                 "profile_image": user.get("profile_image"),  # <--- The new image field
             })
+        page_obj.object_list = formatted_doctors
 
     except Exception as e:
         print("Error fetching doctors:", e)
-        formatted_doctors = []
+        page_obj = Paginator([], 12).get_page(1)
+        cards_ttl = 0  # never cache the empty grid of a failed fetch
 
-    paginator = Paginator(formatted_doctors, 12)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
+    if served_stale():
+        cards_ttl = 0  # nor the last-good grid served during an outage
 
     # This return statement is crucial!
     return render(request, "all_doctors.html", {
         "doctors": page_obj,
         "selected_specialty": specialty,
+        "facets": doctor_facets(),
+        # Doctor-card fragment cache (see all_doctors.html)
+        "cards_ttl": cards_ttl,
+        "cards_version": f"{get_version('table:doctors')}.{get_version('table:users')}",
     })
 
     
 
+@rate_limit("120/m", key="ip", methods=["GET"])
+@conditional_on_tables("users", "doctors")
+def doctor_search(request):
+    """Typeahead over doctor names and specializations (see main/doctor_search.py)."""
+    query = request.GET.get("q", "").strip()[:100]
+    try:
+        limit = min(max(int(request.GET.get("limit", 8)), 1), 20)
+    except ValueError:
+        limit = 8
+    results = search_doctors(query, limit=limit, available_only=request.GET.get("available") == "1")
+    return JsonResponse({"query": query, "results": results})
+
+
+@cache_anonymous_page
 def privacy_page(request):
     return render(request, "privacy.html")
 
@@ -1585,7 +1934,12 @@ def delete_user(request, user_id):
 
         try:
             # Delete user from the users table
-            supabase.table("users").delete().eq("id", user_id).execute()
+            deleted = supabase.table("users").delete().eq("id", user_id).execute()
+            for row in deleted.data or []:
+                delete_avatar(row.get("profile_image"))
+                if row.get("is_doctor"):
+                    bump_doctors()
+            revoke_user_sessions(user_id)
             messages.success(request, "User deleted successfully.")
         except Exception as e:
             print(f"Error deleting user: {e}")
@@ -1594,6 +1948,8 @@ def delete_user(request, user_id):
     return redirect("user_management")
 
 @admin_required
+@rate_limit("60/m", key="ip", methods=["GET"])
+@conditional_on_tables("appointment")
 def get_booked_times(request):
     date_str = request.GET.get("date")
     appointment_id = request.GET.get("appointment_id")
@@ -1602,15 +1958,7 @@ def get_booked_times(request):
     booked_times = []
 
     if date_str and doctor_name:
-        query = supabase.table("appointment").select("appointment_time")\
-            .eq("appointment_date", date_str)\
-            .eq("doctor_name", doctor_name)
-        if appointment_id:
-            query = query.neq("id", appointment_id)
-        resp = query.execute()
-
-        for b in resp.data:
-            btime = b.get("appointment_time")
+        for btime in get_repository().booked_times(date_str, doctor_name, appointment_id):
             if btime:
                 try:
                     b_obj = datetime.strptime(btime.strip(), "%I:%M %p")
@@ -1623,3 +1971,63 @@ def get_booked_times(request):
                     booked_times.append(b_obj.strftime("%I:%M %p"))
 
     return JsonResponse({"booked_times": booked_times})
+
+
+# --- NOTIFICATION FEED (appointment event log) ---
+@rate_limit("120/m", key="user", methods=["GET"])
+def notifications_feed(request):
+    """
+    The logged-in patient's appointment events after ?since=<event id>,
+    oldest first, for polling: pass back "cursor" as the next since.
+    """
+    user_id = request.session.get("user_id")
+    if not user_id:
+        return JsonResponse({"error": "Not logged in."}, status=401)
+    try:
+        since = int(request.GET.get("since") or 0)
+    except ValueError:
+        return JsonResponse({"error": "since must be an event id."}, status=400)
+    events = events_after(since, patient_id=user_id, limit=50)
+    return JsonResponse({"events": events, "cursor": events[-1]["id"] if events else since})
+
+
+@rate_limit("30/m", key="user")
+def mark_notifications_read(request):
+    """Moves the patient's "read up to" cursor forward to last_id."""
+    user_id = request.session.get("user_id")
+    if not user_id:
+        return JsonResponse({"error": "Not logged in."}, status=401)
+    if request.method != "POST":
+        return JsonResponse({"error": "POST required."}, status=405)
+    try:
+        last_id = int(request.POST.get("last_id") or 0)
+    except ValueError:
+        return JsonResponse({"error": "last_id must be an event id."}, status=400)
+    # Only forward, so an old tab cannot mark newer events unread again
+    supabase.table("users").update({"notifications_read_id": last_id})\
+        .eq("id", user_id).lt("notifications_read_id", last_id).execute()
+    bump_user_pages(user_id)
+    return JsonResponse({"read_id": last_id})
+
+
+# ============================================================
+# METRICS
+# ============================================================
+@superadmin_required
+def system_metrics(request):
+    """Cache and runtime statistics for the worker that serves the request."""
+    return JsonResponse({
+        "pid": os.getpid(),
+        "supabase_query_cache": cache_stats(),
+        "supabase_resilience": resilience_stats(),
+        "supabase_transport": transport_stats(),
+        "password_hashing": hashing_stats(),
+        "throttling": throttle_stats(),
+        "avatars": avatar_stats(),
+        "user_page_cache": user_page_stats(),
+        "conditional_get": conditional_stats(),
+        "public_page_cache": public_page_stats(),
+        "doctor_search": search_stats(),
+        "email_batches": email_stats(),
+        "replica_routing": routing_stats(),
+    })
@@ -24,31 +24,140 @@ ALLOWED_HOSTS = [
 SUPABASE_URL = config("SUPABASE_URL")
 SUPABASE_ANON_KEY = config("SUPABASE_ANON_KEY")
 
+# Read-through cache for SELECTs made through main.supabase_client.
+# Writes through the client invalidate the table on every worker;
+# the TTL only bounds staleness from writes made outside the app.
+SUPABASE_CACHE_TTL = config("SUPABASE_CACHE_TTL", default=30, cast=int)
+SUPABASE_CACHE_MAX_ENTRIES = config("SUPABASE_CACHE_MAX_ENTRIES", default=512, cast=int)
+SUPABASE_CACHE_TABLE_TTLS = {
+    "doctors": 300,
+    "appointment": 15,
+}
+
+# Per-call timeouts (seconds) and circuit breaker: after
+# SUPABASE_BREAKER_FAILURES consecutive connection failures/timeouts,
+# calls fail fast for SUPABASE_BREAKER_RESET_SECONDS.
+SUPABASE_CONNECT_TIMEOUT = config("SUPABASE_CONNECT_TIMEOUT", default=3.0, cast=float)
+SUPABASE_READ_TIMEOUT = config("SUPABASE_READ_TIMEOUT", default=8.0, cast=float)
+SUPABASE_BREAKER_FAILURES = config("SUPABASE_BREAKER_FAILURES", default=5, cast=int)
+SUPABASE_BREAKER_RESET_SECONDS = config("SUPABASE_BREAKER_RESET_SECONDS", default=30, cast=int)
+
+# One pooled keep-alive HTTP transport per worker, shared by all threads.
+SUPABASE_HTTP2 = config("SUPABASE_HTTP2", default=True, cast=bool)
+SUPABASE_POOL_MAX_CONNECTIONS = config("SUPABASE_POOL_MAX_CONNECTIONS", default=20, cast=int)
+SUPABASE_POOL_MAX_KEEPALIVE = config("SUPABASE_POOL_MAX_KEEPALIVE", default=10, cast=int)
+SUPABASE_KEEPALIVE_EXPIRY = config("SUPABASE_KEEPALIVE_EXPIRY", default=30.0, cast=float)
+
+# CSV/JSONL exports (see main/exports.py) read this many rows per request.
+# PostgREST caps responses at its max-rows setting (1000 on Supabase).
+EXPORT_PAGE_SIZE = config("EXPORT_PAGE_SIZE", default=1000, cast=int)
+
+# Read replica for the heavy admin reads (see main/db_routing.py). Empty
+# means primary only, the default. SUPABASE_REPLICA_KEY defaults to
+# SUPABASE_ANON_KEY (a Supabase read replica shares the project's keys).
+# After a write, a session reads from the primary for REPLICA_PIN_SECONDS.
+SUPABASE_REPLICA_URL = config("SUPABASE_REPLICA_URL", default="")
+SUPABASE_REPLICA_KEY = config("SUPABASE_REPLICA_KEY", default="")
+REPLICA_PIN_SECONDS = config("REPLICA_PIN_SECONDS", default=5.0, cast=float)
+
 # ------------------------------------------------------------------------------------
 # DATABASE
 # ------------------------------------------------------------------------------------
+# Where the hot views read and write (see main/repositories.py):
+#   supabase -> PostgREST over HTTPS through main.supabase_client (default)
+#   orm      -> the Django ORM over a direct connection to DATABASE_URL
+DATA_BACKEND = config("DATA_BACKEND", default="supabase")
+
+# DATABASE_POOL=True serves the ORM from a psycopg connection pool shared
+# by the worker's threads, instead of one persistent connection per thread
+# (conn_max_age). Django does not allow both.
+DATABASE_POOL = config("DATABASE_POOL", default=False, cast=bool)
+DATABASE_POOL_MIN_SIZE = config("DATABASE_POOL_MIN_SIZE", default=2, cast=int)
+DATABASE_POOL_MAX_SIZE = config("DATABASE_POOL_MAX_SIZE", default=10, cast=int)
+
 DATABASES = {
     "default": dj_database_url.parse(
         config("DATABASE_URL"),
-        conn_max_age=600,
+        conn_max_age=0 if DATABASE_POOL else 600,
         ssl_require=True
     )
 }
+if DATABASE_POOL:
+    DATABASES["default"].setdefault("OPTIONS", {})["pool"] = {
+        "min_size": DATABASE_POOL_MIN_SIZE,
+        "max_size": DATABASE_POOL_MAX_SIZE,
+    }
+
+# Optional replica of the same database; the router sends only the reads of
+# @replica_reads views there. Django's test databases mirror it onto
+# "default"; main.tests.TwoInstanceReplicaTests checks the real pair.
+DATABASE_REPLICA_URL = config("DATABASE_REPLICA_URL", default="")
+if DATABASE_REPLICA_URL:
+    DATABASES["replica"] = dj_database_url.parse(
+        DATABASE_REPLICA_URL,
+        conn_max_age=600,
+        ssl_require=config("DATABASE_REPLICA_SSL", default=True, cast=bool),
+    )
+    DATABASES["replica"]["TEST"] = {"MIRROR": "default"}
+DATABASE_ROUTERS = ["main.db_routing.ReplicaRouter"]
 
 # ------------------------------------------------------------------------------------
 # CACHING + SESSION ENGINE
 # ------------------------------------------------------------------------------------
+# CACHE_BACKEND picks where the cache lives:
+#   locmem    -> per-process memory (default, fine for a single worker;
+#                gunicorn.conf.py picks sqlite when it runs several)
+#   sqlite    -> one SQLite file shared by every worker on the host
+#   file      -> Django's file-based cache, shared by every worker on the host
+#   redis     -> Redis server at CACHE_LOCATION (e.g. redis://127.0.0.1:6379/0)
+#   memcached -> memcached server at CACHE_LOCATION (e.g. 127.0.0.1:11211)
+# The worker process (send_reminders) and archive_appointments bump cache
+# versions from their own process, which only reaches the web workers through
+# a cache they share: the Procfile runs both process types with sqlite unless
+# CACHE_BACKEND is set, and those commands refuse to run on locmem. Where
+# each process type runs on its own machine, use redis or memcached.
+CACHE_BACKEND = config("CACHE_BACKEND", default="locmem")
+
+CACHE_BACKENDS = {
+    "locmem": ("django.core.cache.backends.locmem.LocMemCache", "medlink-cache"),
+    "sqlite": ("main.cache_backends.SQLiteCache", str(BASE_DIR / ".cache" / "medlink-cache.sqlite3")),
+    "file": ("django.core.cache.backends.filebased.FileBasedCache", str(BASE_DIR / ".cache" / "django")),
+    "redis": ("django.core.cache.backends.redis.RedisCache", "redis://127.0.0.1:6379/0"),
+    "memcached": ("django.core.cache.backends.memcached.PyMemcacheCache", "127.0.0.1:11211"),
+}
+
 CACHES = {
     "default": {
-        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
-        "LOCATION": "medlink-cache",
+        "BACKEND": CACHE_BACKENDS[CACHE_BACKEND][0],
+        "LOCATION": config("CACHE_LOCATION", default=CACHE_BACKENDS[CACHE_BACKEND][1]),
+        "OPTIONS": {
+            "MAX_ENTRIES": config("CACHE_MAX_ENTRIES", default=10000, cast=int),
+        } if CACHE_BACKEND in ("locmem", "sqlite", "file") else {},
     }
 }
 
-# Cached DB sessions = FAST + STABLE
-SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+# Rendered patient pages, per user (see main/page_cache.py). Appointment
+# writes bump the user's version; the TTL bounds date-dependent content.
+USER_PAGE_CACHE_TTL = config("USER_PAGE_CACHE_TTL", default=300, cast=int)
+
+# SESSION_MODE picks where sessions live:
+#   cached_db -> cache in front of the sessions table (default)
+#   signed    -> compact signed cookie, no per-request session storage;
+#                logout / account deletion are enforced through a
+#                revocation list in the cache (use a shared CACHE_BACKEND)
+SESSION_MODE = config("SESSION_MODE", default="cached_db")
+
+SESSION_ENGINES = {
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "signed": "main.signed_sessions",
+}
+SESSION_ENGINE = SESSION_ENGINES[SESSION_MODE]
 SESSION_CACHE_ALIAS = "default"
 
+if SESSION_MODE == "signed":
+    # Flash messages in their own cookie, so they never touch the session
+    MESSAGE_STORAGE = "django.contrib.messages.storage.cookie.CookieStorage"
+
 SESSION_COOKIE_SECURE = True
 CSRF_COOKIE_SECURE = True
 
@@ -77,28 +186,49 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "main.throttling.ThrottleMiddleware",
+    "main.db_routing.PrimaryPinMiddleware",
 ]
 
+# Per-view rate limits (see @rate_limit in main/throttling.py).
+# THROTTLE_PROXY_COUNT: reverse proxies in front of the app, used to find
+# the client IP in X-Forwarded-For. 1 matches Render; set 0 when clients
+# connect to gunicorn directly, or they could pick their own IP.
+THROTTLE_ENABLED = config("THROTTLE_ENABLED", default=True, cast=bool)
+THROTTLE_PROXY_COUNT = config("THROTTLE_PROXY_COUNT", default=1, cast=int)
+
 ROOT_URLCONF = "medlink.urls"
 
 # ------------------------------------------------------------------------------------
 # TEMPLATES
 # ------------------------------------------------------------------------------------
+# Compiled templates are kept in memory in production; with DEBUG on,
+# edits to templates show up without a restart.
+_TEMPLATE_LOADERS = [
+    "django.template.loaders.filesystem.Loader",
+    "django.template.loaders.app_directories.Loader",
+]
+
 TEMPLATES = [
     {
         "BACKEND": "django.template.backends.django.DjangoTemplates",
         "DIRS": [],
-        "APP_DIRS": True,
         "OPTIONS": {
+            "loaders": _TEMPLATE_LOADERS if DEBUG else [("django.template.loaders.cached.Loader", _TEMPLATE_LOADERS)],
             "context_processors": [
                 "django.template.context_processors.request",
                 "django.contrib.auth.context_processors.auth",
                 "django.contrib.messages.context_processors.messages",
+                "main.resilience.supabase_status",
             ],
         },
     },
 ]
 
+# Anonymous full-page cache for the public pages and the doctor-card
+# fragment of all_doctors (see main/page_cache.py). 0 disables both.
+PUBLIC_PAGE_CACHE_TTL = config("PUBLIC_PAGE_CACHE_TTL", default=600, cast=int)
+
 WSGI_APPLICATION = "medlink.wsgi.application"
 
 # ------------------------------------------------------------------------------------
@@ -111,6 +241,66 @@ AUTH_PASSWORD_VALIDATORS = [
     {"NAME": "django.contrib.auth.password_validation.NumericPasswordValidator"},
 ]
 
+# ------------------------------------------------------------------------------------
+# PASSWORD HASHING
+# ------------------------------------------------------------------------------------
+# The first hasher is used for new hashes; the rest still verify old ones.
+# Logins upgrade stored hashes when the algorithm or iteration count changes.
+PASSWORD_HASH_ALGORITHM = config("PASSWORD_HASH_ALGORITHM", default="pbkdf2_sha256")
+PASSWORD_HASH_ITERATIONS = config("PASSWORD_HASH_ITERATIONS", default=0, cast=int)  # 0 = Django default
+
+_PASSWORD_HASHERS = {
+    "pbkdf2_sha256": "main.password_utils.TunablePBKDF2PasswordHasher",
+    "argon2": "django.contrib.auth.hashers.Argon2PasswordHasher",
+    "bcrypt_sha256": "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+    "scrypt": "django.contrib.auth.hashers.ScryptPasswordHasher",
+}
+PASSWORD_HASHERS = [_PASSWORD_HASHERS[PASSWORD_HASH_ALGORITHM]] + [
+    path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASH_ALGORITHM
+] + ["django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher"]
+
+# Bounded per-worker pool that runs the hashing (see main/password_utils.py)
+PASSWORD_HASH_WORKERS = config("PASSWORD_HASH_WORKERS", default=2, cast=int)
+PASSWORD_HASH_MAX_PENDING = config("PASSWORD_HASH_MAX_PENDING", default=16, cast=int)
+PASSWORD_HASH_TIMEOUT = config("PASSWORD_HASH_TIMEOUT", default=10.0, cast=float)
+
+# Bulk CSV import of users (see main/bulk_import.py): rows per lookup/insert
+# batch, and processes hashing passwords for "manage.py import_users".
+# Uploads through the admin page run inside a gunicorn worker, so they are
+# kept well under its 30s timeout: at most IMPORT_MAX_UPLOAD_ROWS rows, in
+# batches of IMPORT_WEB_BATCH_SIZE, and batches not started within
+# IMPORT_WEB_TIME_LIMIT seconds are reported as skipped. They hash on the
+# login hashing pool above, IMPORT_WEB_HASH_WORKERS at a time, so uploads
+# and logins share its limits; a batch the pool turns away is skipped too.
+# Each hash costs about half a second of CPU at Django's default 1,000,000
+# PBKDF2 iterations; bigger files go through the management command.
+IMPORT_BATCH_SIZE = config("IMPORT_BATCH_SIZE", default=500, cast=int)
+IMPORT_HASH_WORKERS = config("IMPORT_HASH_WORKERS", default=os.cpu_count() or 2, cast=int)
+IMPORT_MAX_UPLOAD_ROWS = config("IMPORT_MAX_UPLOAD_ROWS", default=100, cast=int)
+IMPORT_WEB_HASH_WORKERS = config("IMPORT_WEB_HASH_WORKERS", default=2, cast=int)
+IMPORT_WEB_BATCH_SIZE = config("IMPORT_WEB_BATCH_SIZE", default=10, cast=int)
+IMPORT_WEB_TIME_LIMIT = config("IMPORT_WEB_TIME_LIMIT", default=15, cast=float)
+
+# Appointment reminders (see main/reminders.py and "manage.py send_reminders"):
+# Approved appointments within REMINDER_DAYS days are emailed once, in
+# batches of REMINDER_BATCH_SIZE messages per backend connection. A batch
+# claimed by a run that died is retried after REMINDER_CLAIM_SECONDS.
+REMINDER_DAYS = config("REMINDER_DAYS", default=3, cast=int)
+REMINDER_BATCH_SIZE = config("REMINDER_BATCH_SIZE", default=100, cast=int)
+REMINDER_CLAIM_SECONDS = config("REMINDER_CLAIM_SECONDS", default=600, cast=int)
+
+# Appointment event feed (see main/appointment_events.py): cursor readers
+# only get events this many seconds old, by which time every concurrent
+# insert with a lower id has committed.
+EVENTS_SETTLE_SECONDS = config("EVENTS_SETTLE_SECONDS", default=5, cast=int)
+
+# Archival of finished appointments (see main/archive.py and
+# "manage.py archive_appointments"): Completed / Cancelled / Declined ones
+# older than ARCHIVE_AFTER_DAYS move to the archive tables,
+# ARCHIVE_BATCH_SIZE per transaction.
+ARCHIVE_AFTER_DAYS = config("ARCHIVE_AFTER_DAYS", default=365, cast=int)
+ARCHIVE_BATCH_SIZE = config("ARCHIVE_BATCH_SIZE", default=500, cast=int)
+
 # ------------------------------------------------------------------------------------
 # EMAIL (GMAIL SMTP)
 # ------------------------------------------------------------------------------------
@@ -135,6 +325,16 @@ STATICFILES_STORAGE = "whitenoise.storage.CompressedManifestStaticFilesStorage"
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media"
 
+# Avatar uploads (see main/avatar_utils.py). Each upload is resized to every
+# AVATAR_SIZES width and stored as WebP + JPEG in the Supabase "avatars" bucket.
+AVATAR_MAX_UPLOAD_MB = config("AVATAR_MAX_UPLOAD_MB", default=5, cast=int)
+AVATAR_MAX_PIXELS = config("AVATAR_MAX_PIXELS", default=40_000_000, cast=int)
+AVATAR_SIZES = config("AVATAR_SIZES", default="96,400", cast=lambda v: sorted(int(s) for s in v.split(",")))
+AVATAR_WEBP_QUALITY = config("AVATAR_WEBP_QUALITY", default=80, cast=int)
+AVATAR_JPEG_QUALITY = config("AVATAR_JPEG_QUALITY", default=85, cast=int)
+AVATAR_WORKERS = config("AVATAR_WORKERS", default=1, cast=int)
+AVATAR_UPLOAD_WORKERS = config("AVATAR_UPLOAD_WORKERS", default=4, cast=int)
+
 # ------------------------------------------------------------------------------------
 # AUTO FIELD
 # ------------------------------------------------------------------------------------
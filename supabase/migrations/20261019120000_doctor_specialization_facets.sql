@@ -0,0 +1,23 @@
+-- Doctors per specialization, and how many of them are currently bookable
+-- (users.is_in). Used by the all_doctors sidebar in one round trip instead
+-- of fetching every doctor row.
+create or replace function public.doctor_specialization_facets()
+returns table (specialization text, doctors bigint, available bigint)
+language sql
+stable
+as $$
+    select d.specialization,
+           count(*) as doctors,
+           count(*) filter (where u.is_in) as available
+    from public.doctors d
+    join public.users u on u.id = d.doctor_id
+    where d.specialization is not null
+    group by d.specialization
+    order by d.specialization;
+$$;
+
+grant execute on function public.doctor_specialization_facets() to anon, authenticated;
+
+-- Keeps the paged, ordered directory query an index scan
+create index if not exists doctors_specialization_doctor_id_idx
+    on public.doctors (specialization, doctor_id);
@@ -0,0 +1,4 @@
+-- Keyset pages of a doctor's appointments (where doctor_name = $1 and
+-- id > $2 order by id limit n) for the streaming exports, without a scan.
+create index if not exists appointment_doctor_name_id_idx
+    on public.appointment (doctor_name, id);
@@ -0,0 +1,23 @@
+-- Reminders recorded by "manage.py send_reminders" (main/reminders.py).
+-- One row per appointment slot reminded; emailed_at is set once the email
+-- batch went out, so failed sends are retried and none are repeated.
+create table if not exists public.appointment_reminders (
+    id bigserial primary key,
+    appointment_id bigint not null references public.appointment (id) on delete cascade,
+    patient_id bigint,
+    user_email text,
+    doctor_name text not null,
+    appointment_date date not null,
+    appointment_time text not null,
+    created_at timestamptz not null default now(),
+    emailed_at timestamptz,
+    unique (appointment_id, appointment_date, appointment_time)
+);
+
+-- The dashboard's read: a patient's reminders from today on
+create index if not exists appointment_reminders_user_email_date_idx
+    on public.appointment_reminders (user_email, appointment_date);
+
+-- The job's single range query (status = 'Approved' and date between ...)
+create index if not exists appointment_status_date_idx
+    on public.appointment (status, appointment_date);
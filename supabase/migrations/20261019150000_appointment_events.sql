@@ -0,0 +1,25 @@
+-- Append-only appointment change log (main/appointment_events.py).
+-- No foreign key to appointment: events outlive deleted appointments.
+create table if not exists public.appointment_events (
+    id bigserial primary key,
+    appointment_id bigint not null,
+    patient_id bigint,
+    user_email text,
+    doctor_name text,
+    appointment_date date,
+    appointment_time text,
+    kind text not null check (kind in ('created', 'status', 'rescheduled', 'deleted')),
+    old_status text,
+    new_status text,
+    actor_id bigint,
+    actor_role text,
+    created_at timestamptz not null default now()
+);
+
+-- A patient's feed, newest first or after a cursor (ids grow with time)
+create index if not exists appointment_events_patient_id_idx
+    on public.appointment_events (patient_id, id);
+
+-- Per-user "read up to" cursor for the dashboard notifications
+alter table public.users
+    add column if not exists notifications_read_id bigint not null default 0;
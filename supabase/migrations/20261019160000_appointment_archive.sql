@@ -0,0 +1,73 @@
+-- Cold storage for finished appointments (main/archive.py,
+-- "manage.py archive_appointments"). Same columns as the hot tables plus
+-- archived_at, which must stay last: archive_appointments() copies rows
+-- with "select moved.*, now()".
+create table if not exists public.appointment_archive (
+    like public.appointment including defaults,
+    primary key (id)
+);
+alter table public.appointment_archive
+    add column if not exists archived_at timestamptz not null default now();
+
+create table if not exists public.patient_records_archive (
+    like public.patient_records including defaults,
+    primary key (id),
+    foreign key (user_id) references public.users (id) on delete cascade,
+    foreign key (appointment_id) references public.appointment_archive (id) on delete set null
+);
+alter table public.patient_records_archive
+    add column if not exists archived_at timestamptz not null default now();
+
+-- The history page's read when older data is asked for
+create index if not exists appointment_archive_user_email_date_idx
+    on public.appointment_archive (user_email, appointment_date);
+
+-- Picks the candidates of each batch without scanning the live rows
+create index if not exists appointment_status_date_id_idx
+    on public.appointment (status, appointment_date, id);
+
+-- Moves one batch of Completed / Cancelled / Declined appointments dated
+-- before cutoff, and their patient_records, into the archive tables in one
+-- transaction. Returns how many of each were moved; 0 appointments means
+-- nothing is left to archive.
+create or replace function public.archive_appointments(cutoff date, batch_size int default 500)
+returns table (appointments bigint, records bigint)
+language plpgsql
+as $$
+declare
+    ids bigint[];
+begin
+    select array_agg(id) into ids
+    from (
+        select id from public.appointment
+        where status in ('Completed', 'Cancelled', 'Declined')
+          and appointment_date < cutoff
+        order by id
+        limit batch_size
+        for update skip locked
+    ) batch;
+
+    if ids is null then
+        appointments := 0;
+        records := 0;
+        return next;
+        return;
+    end if;
+
+    -- Copied first, as the archived records reference them; deleted last,
+    -- once no live record does
+    insert into public.appointment_archive
+    select a.*, now() from public.appointment a where a.id = any(ids);
+    get diagnostics appointments = row_count;
+
+    with moved as (
+        delete from public.patient_records where appointment_id = any(ids) returning *
+    )
+    insert into public.patient_records_archive
+    select moved.*, now() from moved;
+    get diagnostics records = row_count;
+
+    delete from public.appointment where id = any(ids);
+    return next;
+end;
+$$;
@@ -0,0 +1,17 @@
+-- Which of the given emails are already registered, ignoring case. Used by
+-- the bulk user import (main/bulk_import.py) to find duplicates for a whole
+-- batch in one round trip; a plain .in_("email", ...) is case-sensitive.
+create or replace function public.registered_emails(emails text[])
+returns setof text
+language sql
+stable
+as $$
+    select lower(u.email)
+    from public.users u
+    where lower(u.email) = any (select lower(e) from unnest(emails) as e);
+$$;
+
+grant execute on function public.registered_emails(text[]) to anon, authenticated;
+
+create index if not exists users_email_lower_idx
+    on public.users (lower(email));
@@ -0,0 +1,10 @@
+-- Lets send_reminders claim a batch before emailing it (main/reminders.py),
+-- so overlapping runs never send the same reminder twice. A claim older
+-- than REMINDER_CLAIM_SECONDS belongs to a run that died and is taken over.
+alter table public.appointment_reminders
+    add column if not exists claimed_at timestamptz;
+
+-- The unsent reminders the job claims from
+create index if not exists appointment_reminders_unsent_idx
+    on public.appointment_reminders (id)
+    where emailed_at is null;
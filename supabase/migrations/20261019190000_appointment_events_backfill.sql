@@ -0,0 +1,30 @@
+-- Seeds appointment_events with one event per existing appointment, so
+-- patients' notification lists are not empty after the event log ships.
+-- Each appointment gets a "created" event carrying its current status and
+-- slot, in appointment id order; actor_role 'system' marks them as
+-- backfilled. Appointments that already have an event are skipped, so the
+-- script can be re-run.
+insert into public.appointment_events (
+    appointment_id, patient_id, user_email, doctor_name,
+    appointment_date, appointment_time, kind, old_status, new_status, actor_role
+)
+select a.id, a.patient_id, a.user_email, a.doctor_name,
+       a.appointment_date::date, a.appointment_time, 'created', null, a.status, 'system'
+from public.appointment a
+where not exists (
+    select 1 from public.appointment_events e where e.appointment_id = a.id
+)
+order by a.id;
+
+-- The backfilled events are history, not news: start every patient who
+-- has not read anything yet after them.
+update public.users u
+set notifications_read_id = e.last_id
+from (
+    select patient_id, max(id) as last_id
+    from public.appointment_events
+    where actor_role = 'system'
+    group by patient_id
+) e
+where e.patient_id = u.id
+  and u.notifications_read_id = 0;
@@ -0,0 +1,69 @@
+-- Applies a batch of accepted rescheduling proposals (main/rescheduling.py)
+-- in one statement. A move goes through only if the appointment is still
+-- exactly as it was read (status, doctor, date and time) and nothing active
+-- holds the target slot; otherwise it is left alone and reported as
+-- "changed" or "taken". Two moves to the same slot in one batch are
+-- deduplicated by the caller, as the check only sees rows from before the
+-- statement.
+create or replace function public.reschedule_appointments(moves jsonb)
+returns table (appointment_id bigint, outcome text)
+language sql
+as $$
+    with v as (
+        select *
+        from jsonb_to_recordset(moves) as m(
+            id bigint,
+            status text,
+            doctor_name text,
+            appointment_date date,
+            appointment_time text,
+            new_doctor_name text,
+            new_date date,
+            new_time text
+        )
+    ),
+    moved as (
+        update public.appointment a
+        set doctor_name = v.new_doctor_name,
+            appointment_date = v.new_date,
+            appointment_time = v.new_time
+        from v
+        where a.id = v.id
+          and a.status = v.status
+          and a.doctor_name = v.doctor_name
+          and a.appointment_date::date = v.appointment_date
+          and a.appointment_time = v.appointment_time
+          and not exists (
+              select 1
+              from public.appointment b
+              where b.id <> v.id
+                and b.doctor_name = v.new_doctor_name
+                and b.appointment_date::date = v.new_date
+                and b.appointment_time = v.new_time
+                and b.status not in ('Cancelled', 'Declined')
+          )
+        returning a.id
+    )
+    select v.id,
+           case
+               when m.id is not null then 'rescheduled'
+               when exists (
+                   select 1
+                   from public.appointment b
+                   where b.id <> v.id
+                     and b.doctor_name = v.new_doctor_name
+                     and b.appointment_date::date = v.new_date
+                     and b.appointment_time = v.new_time
+                     and b.status not in ('Cancelled', 'Declined')
+               ) then 'taken'
+               else 'changed'
+           end
+    from v
+    left join moved m on m.id = v.id;
+$$;
+
+grant execute on function public.reschedule_appointments(jsonb) to anon, authenticated;
+
+-- The slot lookups above (and the bookings read by plan_unavailability)
+create index if not exists appointment_doctor_slot_idx
+    on public.appointment (doctor_name, appointment_date, appointment_time);